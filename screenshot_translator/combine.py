@@ -4,20 +4,36 @@ import sys
 import os
 import subprocess
 import time
+import uuid
 from pathlib import Path
 import io
+import requests
 
 if sys.stdout.encoding != 'utf-8':
     print(sys.stdout.encoding, file=sys.stderr)
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
+# 作业被新的截图取代时各步骤脚本的退出码
+EXIT_CANCELLED = 2
+
+# 截图的识别语言，默认与结果窗口的源语言一致，模型在服务端启动时已预加载；
+# auto 由服务端按文字类别(拉丁字母/汉字/假名)自动选择模型，但要先用探测模型多识别一次
+DEFAULT_OCR_LANG = "英文"
+
 class ScreenshotTranslator:
-    def __init__(self):
+    def __init__(self, job_id=None, supersede=False, ocr_lang=None):
         self.base_dir = Path("C:/MY_SPACE/Sources/tools/screenshot_translator")
         self.temp_dir = self.base_dir / "temp"
         self.screenshot_path = self.temp_dir / "screenshot.png"
         self.ocr_result_path = self.temp_dir / "ocr.txt"
+        self.refine_id_path = self.temp_dir / "ocr_refine_id.txt"
         self.pre_result = None
+        self.ocr_text = None
+        self.refine_id = None
+        self.ocr_lang = ocr_lang or DEFAULT_OCR_LANG
+        # 本次截图翻译的作业id，OCR和翻译请求都带上它；supersede 时服务端取消之前还没完成的截图翻译
+        self.job_id = job_id or uuid.uuid4().hex
+        self.supersede = supersede
         
         # 确保目录存在
         self.temp_dir.mkdir(parents=True, exist_ok=True)
@@ -72,6 +88,14 @@ class ScreenshotTranslator:
             print(f"执行命令失败: {e}", file=sys.stderr)
             return -1
     
+    def begin_job(self):
+        """向服务端登记作业，尽早取消被取代的截图翻译，服务端不可用时忽略"""
+        try:
+            requests.post("http://127.0.0.1:5000/jobs", json={"job_id": self.job_id, "supersede": self.supersede},
+                          timeout=1)
+        except requests.RequestException as e:
+            print(f"登记作业失败: {e}", file=sys.stderr)
+
     def step1_screenshot(self):
         """步骤1: 截图"""
         print("=" * 50)
@@ -83,14 +107,28 @@ class ScreenshotTranslator:
             print(f"截图脚本不存在: {qtshot_script}", file=sys.stderr)
             return -1
         
-        result = self.run_command(
-            [sys.executable, str(qtshot_script)],
-            "启动截图工具"
-        )
+        # 清除上一次的OCR结果，--ocr 模式下截图工具会直接把识别结果写入该文件
+        for path in (self.ocr_result_path, self.refine_id_path):
+            if path.exists():
+                path.unlink()
+        
+        command = [sys.executable, str(qtshot_script), "--ocr", f"--lang={self.ocr_lang}", f"--job-id={self.job_id}"]
+        if self.supersede:
+            command.append("--supersede")
+        result = self.run_command(command, "启动截图工具")
         self.pre_result = result
         
+        if result["returncode"] == EXIT_CANCELLED:
+            print("截图已被新的截图取代", file=sys.stderr)
+            return EXIT_CANCELLED
         if result["returncode"] == 0:
-            if self.screenshot_path.exists():
+            if self.ocr_result_path.exists():
+                self.ocr_text = self.ocr_result_path.read_text(encoding='utf-8').strip()
+                if self.refine_id_path.exists():
+                    self.refine_id = self.refine_id_path.read_text(encoding='utf-8').strip() or None
+                print(f"截图并识别成功: {self.ocr_result_path}", file=sys.stderr)
+                return 0
+            elif self.screenshot_path.exists():
                 file_size = self.screenshot_path.stat().st_size
                 print(f"截图成功: {self.screenshot_path} ({file_size} 字节)", file=sys.stderr)
                 return 0
@@ -107,6 +145,14 @@ class ScreenshotTranslator:
         print("步骤2: OCR文字识别", file=sys.stderr)
         print("=" * 50)
         
+        # 截图工具已经直接完成OCR，无需再读写截图文件
+        if self.ocr_text is not None:
+            if not self.ocr_text:
+                print("识别失败：未识别到任何文字", file=sys.stderr)
+                return -1
+            print(f"OCR成功: 识别到 {len(self.ocr_text)} 个字符", file=sys.stderr)
+            return 0
+        
         ocr_client_script = self.base_dir / "ocr_client.py"
         if not ocr_client_script.exists():
             print(f"OCR客户端脚本不存在: {ocr_client_script}", file=sys.stderr)
@@ -124,6 +170,7 @@ class ScreenshotTranslator:
         
         if result["returncode"] == 0:
             ocr_text = result["stdout"].strip()
+            self.ocr_text = ocr_text
             print(f"OCR成功: 识别到 {len(ocr_text)} 个字符", file=sys.stderr)
             print(f"识别结果: {ocr_text[:100]}{'...' if len(ocr_text) > 100 else ''}", file=sys.stderr)
             return 0
@@ -143,11 +190,14 @@ class ScreenshotTranslator:
             return -1
                
         result = self.run_command(
-            [sys.executable, str(translate_client_script), ocr_text],
+            [sys.executable, str(translate_client_script), f"--job-id={self.job_id}", ocr_text],
             "执行翻译"
         )
         self.pre_result = result
         
+        if result["returncode"] == EXIT_CANCELLED:
+            print("翻译已被新的截图取代", file=sys.stderr)
+            return EXIT_CANCELLED
         if result["returncode"] == 0:
             print("翻译成功", file=sys.stderr)
             print(result["stdout"].strip(), file=sys.stderr)
@@ -163,10 +213,11 @@ class ScreenshotTranslator:
         print("=" * 50, file=sys.stderr)
         
         gui_script = self.base_dir / "translate_gui.py"
-        result = self.run_command_no_timeout(
-            [sys.executable, str(gui_script)],
-            "执行显示结果"
-        )
+        command = [sys.executable, str(gui_script)]
+        # 快速档的结果有精修任务时，结果窗口在后台取精修结果，文字有变化时更新并重新翻译
+        if self.refine_id:
+            command.append(f"--refine-id={self.refine_id}")
+        result = self.run_command_no_timeout(command, "执行显示结果")
         self.pre_result = result
         
         if result["returncode"] == 0:
@@ -219,9 +270,15 @@ class ScreenshotTranslator:
         """运行完整的截图翻译流程"""
         print(f"启动截图翻译工具", file=sys.stderr)
         print(f"工作目录: {self.base_dir}", file=sys.stderr)
+        print(f"作业id: {self.job_id}", file=sys.stderr)
+        if self.supersede:
+            self.begin_job()
         
         # 步骤1: 截图
-        if self.step1_screenshot() != 0:
+        code = self.step1_screenshot()
+        if code == EXIT_CANCELLED:
+            return EXIT_CANCELLED
+        if code != 0:
             print("截图步骤失败，终止流程", file=sys.stderr)
             return -1
         
@@ -229,10 +286,13 @@ class ScreenshotTranslator:
         if self.step2_ocr() != 0:
             print("OCR步骤失败，终止流程", file=sys.stderr)
             return -1
-        ocr_text = self.pre_result["stdout"].strip()
+        ocr_text = self.ocr_text
         
-        # 步骤3: 翻译
-        if self.step3_translate(self.pre_result["stdout"]) != 0:
+        # 步骤3: 翻译，被新的截图取代时不再显示结果
+        code = self.step3_translate(ocr_text)
+        if code == EXIT_CANCELLED:
+            return EXIT_CANCELLED
+        if code != 0:
             print("翻译步骤失败", file=sys.stderr)
             return -1
         translated_text = self.pre_result["stdout"].strip()
@@ -254,7 +314,11 @@ class ScreenshotTranslator:
 def main():
     """主函数"""
     try:
-        translator = ScreenshotTranslator()
+        # --job-id=<id> 指定作业id(默认随机生成)，--supersede 表示取代之前未完成的截图翻译，
+        # --lang=<语言> 指定识别语言(界面上的语言名、OCR语言代码或auto)
+        job_id = next((arg.split("=", 1)[1] for arg in sys.argv[1:] if arg.startswith("--job-id=")), None)
+        ocr_lang = next((arg.split("=", 1)[1] for arg in sys.argv[1:] if arg.startswith("--lang=")), None)
+        translator = ScreenshotTranslator(job_id=job_id, supersede="--supersede" in sys.argv[1:], ocr_lang=ocr_lang)
         result = translator.run()
         sys.exit(result)
     except KeyboardInterrupt:
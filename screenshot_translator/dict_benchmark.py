@@ -0,0 +1,97 @@
+# coding: utf-8
+"""词典查询微基准
+
+从词典中随机抽取一批单词(另加一部分查不到的词)，分别用每次查询新开连接的旧方式、
+StarDictSQLite 的常驻只读连接，以及 dict_build.py 生成的优化副本(存在时)查询，比较每秒查询数：
+
+    python dict_benchmark.py [词典路径] [--lookups 20000] [--threads 2]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, List
+
+from stardict import DEFAULT_DB_PATH, LOOKUP_SQL, StarDictSQLite, optimized_path
+
+# 抽样单词中查不到的词所占比例，模拟OCR识别错误的单词
+MISS_RATIO = 0.1
+
+
+def sample_words(db_path: str, count: int, seed: int = 0) -> List[str]:
+    """按rowid随机抽样，不扫描整张表"""
+    conn = sqlite3.connect(db_path)
+    try:
+        max_id = conn.execute("SELECT MAX(rowid) FROM stardict").fetchone()[0] or 0
+        rng = random.Random(seed)
+        words = []
+        while len(words) < count * (1 - MISS_RATIO) and max_id:
+            row = conn.execute("SELECT word FROM stardict WHERE rowid = ?", (rng.randint(1, max_id),)).fetchone()
+            if row and row[0]:
+                words.append(row[0])
+    finally:
+        conn.close()
+    words += [f"zzq{i}xq" for i in range(count - len(words))]
+    rng.shuffle(words)
+    return words
+
+
+def lookup_per_connection(db_path: str) -> Callable[[str], object]:
+    """改动前的查询方式：每次查询打开、关闭一个新连接"""
+    def lookup(word: str):
+        conn = sqlite3.connect(db_path)
+        try:
+            return conn.execute(LOOKUP_SQL, (word.lower(), word.lower())).fetchone()
+        finally:
+            conn.close()
+    return lookup
+
+
+def measure(lookup: Callable[[str], object], words: List[str], threads: int) -> float:
+    """多个线程分摊查询这批单词，返回每秒查询数"""
+    chunks = [words[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=lambda chunk=chunk: [lookup(word) for word in chunk]) for chunk in chunks]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return len(words) / (time.perf_counter() - start)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="词典查询微基准")
+    parser.add_argument("db_path", nargs="?", default=DEFAULT_DB_PATH, help="词典数据库路径")
+    parser.add_argument("--lookups", type=int, default=20000, help="查询次数")
+    parser.add_argument("--threads", type=int, default=2, help="并发查询的线程数，默认与服务端词典通道的线程数一致")
+    args = parser.parse_args(argv)
+
+    words = sample_words(args.db_path, args.lookups)
+    if not words:
+        print("词典中没有可用的单词")
+        return 1
+
+    dictionaries = [StarDictSQLite(args.db_path)]
+    candidates = [("每次新开连接", lookup_per_connection(args.db_path)), ("常驻只读连接", dictionaries[0].lookup_word)]
+    if os.path.exists(optimized_path(args.db_path)):
+        dictionaries.append(StarDictSQLite(optimized_path(args.db_path)))
+        candidates.append(("优化副本", dictionaries[-1].lookup_word))
+
+    baseline = None
+    for name, lookup in candidates:
+        # 先跑一轮预热操作系统的文件缓存，各种方式在同样的条件下计时
+        measure(lookup, words[:1000], args.threads)
+        rate = measure(lookup, words, args.threads)
+        baseline = baseline or rate
+        print(f"{name}: {rate:.0f} 次/秒 (x{rate / baseline:.1f}，{args.lookups} 次查询, {args.threads} 个线程)")
+    for dictionary in dictionaries:
+        dictionary.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+# coding: utf-8
+"""生成ECDICT词典的只读优化副本
+
+ECDICT原始的 stardict.db 按 `word = ? OR sw = ?` 查询，OR条件在索引不全时会退化成全表扫描，
+每次还要读出包括 detail 在内的全部15个字段。本脚本生成一份查询专用的副本：
+
+- lookup 表 (规范化键, 匹配类型, id) 为 WITHOUT ROWID 表，主键即覆盖索引，一次B树查找得到id
+- entry 表只放显示用的热字段，sw、exchange、detail、audio 等冷字段放在 entry_cold 表
+- 生成后执行 ANALYZE 和 VACUUM，页面紧凑，查询计划稳定
+
+服务端和 dictionary_try.py 在副本存在且不比原词典旧时自动使用副本。更新词典后重新运行：
+
+    python dict_build.py [原词典路径] [--output 副本路径]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List
+
+from stardict import (COLD_FIELDS, DEFAULT_DB_PATH, HOT_FIELDS, OPTIMIZED_LAYOUT, StarDictSQLite,
+                      normalize_key, optimized_path)
+
+SCHEMA = [
+    "CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID",
+    "CREATE TABLE entry (id INTEGER PRIMARY KEY, word TEXT NOT NULL, phonetic TEXT, definition TEXT, "
+    "translation TEXT, pos TEXT, collins INTEGER, oxford INTEGER, tag TEXT, bnc INTEGER, frq INTEGER)",
+    "CREATE TABLE entry_cold (id INTEGER PRIMARY KEY, sw TEXT, exchange TEXT, detail TEXT, audio TEXT)",
+    # rank 0 为单词本身，rank 1 为去掉标点的 sw，与原来 word = ? OR sw = ? 的匹配范围相同
+    "CREATE TABLE lookup (key TEXT NOT NULL, rank INTEGER NOT NULL, id INTEGER NOT NULL, "
+    "PRIMARY KEY (key, rank, id)) WITHOUT ROWID",
+]
+
+
+def build(source: str, output: str) -> Dict[str, Any]:
+    """从原词典生成优化副本，先写临时文件，完成后替换，返回统计信息"""
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"词典文件不存在: {source}")
+    temp = output + ".tmp"
+    if os.path.exists(temp):
+        os.remove(temp)
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(temp)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.create_function("normalize_key", 1, normalize_key, deterministic=True)
+        conn.execute("ATTACH DATABASE ? AS src", (source,))
+        for statement in SCHEMA:
+            conn.execute(statement)
+
+        conn.execute(f"INSERT INTO entry SELECT {', '.join(HOT_FIELDS)} FROM src.stardict ORDER BY id")
+        conn.execute(f"INSERT INTO entry_cold SELECT id, {', '.join(COLD_FIELDS)} FROM src.stardict ORDER BY id")
+        # 按主键顺序插入，WITHOUT ROWID 表的B树页面填得更满
+        conn.execute(
+            "INSERT OR IGNORE INTO lookup SELECT key, rank, id FROM ("
+            "SELECT normalize_key(word) AS key, 0 AS rank, id FROM src.stardict "
+            "UNION ALL "
+            "SELECT normalize_key(sw), 1, id FROM src.stardict WHERE sw IS NOT NULL AND sw <> '' "
+            "AND normalize_key(sw) <> normalize_key(word)"
+            ") ORDER BY key, rank, id"
+        )
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("entry", "entry_cold", "lookup")}
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("layout", OPTIMIZED_LAYOUT),
+            ("source", os.path.abspath(source)),
+            ("source_size", str(os.path.getsize(source))),
+            ("built", time.strftime("%Y-%m-%d %H:%M:%S")),
+        ])
+        conn.commit()
+        conn.execute("DETACH DATABASE src")
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        conn.close()
+
+    os.replace(temp, output)
+    return dict(
+        counts,
+        seconds=round(time.perf_counter() - start, 1),
+        source_mb=round(os.path.getsize(source) / 1024 / 1024, 1),
+        output_mb=round(os.path.getsize(output) / 1024 / 1024, 1),
+    )
+
+
+def verify(source: str, output: str, samples: int = 1000, seed: int = 0) -> List[str]:
+    """随机抽样比较原词典和副本的查询结果，返回不一致的单词
+
+    原词典的 OR 查询在单词本身和别的单词的 sw 都匹配时返回哪一个不确定，副本总是优先单词本身，这种情况不比较
+    """
+    original, optimized = StarDictSQLite(source), StarDictSQLite(output)
+    try:
+        with original.get_connection() as conn:
+            max_id = conn.execute("SELECT MAX(rowid) FROM stardict").fetchone()[0] or 0
+            rng = random.Random(seed)
+            words = [row[0] for row in (conn.execute("SELECT word FROM stardict WHERE rowid = ?",
+                                                     (rng.randint(1, max_id),)).fetchone()
+                                        for _ in range(samples if max_id else 0)) if row]
+        mismatches = []
+        for word in words:
+            expected, actual = original.lookup_word(word), optimized.lookup_word(word, cold=True)
+            if expected is not None and normalize_key(expected["word"]) != normalize_key(word):
+                continue
+            if expected != actual:
+                mismatches.append(word)
+        return mismatches
+    finally:
+        original.close()
+        optimized.close()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="生成ECDICT词典的只读优化副本")
+    parser.add_argument("source", nargs="?", default=DEFAULT_DB_PATH, help="原词典路径")
+    parser.add_argument("--output", default=None, help="副本路径，默认与原词典同目录的 *.opt.db")
+    parser.add_argument("--verify", type=int, default=1000, help="生成后抽样比较的单词数，0为不比较")
+    args = parser.parse_args(argv)
+
+    output = args.output or optimized_path(args.source)
+    stats = build(args.source, output)
+    print(f"已生成: {output} (耗时 {stats['seconds']}s)")
+    print(f"单词 {stats['entry']} 个，冷字段 {stats['entry_cold']} 行，查询键 {stats['lookup']} 个")
+    print(f"文件大小 {stats['source_mb']}MB -> {stats['output_mb']}MB")
+
+    if args.verify:
+        mismatches = verify(args.source, output, args.verify)
+        if mismatches:
+            print(f"抽样比较发现 {len(mismatches)} 个不一致的单词: {', '.join(mismatches[:10])}")
+            return 1
+        print(f"抽样比较 {args.verify} 个单词，结果一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
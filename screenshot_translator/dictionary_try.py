@@ -1,11 +1,15 @@
 import sqlite3
 import os
 from typing import List, Dict, Optional
+from stardict import (LOOKUP_FIELDS, LOOKUP_SQL, OPT_LOOKUP_FULL_SQL, OPT_PREFIX_SQL, PREFIX_SQL, is_optimized,
+                      normalize_key, resolve_db_path)
 
 class StarDictSQLite:
     def __init__(self, db_path: str):
-        self.db_path = db_path
+        # dict_build.py 生成的优化副本存在时使用副本
+        self.db_path = resolve_db_path(db_path)
         self.conn = None
+        self.optimized = False
         self._connect()
     
     def _connect(self):
@@ -14,22 +18,18 @@ class StarDictSQLite:
             raise FileNotFoundError(f"数据库文件不存在: {self.db_path}")
         
         self.conn = sqlite3.connect(self.db_path)
-        print(f"成功连接数据库: {self.db_path}")
+        self.optimized = is_optimized(self.conn)
+        print(f"成功连接数据库: {self.db_path}{' (优化副本)' if self.optimized else ''}")
     
     def lookup_word(self, word: str) -> Optional[Dict]:
         """查询单词的完整信息"""
-        cursor = self.conn.cursor()
-        
-        cursor.execute(
-            "SELECT id, word, sw, phonetic, definition, translation, pos, collins, oxford, tag, bnc, frq, exchange, detail, audio FROM stardict WHERE word = ? OR sw = ?",
-            (word.lower(), word.lower())
-        )
-        
-        result = cursor.fetchone()
+        key = normalize_key(word)
+        if self.optimized:
+            result = self.conn.execute(OPT_LOOKUP_FULL_SQL, (key,)).fetchone()
+        else:
+            result = self.conn.execute(LOOKUP_SQL, (key, key)).fetchone()
         if result:
-            fields = ['id', 'word', 'sw', 'phonetic', 'definition', 'translation', 
-                     'pos', 'collins', 'oxford', 'tag', 'bnc', 'frq', 'exchange', 'detail', 'audio']
-            return dict(zip(fields, result))
+            return dict(zip(LOOKUP_FIELDS, result))
         return None
     
     def _parse_pos_distribution(self, pos_str: str) -> Dict[str, int]:
@@ -142,12 +142,12 @@ class StarDictSQLite:
     
     def search_similar_words(self, pattern: str, limit: int = 10) -> List[str]:
         """搜索相似的单词"""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT word FROM stardict WHERE word LIKE ? LIMIT ?",
-            (f"{pattern}%", limit)
-        )
-        return [row[0] for row in cursor.fetchall()]
+        if self.optimized:
+            prefix = normalize_key(pattern)
+            rows = self.conn.execute(OPT_PREFIX_SQL, (prefix, prefix + "\U0010ffff", limit)).fetchall()
+        else:
+            rows = self.conn.execute(PREFIX_SQL, (f"{pattern}%", limit)).fetchall()
+        return [row[0] for row in rows]
     
     def get_word_family(self, word: str) -> Dict:
         """获取单词的变形形式"""
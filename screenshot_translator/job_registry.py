@@ -0,0 +1,121 @@
+# coding: utf-8
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class JobCancelled(RuntimeError):
+    """作业已被取消(通常是被同一客户端新的截图取代)"""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"作业 {job_id} 已被取消")
+        self.job_id = job_id
+
+
+class _Job:
+    def __init__(self, group: str):
+        self.group = group
+        self.created = time.time()
+        self.cancelled = False
+        self.pending = set()
+
+
+class JobRegistry:
+    """截图翻译流程的作业登记
+
+    一次截图翻译(截图 -> OCR -> 翻译)的所有请求带同一个作业id。新作业带 supersede 标记时，
+    同一分组中之前的作业全部取消：已排队还没开始的任务直接丢弃，之后再带着这些id来的请求不再计算。
+    已经开始执行的任务不会被中断，只是结果不再被使用。作业超过 ttl 秒或数量超过上限时遗忘最早的。
+    """
+
+    def __init__(self, ttl: float = 600, max_jobs: int = 1024):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, _Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"jobs": 0, "cancelled": 0, "dropped_tasks": 0, "rejected_requests": 0}
+
+    def _expire(self):
+        now = time.time()
+        while self._jobs:
+            job = next(iter(self._jobs.values()))
+            if len(self._jobs) <= self.max_jobs and now - job.created < self.ttl:
+                break
+            self._jobs.popitem(last=False)
+
+    def begin(self, job_id: Optional[str], group: str = "capture", supersede: bool = False) -> List[str]:
+        """登记作业(已登记的作业重复调用无影响)，supersede 时取消同组之前的作业，返回被取消的作业id"""
+        if not job_id:
+            return []
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            if job is None:
+                job = self._jobs[job_id] = _Job(group)
+                self._counts["jobs"] += 1
+            if not supersede or job.cancelled:
+                return []
+            superseded = [other_id for other_id, other in self._jobs.items()
+                          if other_id != job_id and other.group == group and not other.cancelled]
+        for other_id in superseded:
+            self.cancel(other_id)
+        if superseded:
+            print(f"作业 {job_id} 取代了之前的作业: {', '.join(superseded)}")
+        return superseded
+
+    def cancel(self, job_id: Optional[str]) -> bool:
+        """取消作业并丢弃它已排队的任务，作业不存在或已取消时返回False"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.cancelled:
+                return False
+            job.cancelled = True
+            pending = list(job.pending)
+            job.pending.clear()
+            self._counts["cancelled"] += 1
+        # 只有还没开始执行的任务能取消成功
+        dropped = sum(1 for future in pending if future.cancel())
+        with self._lock:
+            self._counts["dropped_tasks"] += dropped
+        return True
+
+    def is_cancelled(self, job_id: Optional[str]) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job is not None and job.cancelled
+
+    def check(self, job_id: Optional[str]):
+        """作业已取消时抛出 JobCancelled"""
+        if self.is_cancelled(job_id):
+            with self._lock:
+                self._counts["rejected_requests"] += 1
+            raise JobCancelled(job_id)
+
+    def track(self, job_id: Optional[str], future):
+        """登记属于该作业的任务(Future)，作业取消时一并取消"""
+        if not job_id or future is None:
+            return
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not job.cancelled:
+                job.pending.add(future)
+                cancelled = False
+            else:
+                cancelled = job is not None
+        if cancelled:
+            future.cancel()
+            return
+        future.add_done_callback(lambda done: self._untrack(job_id, done))
+
+    def _untrack(self, job_id: str, future):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.pending.discard(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if not job.cancelled)
+            return dict(self._counts, active=active, tracked=len(self._jobs))
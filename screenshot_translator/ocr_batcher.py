@@ -0,0 +1,164 @@
+# coding: utf-8
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+
+class OCRBatcher:
+    """OCR动态微批处理
+
+    几毫秒内先后到达的请求合并成一次 predict(图片列表) 调用，再把每张图片的结果
+    分别还给各自的调用方。只有请求在排队、且其余分发线程和工作进程都在忙(立即下发也要排队)时
+    才会等待凑批，有空闲的分发线程或工作进程时立即下发，不增加单请求延迟。
+    idle_workers 返回下游空闲的工作进程数，不提供时只看分发线程。
+    """
+
+    def __init__(self, predict_fn: Callable[[List[Any]], List[Dict]], max_batch_size: int = 8,
+                 max_wait: float = 0.01, num_dispatchers: int = 1,
+                 idle_workers: Optional[Callable[[], int]] = None):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait))
+        self.num_dispatchers = max(1, int(num_dispatchers))
+        self.idle_workers = idle_workers
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._active = 0
+        self._batches = 0
+        self._items = 0
+        self._max_seen = 0
+        self._batch_sizes = {}
+        self._closed = False
+        self._threads = []
+        for i in range(self.num_dispatchers):
+            thread = threading.Thread(target=self._dispatch_loop, name=f"ocr-batcher-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit_async(self, image) -> Future:
+        """提交一张图片，返回对应结果的Future"""
+        if self._closed:
+            raise RuntimeError("OCR批处理已关闭")
+        future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def submit(self, image, timeout: float = None) -> Dict:
+        """提交一张图片并等待它自己的识别结果"""
+        return self.submit_async(image).result(timeout=timeout)
+
+    def close(self):
+        """停止分发线程，已提交的请求仍会处理完"""
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+
+    def _take(self, item, batch: list) -> bool:
+        """把取到的请求放入批次；取到关闭标记时放回队列，返回False结束凑批"""
+        if item is None:
+            self._queue.put(None)
+            return False
+        batch.append(item)
+        return True
+
+    def _collect_batch(self) -> list:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+
+        # 先取走已经排队的请求
+        while len(batch) < self.max_batch_size:
+            try:
+                if not self._take(self._queue.get_nowait(), batch):
+                    return batch
+            except queue.Empty:
+                break
+
+        if self._should_wait(batch):
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    if not self._take(self._queue.get(timeout=remaining), batch):
+                        break
+                except queue.Empty:
+                    break
+        return batch
+
+    def _should_wait(self, batch: list) -> bool:
+        """取第一个请求时后面还有请求在排队(突发负载)，而其余分发线程都在推理、
+        也没有空闲的工作进程时，立即下发只会在下游排队，这时才稍等片刻凑更大的批"""
+        if self.max_wait <= 0 or len(batch) < 2 or len(batch) >= self.max_batch_size:
+            return False
+        with self._lock:
+            dispatcher_idle = self._active < self.num_dispatchers - 1
+        if dispatcher_idle:
+            return False
+        return self.idle_workers is None or self.idle_workers() == 0
+
+    def _dispatch_loop(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                break
+            # 已被调用方取消的请求不再送去推理
+            batch = [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            with self._lock:
+                self._active += 1
+                self._record(len(batch))
+            try:
+                self._run_batch(batch)
+            finally:
+                with self._lock:
+                    self._active -= 1
+
+    def _run_batch(self, batch: list):
+        images = [image for image, _ in batch]
+        try:
+            results = self.predict_fn(images)
+            if len(results) != len(images):
+                raise RuntimeError(f"批量OCR结果数量不一致: {len(results)} != {len(images)}")
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # 整批失败时逐张重试，避免一张坏图拖累同批的其他请求
+            for image, future in batch:
+                try:
+                    future.set_result(self.predict_fn([image])[0])
+                except Exception as single_error:
+                    future.set_exception(single_error)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _record(self, size: int):
+        self._batches += 1
+        self._items += size
+        self._max_seen = max(self._max_seen, size)
+        self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """批处理统计"""
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+                "queued": self._queue.qsize(),
+                "active_batches": self._active,
+                "batches": self._batches,
+                "requests": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "largest_batch": self._max_seen,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            }
@@ -0,0 +1,217 @@
+# coding: utf-8
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# 一张图片的缓存键：精确哈希 + 两种感知哈希 + 尺寸 + 灰度图(感知匹配时逐像素核对，磁盘层不保存)
+CacheKey = namedtuple("CacheKey", ["exact", "dhash", "phash", "height", "width", "gray"], defaults=(None,))
+
+_HASH_MASK = (1 << 64) - 1
+
+
+def _to_gray(image: np.ndarray) -> np.ndarray:
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel().astype(np.uint8)).tobytes(), "big")
+
+
+def dhash(gray: np.ndarray) -> int:
+    """差值哈希：缩放到9x8，比较相邻像素的亮度"""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def phash(gray: np.ndarray) -> int:
+    """DCT感知哈希：32x32的低频8x8系数与中位数比较"""
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].ravel()
+    return _bits_to_int(low > np.median(low[1:]))
+
+
+def image_digest(image: np.ndarray) -> str:
+    """图片尺寸和像素内容的摘要，像素完全相同时才相同"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(image.shape).encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+def image_key(image: np.ndarray, perceptual: bool = True) -> CacheKey:
+    """计算图片的缓存键；perceptual 为假时只计算精确哈希，不计算感知哈希也不保留灰度图"""
+    if not perceptual:
+        return CacheKey(image_digest(image), 0, 0, image.shape[0], image.shape[1])
+    gray = _to_gray(image)
+    return CacheKey(image_digest(image), dhash(gray), phash(gray), image.shape[0], image.shape[1], gray)
+
+
+def _signed(value: int) -> int:
+    """SQLite的INTEGER是有符号64位"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _unsigned(value: int) -> int:
+    return value & _HASH_MASK
+
+
+class OCRResultCache:
+    """内容寻址的OCR结果缓存
+
+    先按精确哈希查找，未命中时在尺寸相同的条目里按dHash和pHash的汉明距离找候选。
+    8x8的感知哈希分辨不出改了一个字符的对话框，所以候选还要与保存的灰度图逐像素核对，
+    只有差异都在 pixel_tolerance 以内(压缩噪声、抗锯齿)的才算命中，感知哈希本身不决定识别结果。
+    内存层是按条目数和字节数双重限制的LRU，可选的SQLite磁盘层在重启后依然有效(只用于精确匹配)。
+    perceptual 为假时只做精确匹配，缓存键不计算感知哈希、不保存灰度图，内存预算全部留给识别结果。
+    """
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 32 * 1024 * 1024,
+                 max_distance: int = 3, disk_path: Optional[str] = None, disk_preload: int = 512,
+                 pixel_tolerance: int = 24, max_candidates: int = 4, perceptual: bool = True):
+        self.max_entries = max_entries
+        self.perceptual = perceptual
+        self.max_bytes = max_bytes
+        self.max_distance = max_distance
+        self.pixel_tolerance = pixel_tolerance
+        self.max_candidates = max_candidates
+        self._entries = OrderedDict()  # exact -> (CacheKey, result, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counts = {"exact_hits": 0, "perceptual_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._db = None
+        if disk_path:
+            self._open_disk(disk_path, disk_preload)
+
+    def _open_disk(self, disk_path: str, preload: int):
+        os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+        self._db = sqlite3.connect(disk_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache ("
+            "exact TEXT PRIMARY KEY, dhash INTEGER, phash INTEGER, height INTEGER, width INTEGER, "
+            "result TEXT, used REAL)"
+        )
+        self._db.commit()
+
+        # 最近使用的条目预加载到内存层，重启后的精确匹配不用再查磁盘
+        rows = self._db.execute(
+            "SELECT exact, dhash, phash, height, width, result FROM ocr_cache ORDER BY used DESC LIMIT ?",
+            (preload,),
+        ).fetchall()
+        for exact, dh, ph, height, width, result in reversed(rows):
+            key = CacheKey(exact, _unsigned(dh), _unsigned(ph), height, width)
+            self._store(key, json.loads(result), len(result))
+
+    def key(self, image: np.ndarray) -> CacheKey:
+        return image_key(image, self.perceptual)
+
+    def get(self, key: CacheKey) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """查找缓存，返回 (结果, 命中类型)，命中类型为 exact/perceptual/disk"""
+        with self._lock:
+            entry = self._entries.get(key.exact)
+            if entry is not None:
+                self._entries.move_to_end(key.exact)
+                self._counts["exact_hits"] += 1
+                return entry[1], "exact"
+
+            match = self._find_similar(key) if self.perceptual else None
+            if match is not None:
+                self._entries.move_to_end(match)
+                self._counts["perceptual_hits"] += 1
+                return self._entries[match][1], "perceptual"
+
+            if self._db is not None:
+                row = self._db.execute("SELECT result FROM ocr_cache WHERE exact = ?", (key.exact,)).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._store(key, result, len(row[0]))
+                    self._counts["disk_hits"] += 1
+                    return result, "disk"
+
+            self._counts["misses"] += 1
+        return None, None
+
+    def _find_similar(self, key: CacheKey) -> Optional[str]:
+        if self.max_distance < 0 or key.gray is None:
+            return None
+        candidates = []
+        for exact, (other, _, _) in self._entries.items():
+            if other.gray is None or other.height != key.height or other.width != key.width:
+                continue
+            # 两种哈希都足够接近的才逐像素核对
+            distance = max((other.dhash ^ key.dhash).bit_count(), (other.phash ^ key.phash).bit_count())
+            if distance <= self.max_distance:
+                candidates.append((distance, exact, other.gray))
+        candidates.sort(key=lambda candidate: candidate[0])
+        for _, exact, gray in candidates[:self.max_candidates]:
+            if self.same_pixels(gray, key.gray):
+                return exact
+        return None
+
+    def same_pixels(self, a: np.ndarray, b: np.ndarray) -> bool:
+        """两张灰度图的每个像素差异都不超过 pixel_tolerance"""
+        return a.shape == b.shape and not np.any(cv2.absdiff(a, b) > self.pixel_tolerance)
+
+    def peek(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        """只按精确哈希查找内存层和磁盘层，不计入命中统计，也不调整LRU顺序"""
+        with self._lock:
+            entry = self._entries.get(key.exact)
+            if entry is not None:
+                return entry[1]
+            if self._db is not None:
+                row = self._db.execute("SELECT result FROM ocr_cache WHERE exact = ?", (key.exact,)).fetchone()
+                if row is not None:
+                    return json.loads(row[0])
+        return None
+
+    def put(self, key: CacheKey, result: Dict[str, Any]):
+        """写入缓存，同时写入磁盘层"""
+        payload = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._store(key, result, len(payload))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO ocr_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key.exact, _signed(key.dhash), _signed(key.phash), key.height, key.width, payload, time.time()),
+                )
+                self._db.commit()
+
+    def _store(self, key: CacheKey, result: Dict[str, Any], size: int):
+        if key.gray is not None:
+            size += key.gray.nbytes
+        old = self._entries.pop(key.exact, None)
+        if old is not None:
+            self._bytes -= old[2]
+        self._entries[key.exact] = (key, result, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        with self._lock:
+            hits = self._counts["exact_hits"] + self._counts["perceptual_hits"] + self._counts["disk_hits"]
+            total = hits + self._counts["misses"]
+            return dict(
+                self._counts,
+                hit_ratio=round(hits / total, 3) if total else 0.0,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                disk=self._db is not None,
+            )
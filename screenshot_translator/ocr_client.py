@@ -8,11 +8,79 @@ if sys.stdout.encoding != 'utf-8':
     print(sys.stdout.encoding, file=sys.stderr)
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
+OCR_URL = "http://127.0.0.1:5000/ocr"
+
+# 界面上的源语言对应的OCR语言代码，auto 表示由服务端按文字类别自动选择
+GUI_LANG_CODES = {"英文": "en", "中文": "ch", "日文": "japan"}
+
 def image_to_base64(image_path):
     """图片转base64"""
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode('utf-8')
 
+def ocr_params(structured, quality, lang=None, job_id=None, supersede=False):
+    """OCR请求的URL参数"""
+    params = {}
+    if structured:
+        params["structured"] = 1
+    if quality:
+        params["quality"] = quality
+    if lang:
+        params["lang"] = GUI_LANG_CODES.get(lang, lang)
+    # 作业id把同一次截图翻译的请求串起来，supersede 表示取代之前未完成的截图
+    if job_id:
+        params["job_id"] = job_id
+    if supersede:
+        params["supersede"] = 1
+    return params or None
+
+def ocr_image_file(image_path, structured=True, timeout=30, quality=None, lang=None, job_id=None, supersede=False):
+    """上传图片文件内容进行OCR，服务端直接在内存中解码
+
+    structured 为真时服务端按阅读顺序分段，文本以换行分隔段落；
+    quality 可选 fast/accurate/progressive，lang 可选 en/ch/chinese_cht/japan/auto 或界面上的语言名，
+    不指定时使用服务端默认值
+    """
+    params = ocr_params(structured, quality, lang, job_id, supersede)
+    with open(image_path, "rb") as image_file:
+        files = {"image": (os.path.basename(image_path), image_file, "application/octet-stream")}
+        response = requests.post(OCR_URL, files=files, params=params, timeout=timeout)
+    return response.json()
+
+def ocr_raw_image(buffer, width, height, channels=4, pixel_format="bgra", structured=True, timeout=30, quality=None,
+                  lang=None, job_id=None, supersede=False):
+    """直接发送原始像素缓冲区进行OCR，不经过PNG编码和磁盘"""
+    params = ocr_params(structured, quality, lang, job_id, supersede)
+    headers = {
+        "Content-Type": "application/octet-stream",
+        "X-Image-Shape": f"{height},{width},{channels}",
+        "X-Image-Format": pixel_format,
+    }
+    response = requests.post(OCR_URL, data=bytes(buffer), headers=headers, params=params, timeout=timeout)
+    return response.json()
+
+def get_refined(refine_id, wait=10, structured=True):
+    """查询精修任务，最多等待 wait 秒，返回服务端的结果，state 为 pending/done/failed/cancelled"""
+    params = {"wait": wait}
+    if structured:
+        params["structured"] = 1
+    try:
+        response = requests.get(f"{OCR_URL}/refined/{refine_id}", params=params, timeout=wait + 5)
+        return response.json()
+    except requests.RequestException as e:
+        print(f"获取精修结果失败: {e}", file=sys.stderr)
+        return {"success": False, "state": "failed", "error": str(e)}
+
+def fetch_refined(ocr_result, wait=10, structured=True):
+    """progressive模式下等待精修结果，没有精修任务或精修失败时返回原结果"""
+    refine_id = ocr_result.get("refine_id")
+    if not refine_id:
+        return ocr_result
+    refined = get_refined(refine_id, wait, structured)
+    if refined.get("state") != "done":
+        return ocr_result
+    return refined
+
 def main(image_path):
     if not os.path.exists(image_path):
         print("识别失败：图片文件不存在", file=sys.stderr)
@@ -21,11 +89,7 @@ def main(image_path):
     try:
         # OCR识别
         print("正在OCR识别...", file=sys.stderr)
-        ocr_data = {
-            "image": image_path
-        }
-        ocr_response = requests.post("http://127.0.0.1:5000/ocr", json=ocr_data)
-        ocr_result = ocr_response.json()
+        ocr_result = ocr_image_file(image_path)
         
         if not ocr_result["success"]:
             print(f"OCR识别失败：{ocr_result['error']}", file=sys.stderr)
@@ -0,0 +1,126 @@
+# coding: utf-8
+
+import time
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+
+# 默认的OCR模型参数，与原先服务端的单实例保持一致
+DEFAULT_OCR_KWARGS = {
+    "use_doc_orientation_classify": False,
+    "use_doc_unwarping": False,
+    "use_textline_orientation": False,
+    "device": "cpu",
+    "lang": "en",
+}
+
+# 与PaddleOCR按语言选择的识别模型保持一致，仅识别的快速路径使用同一个模型
+REC_MODEL_NAMES = {
+    "en": "en_PP-OCRv5_mobile_rec",
+    "ch": "PP-OCRv5_server_rec",
+    "chinese_cht": "PP-OCRv5_server_rec",
+    "japan": "PP-OCRv5_server_rec",
+}
+
+# 模型档位：fast 为轻量的mobile检测+识别模型，accurate 为server检测模型(即原先的默认配置)
+TIER_DET_MODEL_NAMES = {
+    "fast": "PP-OCRv5_mobile_det",
+    "accurate": "PP-OCRv5_server_det",
+}
+TIER_REC_MODEL_NAMES = {
+    "fast": {"en": "en_PP-OCRv5_mobile_rec", "ch": "PP-OCRv5_mobile_rec",
+             "chinese_cht": "PP-OCRv5_mobile_rec", "japan": "PP-OCRv5_mobile_rec"},
+    "accurate": REC_MODEL_NAMES,
+}
+
+# 检测/识别模型共用的推理参数
+_COMMON_ARG_NAMES = ("device", "enable_hpi", "use_tensorrt", "precision", "enable_mkldnn",
+                     "mkldnn_cache_capacity", "cpu_threads", "enable_cinn")
+
+
+def _to_list(value) -> list:
+    """numpy数组/列表统一转换为可序列化的列表"""
+    if value is None:
+        return []
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return [v.tolist() if hasattr(v, "tolist") else v for v in value]
+
+
+def simplify_result(res) -> Dict[str, list]:
+    """把PaddleOCR的结果对象转换为可跨进程传递的普通字典"""
+    return {
+        "rec_texts": list(res["rec_texts"]) if "rec_texts" in res else [],
+        "rec_scores": _to_list(res["rec_scores"]) if "rec_scores" in res else [],
+        "rec_boxes": _to_list(res["rec_boxes"]) if "rec_boxes" in res else [],
+        "rec_polys": _to_list(res["rec_polys"]) if "rec_polys" in res else [],
+    }
+
+
+def tier_ocr_kwargs(tier: str, ocr_kwargs: Dict[str, Any] = None) -> Dict[str, Any]:
+    """按档位补上检测/识别模型名，已显式指定模型名时保持不变"""
+    kwargs = dict(DEFAULT_OCR_KWARGS, **(ocr_kwargs or {}))
+    lang = kwargs.get("lang")
+    kwargs.setdefault("text_detection_model_name", TIER_DET_MODEL_NAMES[tier])
+    kwargs.setdefault("text_recognition_model_name",
+                      TIER_REC_MODEL_NAMES[tier].get(lang, TIER_REC_MODEL_NAMES[tier]["ch"]))
+    return kwargs
+
+
+def make_warmup_image() -> np.ndarray:
+    """生成一张带文字的小图用于预热模型"""
+    image = np.full((48, 320, 3), 255, dtype=np.uint8)
+    cv2.putText(image, "Warm up OCR 123", (8, 34), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+    return image
+
+
+class OCREngine:
+    """持有PaddleOCR模型的推理引擎，运行在工作进程内"""
+
+    def __init__(self, ocr_kwargs: Dict[str, Any] = None):
+        from paddleocr import PaddleOCR
+
+        self.ocr_kwargs = dict(DEFAULT_OCR_KWARGS, **(ocr_kwargs or {}))
+        self.ocr = PaddleOCR(**self.ocr_kwargs)
+        self._recognizer = None
+
+    @property
+    def recognizer(self):
+        """单独的文字识别模型，首次使用时加载"""
+        if self._recognizer is None:
+            from paddleocr import TextRecognition
+
+            model_name = self.ocr_kwargs.get("text_recognition_model_name") or \
+                REC_MODEL_NAMES.get(self.ocr_kwargs.get("lang"), "PP-OCRv5_server_rec")
+            common_args = {k: v for k, v in self.ocr_kwargs.items() if k in _COMMON_ARG_NAMES}
+            self._recognizer = TextRecognition(model_name=model_name, **common_args)
+        return self._recognizer
+
+    def warmup(self) -> float:
+        """执行一次推理以完成内存分配和算子初始化，返回耗时(秒)"""
+        start = time.perf_counter()
+        self.predict(make_warmup_image())
+        self.recognize(make_warmup_image())
+        return time.perf_counter() - start
+
+    def predict(self, images) -> List[Dict[str, list]]:
+        """对单张图片或图片列表执行完整的检测+识别"""
+        result = self.ocr.predict(input=images)
+        return [simplify_result(res) for res in result]
+
+    def recognize(self, images) -> List[Dict[str, list]]:
+        """跳过文字检测，把每张图片当作一行文字直接识别"""
+        if not isinstance(images, list):
+            images = [images]
+        result = self.recognizer.predict(input=images)
+        simplified = []
+        for image, res in zip(images, result):
+            height, width = image.shape[:2]
+            simplified.append({
+                "rec_texts": [res["rec_text"]],
+                "rec_scores": [float(res["rec_score"])],
+                "rec_boxes": [[0, 0, width, height]],
+                "rec_polys": [[[0, 0], [width, 0], [width, height], [0, height]]],
+            })
+        return simplified
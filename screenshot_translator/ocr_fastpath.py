@@ -0,0 +1,49 @@
+# coding: utf-8
+
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+
+def ink_mask(gray: np.ndarray) -> np.ndarray:
+    """Otsu二值化，文字像素为True；亮底暗字和暗底亮字都取占少数的一方"""
+    _, binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    mask = binary.astype(bool)
+    return ~mask if mask.mean() > 0.5 else mask
+
+
+def single_line_box(image: np.ndarray, max_height: int = 96, min_aspect: float = 1.2,
+                    max_gap_ratio: float = 0.15, min_band_ratio: float = 0.35) -> Optional[List[int]]:
+    """判断截图是否只有一行文字(单词或短句)，是则返回文字所在的框，否则返回None
+
+    只看高度、宽高比和水平投影：投影中的文字行只有一段连续区间，且这一段
+    占据了截图高度的相当一部分，就认为可以跳过检测直接识别。
+    """
+    height, width = image.shape[:2]
+    if height > max_height or height < 8 or width / height < min_aspect:
+        return None
+
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if int(gray.max()) - int(gray.min()) < 32:
+        return None
+    mask = ink_mask(gray)
+
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if len(rows) == 0:
+        return None
+    # 投影中的空白间隔超过容差(允许i、j的点与字身之间的小缝)就说明有多行
+    if len(rows) > 1 and np.diff(rows).max() > max(2, max_gap_ratio * height) + 1:
+        return None
+    top, bottom = int(rows[0]), int(rows[-1]) + 1
+    if (bottom - top) < min_band_ratio * height:
+        return None
+    return [int(cols[0]), top, int(cols[-1]) + 1, bottom]
+
+
+def crop_line(image: np.ndarray, box: List[int], pad: int = 4) -> np.ndarray:
+    """按文字框裁剪并留出少量边距，识别模型对紧贴边缘的文字效果较差"""
+    height, width = image.shape[:2]
+    x1, y1, x2, y2 = box
+    return np.ascontiguousarray(image[max(0, y1 - pad):min(height, y2 + pad), max(0, x1 - pad):min(width, x2 + pad)])
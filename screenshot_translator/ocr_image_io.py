@@ -0,0 +1,116 @@
+# coding: utf-8
+
+import base64
+import binascii
+import os
+
+import cv2
+import numpy as np
+
+# 原始像素缓冲区的请求头: 形状为 "高,宽,通道"，格式为 bgra/rgba/bgr/rgb/gray
+SHAPE_HEADER = "X-Image-Shape"
+FORMAT_HEADER = "X-Image-Format"
+
+# 各像素格式对应的通道数和转换到BGR的方式
+_PIXEL_FORMATS = {
+    "bgra": (4, cv2.COLOR_BGRA2BGR),
+    "rgba": (4, cv2.COLOR_RGBA2BGR),
+    "rgb": (3, cv2.COLOR_RGB2BGR),
+    "bgr": (3, None),
+    "gray": (1, cv2.COLOR_GRAY2BGR),
+}
+
+
+class ImageDecodeError(ValueError):
+    """请求中的图片数据无法解码"""
+
+
+def decode_image_bytes(data: bytes) -> np.ndarray:
+    """将编码后的图片字节(PNG/JPEG/BMP等)直接在内存中解码为BGR数组"""
+    if not data:
+        raise ImageDecodeError("图片数据为空")
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ImageDecodeError("无法解码图片数据")
+    return image
+
+
+def decode_raw_buffer(data: bytes, shape: str, pixel_format: str = "bgra") -> np.ndarray:
+    """按形状头把原始像素缓冲区还原为BGR数组，形状格式为 "高,宽[,通道]" """
+    pixel_format = (pixel_format or "bgra").lower()
+    if pixel_format not in _PIXEL_FORMATS:
+        raise ImageDecodeError(f"不支持的像素格式: {pixel_format}")
+    channels, conversion = _PIXEL_FORMATS[pixel_format]
+
+    try:
+        dims = [int(v) for v in shape.replace("x", ",").split(",") if v.strip()]
+    except ValueError:
+        raise ImageDecodeError(f"无效的图片形状: {shape}")
+    if len(dims) == 2:
+        dims.append(channels)
+    if len(dims) != 3 or dims[2] != channels or dims[0] <= 0 or dims[1] <= 0:
+        raise ImageDecodeError(f"图片形状与像素格式不匹配: {shape} ({pixel_format})")
+
+    height, width, _ = dims
+    if len(data) != height * width * channels:
+        raise ImageDecodeError(f"缓冲区大小 {len(data)} 与形状 {height}x{width}x{channels} 不一致")
+
+    image = np.frombuffer(data, dtype=np.uint8).reshape(height, width, channels)
+    if conversion is None:
+        return image.copy()
+    return cv2.cvtColor(image, conversion)
+
+
+def decode_base64_image(text: str) -> np.ndarray:
+    """解码base64图片，兼容 data:image/png;base64, 前缀"""
+    if text.startswith("data:") and "," in text:
+        text = text.split(",", 1)[1]
+    try:
+        data = base64.b64decode(text, validate=False)
+    except (binascii.Error, ValueError):
+        raise ImageDecodeError("无效的base64图片数据")
+    return decode_image_bytes(data)
+
+
+def _looks_like_path(value: str) -> bool:
+    """旧客户端直接传图片路径，路径一般很短且文件存在"""
+    return len(value) < 1024 and os.path.isfile(value)
+
+
+def decode_request_image(req) -> np.ndarray:
+    """从Flask请求中取出图片并解码为BGR数组
+
+    支持以下几种传输方式:
+      1. multipart/form-data 的 image 文件字段
+      2. 原始像素缓冲区 + X-Image-Shape/X-Image-Format 请求头
+      3. Content-Type 为 image/* 的编码图片字节
+      4. JSON {"image": base64} 或 {"image": base64原始像素, "shape": "高,宽,通道", "format": "bgra"}
+      5. JSON {"image": 路径} (兼容旧客户端)
+    """
+    if req.files and "image" in req.files:
+        return decode_image_bytes(req.files["image"].read())
+
+    shape = req.headers.get(SHAPE_HEADER)
+    if shape:
+        return decode_raw_buffer(req.get_data(), shape, req.headers.get(FORMAT_HEADER, "bgra"))
+
+    if req.mimetype and req.mimetype.startswith("image/"):
+        return decode_image_bytes(req.get_data())
+
+    data = req.get_json(silent=True) or {}
+    image = data.get("image")
+    if not image or not isinstance(image, str):
+        raise ImageDecodeError("请求中没有图片数据")
+
+    if data.get("shape"):
+        try:
+            raw = base64.b64decode(image, validate=False)
+        except (binascii.Error, ValueError):
+            raise ImageDecodeError("无效的base64像素数据")
+        return decode_raw_buffer(raw, str(data["shape"]), data.get("format", "bgra"))
+
+    if _looks_like_path(image):
+        # np.fromfile 可以正确处理Windows下的中文路径
+        return decode_image_bytes(np.fromfile(image, dtype=np.uint8).tobytes())
+
+    return decode_base64_image(image)
@@ -0,0 +1,231 @@
+# coding: utf-8
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+
+def _to_gray(image: np.ndarray) -> np.ndarray:
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def _box_to_poly(box) -> List[List[int]]:
+    x1, y1, x2, y2 = box
+    return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+
+
+def _intersects(a, b) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _union(a, b) -> list:
+    return [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+
+
+def _merge_overlapping(regions: List[list]) -> List[list]:
+    """把相互重叠的矩形合并成外接矩形，直到没有重叠"""
+    merged = []
+    for region in regions:
+        region = list(region)
+        overlapping = True
+        while overlapping:
+            overlapping = False
+            for other in merged:
+                if _intersects(region, other):
+                    merged.remove(other)
+                    region = _union(region, other)
+                    overlapping = True
+                    break
+        merged.append(region)
+    return merged
+
+
+def make_result(lines: List[Tuple[list, str, float]]) -> Dict[str, list]:
+    """把 (框, 文本, 置信度) 行列表转换回 OCREngine 的结果格式"""
+    lines = sorted(lines, key=lambda line: (line[0][1], line[0][0]))
+    boxes = [list(map(int, box)) for box, _, _ in lines]
+    return {
+        "rec_texts": [text for _, text, _ in lines],
+        "rec_scores": [float(score) for _, _, score in lines],
+        "rec_boxes": boxes,
+        "rec_polys": [_box_to_poly(box) for box in boxes],
+    }
+
+
+def result_lines(result: Dict[str, list], dx: int = 0, dy: int = 0) -> List[Tuple[list, str, float]]:
+    """从OCR结果中取出 (框, 文本, 置信度)，并按偏移量平移框"""
+    texts = result.get("rec_texts") or []
+    scores = result.get("rec_scores") or [1.0] * len(texts)
+    boxes = result.get("rec_boxes") or []
+    lines = []
+    for text, score, box in zip(texts, scores, boxes):
+        x1, y1, x2, y2 = box
+        lines.append(([x1 + dx, y1 + dy, x2 + dx, y2 + dy], text, score))
+    return lines
+
+
+class IncrementalOCR:
+    """连续截图之间只对变化的区域重新OCR
+
+    新帧与上一帧逐块比较(支持整页上下滚动的位移估计)，只对变化的块所在区域
+    重新检测和识别，其余区域直接复用上一帧缓存的框和文本。
+    """
+
+    def __init__(self, tile_size: int = 32, pixel_threshold: int = 24, max_changed_ratio: float = 0.6,
+                 max_shift_ratio: float = 0.5, margin: int = 6):
+        self.tile_size = tile_size
+        self.pixel_threshold = pixel_threshold
+        self.max_changed_ratio = max_changed_ratio
+        self.max_shift_ratio = max_shift_ratio
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._prev_gray = None
+        self._prev_lines = None
+        self._counts = {"frames": 0, "full": 0, "incremental": 0, "unchanged": 0,
+                        "pixels_total": 0, "pixels_ocr": 0}
+
+    def estimate_shift(self, prev: np.ndarray, cur: np.ndarray) -> int:
+        """用行均值曲线估计整页的垂直滚动量(正数表示内容向上移动)"""
+        height = cur.shape[0]
+        max_shift = int(height * self.max_shift_ratio)
+        if max_shift < 1:
+            return 0
+        prev_rows = prev.mean(axis=1, dtype=np.float32)
+        cur_rows = cur.mean(axis=1, dtype=np.float32)
+        still_error = float(np.abs(prev_rows - cur_rows).mean())
+        if still_error < 0.5:
+            return 0
+
+        # cur[y] 对应 prev[y + dy]，取重叠部分误差最小的位移
+        best_shift, best_error = 0, still_error
+        for dy in range(-max_shift, max_shift + 1):
+            if dy > 0:
+                error = float(np.abs(cur_rows[:-dy] - prev_rows[dy:]).mean())
+            elif dy < 0:
+                error = float(np.abs(cur_rows[-dy:] - prev_rows[:dy]).mean())
+            else:
+                continue
+            if error < best_error:
+                best_shift, best_error = dy, error
+        # 只有明显优于不滚动时才认为发生了滚动
+        return best_shift if best_error < still_error * 0.5 else 0
+
+    def changed_tiles(self, prev: np.ndarray, cur: np.ndarray, dy: int) -> np.ndarray:
+        """按块比较两帧，返回每个块是否变化的布尔矩阵"""
+        height, width = cur.shape
+        aligned = np.zeros_like(cur)
+        known = np.zeros(height, dtype=bool)
+        if dy >= 0:
+            aligned[:height - dy] = prev[dy:]
+            known[:height - dy] = True
+        else:
+            aligned[-dy:] = prev[:height + dy]
+            known[-dy:] = True
+
+        changed = np.abs(cur.astype(np.int16) - aligned.astype(np.int16)) > self.pixel_threshold
+        changed[~known] = True
+
+        tile = self.tile_size
+        rows, cols = -(-height // tile), -(-width // tile)
+        padded = np.zeros((rows * tile, cols * tile), dtype=bool)
+        padded[:height, :width] = changed
+        return padded.reshape(rows, tile, cols, tile).any(axis=(1, 3))
+
+    def _regions(self, tiles: np.ndarray, lines: list, seeds: List[list], height: int, width: int) -> List[list]:
+        """把变化块合并成需要重新OCR的矩形区域，并扩展到与之相交的整行文本"""
+        tile = self.tile_size
+        regions = [list(seed) for seed in seeds]
+        changed_rows = np.flatnonzero(tiles.any(axis=1))
+        start = None
+        for i, row in enumerate(changed_rows):
+            if start is None:
+                start = row
+            if i + 1 == len(changed_rows) or changed_rows[i + 1] != row + 1:
+                cols = np.flatnonzero(tiles[start:row + 1].any(axis=0))
+                regions.append([int(cols[0]) * tile, int(start) * tile,
+                                min(width, (int(cols[-1]) + 1) * tile), min(height, (int(row) + 1) * tile)])
+                start = None
+
+        m = self.margin
+        regions = [[max(0, x1 - m), max(0, y1 - m), min(width, x2 + m), min(height, y2 + m)]
+                   for x1, y1, x2, y2 in regions]
+
+        # 被改动区域切到的文本行整行重识别，扩大后相互重叠的区域合并，
+        # 否则同一行会在两个区域里各识别一次，直到区域不再变化
+        grown = True
+        while grown:
+            grown = False
+            for region in regions:
+                for box, _, _ in lines:
+                    if _intersects(region, box):
+                        merged = _union(region, box)
+                        if merged != region:
+                            region[:] = merged
+                            grown = True
+            merged_regions = _merge_overlapping(regions)
+            if len(merged_regions) != len(regions):
+                regions = merged_regions
+                grown = True
+        return regions
+
+    def run(self, image: np.ndarray, ocr_fn: Callable[[np.ndarray], Future]) -> Dict[str, list]:
+        """对新帧执行增量OCR，ocr_fn 接收一张图片并返回结果的Future"""
+        gray = _to_gray(image)
+        height, width = gray.shape
+        with self._lock:
+            prev_gray, prev_lines = self._prev_gray, self._prev_lines
+            self._counts["frames"] += 1
+            self._counts["pixels_total"] += height * width
+
+        regions = None
+        lines = None
+        if prev_gray is not None and prev_gray.shape == gray.shape:
+            dy = self.estimate_shift(prev_gray, gray)
+            tiles = self.changed_tiles(prev_gray, gray, dy)
+            if tiles.mean() <= self.max_changed_ratio:
+                lines = [([x1, y1 - dy, x2, y2 - dy], text, score) for (x1, y1, x2, y2), text, score in prev_lines]
+                # 滚动后被画面边缘截断的行，其可见部分交给重新识别
+                seeds = [[box[0], max(0, box[1]), box[2], min(height, box[3])]
+                         for box, _, _ in lines if (box[1] < 0 < box[3]) or (box[1] < height < box[3])]
+                lines = [line for line in lines if line[0][1] >= 0 and line[0][3] <= height]
+                regions = self._regions(tiles, lines, seeds, height, width)
+
+        if regions is None:
+            result = ocr_fn(image).result()
+            lines = result_lines(result)
+            self._update(gray, lines, "full", height * width)
+            return result
+
+        if not regions:
+            self._update(gray, lines, "unchanged", 0)
+            return make_result(lines)
+
+        # 各变化区域同时提交，可以被批处理器合并
+        futures = [(region, ocr_fn(np.ascontiguousarray(image[region[1]:region[3], region[0]:region[2]])))
+                   for region in regions]
+        kept = [line for line in lines if not any(_intersects(region, line[0]) for region in regions)]
+        ocr_pixels = 0
+        for region, future in futures:
+            kept.extend(result_lines(future.result(), region[0], region[1]))
+            ocr_pixels += (region[2] - region[0]) * (region[3] - region[1])
+
+        self._update(gray, kept, "incremental", ocr_pixels)
+        return make_result(kept)
+
+    def _update(self, gray: np.ndarray, lines: list, kind: str, ocr_pixels: int):
+        with self._lock:
+            self._prev_gray = gray
+            self._prev_lines = lines
+            self._counts[kind] += 1
+            self._counts["pixels_ocr"] += ocr_pixels
+
+    def stats(self) -> Dict[str, Any]:
+        """增量OCR统计，ocr_pixel_ratio 为实际送去OCR的像素比例"""
+        with self._lock:
+            total = self._counts["pixels_total"]
+            return dict(self._counts, ocr_pixel_ratio=round(self._counts["pixels_ocr"] / total, 3) if total else 0.0)
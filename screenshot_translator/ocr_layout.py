@@ -0,0 +1,120 @@
+# coding: utf-8
+
+import re
+from typing import Any, Dict
+
+import numpy as np
+
+_CJK = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯＀-￯]")
+
+
+def _join(left: str, right: str) -> str:
+    """拼接换行的两段文本：去掉行尾连字符，中日韩文字之间不加空格"""
+    if not left:
+        return right
+    if not right:
+        return left
+    if left.endswith("-") and len(left) > 1 and left[-2].isalpha() and right[0].islower():
+        return left[:-1] + right
+    if _CJK.match(left[-1]) or _CJK.match(right[0]):
+        return left + right
+    return left + " " + right
+
+
+def _split_columns(boxes: np.ndarray, heights: np.ndarray, gap_factor: float) -> np.ndarray:
+    """按x方向的空白竖带划分栏，返回每个框所属的栏号"""
+    n = len(boxes)
+    if n == 0:
+        return np.zeros(0, dtype=int)
+    page_left, page_right = int(boxes[:, 0].min()), int(boxes[:, 2].max())
+    width = max(1, page_right - page_left)
+
+    # 跨栏的标题等宽框不参与空白带的统计
+    narrow = (boxes[:, 2] - boxes[:, 0]) < 0.6 * width
+    coverage = np.zeros(width + 1, dtype=np.int32)
+    np.add.at(coverage, boxes[narrow, 0] - page_left, 1)
+    np.add.at(coverage, boxes[narrow, 2] - page_left, -1)
+    covered = np.cumsum(coverage)[:width] > 0
+
+    # 找出足够宽的空白带作为栏的分隔
+    min_gap = gap_factor * float(np.median(heights))
+    edges = np.diff(np.concatenate(([1], covered.astype(np.int8), [1])))
+    gap_starts, gap_ends = np.flatnonzero(edges == -1), np.flatnonzero(edges == 1)
+    splits = [page_left + (s + e) // 2 for s, e in zip(gap_starts, gap_ends)
+              if e - s >= min_gap and s > 0 and e < width]
+
+    centers = (boxes[:, 0] + boxes[:, 2]) / 2
+    columns = np.searchsorted(np.array(splits), centers)
+    # 跨栏框记为-1栏
+    columns[~narrow] = -1
+    return columns
+
+
+def _reading_order(boxes: np.ndarray, heights: np.ndarray, column_gap: float):
+    """计算阅读顺序，返回 (顺序, 每个框所属的区块号, 每个框所属的行号)
+
+    跨栏框把页面切成上下几个区块；区块内先跨栏框，再逐栏从上到下，
+    同一行(行中心相差不到半个行高)内从左到右。
+    """
+    columns = _split_columns(boxes, heights, column_gap)
+    spanning = columns == -1
+    span_tops = np.sort(boxes[spanning, 1])
+    band = np.searchsorted(span_tops, boxes[:, 1], side="right")
+    block = band * (int(columns.max()) + 2) + columns + 1
+
+    centers_y = (boxes[:, 1] + boxes[:, 3]) / 2
+    half_line = 0.5 * float(np.median(heights))
+    by_y = np.lexsort((centers_y, block))
+    rows = np.zeros(len(boxes), dtype=np.int64)
+    row, row_center, prev_block = -1, None, None
+    for i in by_y:
+        if block[i] != prev_block or abs(centers_y[i] - row_center) >= half_line:
+            row += 1
+            row_center = centers_y[i]
+            prev_block = block[i]
+        rows[i] = row
+    return np.lexsort((boxes[:, 0], rows)), block, rows
+
+
+def build_layout(result: Dict[str, list], column_gap: float = 2.0, paragraph_gap: float = 0.8,
+                 indent_factor: float = 1.5) -> Dict[str, Any]:
+    """根据OCR行框计算阅读顺序，并把行归并为段落
+
+    返回 {"lines": [...], "paragraphs": [...]}，行按阅读顺序排列，
+    每个段落记录包含的行下标、合并后的文本、外接框和平均置信度。
+    """
+    texts = list(result.get("rec_texts") or [])
+    scores = list(result.get("rec_scores") or [1.0] * len(texts))
+    boxes = np.array(result.get("rec_boxes") or [], dtype=np.int64).reshape(-1, 4)
+    if len(texts) == 0 or len(boxes) != len(texts):
+        return {"lines": [], "paragraphs": []}
+
+    heights = np.maximum(boxes[:, 3] - boxes[:, 1], 1)
+    line_height = float(np.median(heights))
+    order, block, rows = _reading_order(boxes, heights, column_gap)
+
+    lines = [{"text": texts[i], "box": boxes[i].tolist(), "score": float(scores[i])} for i in order]
+
+    paragraphs = []
+    current = None
+    prev = None
+    for idx, i in enumerate(order):
+        new_paragraph = current is None or block[i] != block[prev]
+        if not new_paragraph and rows[i] != rows[prev]:
+            # 与上一行间距过大或明显缩进时另起一段
+            gap = boxes[i, 1] - boxes[prev, 3]
+            indent = boxes[i, 0] - boxes[order[current["lines"][0]], 0]
+            new_paragraph = gap > paragraph_gap * line_height or indent > indent_factor * line_height
+        if new_paragraph:
+            current = {"lines": [], "text": "", "box": boxes[i].tolist(), "score": 0.0}
+            paragraphs.append(current)
+        current["lines"].append(idx)
+        current["text"] = _join(current["text"], texts[i])
+        current["box"] = [min(current["box"][0], int(boxes[i, 0])), min(current["box"][1], int(boxes[i, 1])),
+                          max(current["box"][2], int(boxes[i, 2])), max(current["box"][3], int(boxes[i, 3]))]
+        current["score"] += float(scores[i])
+        prev = i
+
+    for paragraph in paragraphs:
+        paragraph["score"] = round(paragraph["score"] / len(paragraph["lines"]), 4)
+    return {"lines": lines, "paragraphs": paragraphs}
@@ -0,0 +1,168 @@
+# coding: utf-8
+
+import math
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+import cv2
+import numpy as np
+
+from ocr_fastpath import ink_mask
+
+
+class TextPrecheck:
+    """OCR前的快速预检
+
+    在缩小的灰度图上计算方差、边缘密度和连通域统计，明显没有文字的截图
+    (空白、纯色、误拖的图标)直接判为无文字，不再运行检测模型；
+    有文字的截图则裁掉四周大片均匀的边距，检测模型只处理有内容的部分。
+    内容区域同样在缩小的灰度图上计算，has_text 算出的区域按图片对象记住，随后裁边距时直接复用。
+    """
+
+    def __init__(self, min_std: float = 6.0, min_edge_density: float = 0.003, min_components: int = 1,
+                 max_side: int = 640, margin_tolerance: int = 12, margin_pad: int = 6,
+                 min_margin_ratio: float = 0.1):
+        self.min_std = min_std
+        self.min_edge_density = min_edge_density
+        self.min_components = min_components
+        self.max_side = max_side
+        self.margin_tolerance = margin_tolerance
+        self.margin_pad = margin_pad
+        self.min_margin_ratio = min_margin_ratio
+        self._lock = threading.Lock()
+        self._counts = {"checked": 0, "rejected": 0, "cropped": 0, "pixels_before": 0, "pixels_after": 0}
+        # 最近预检过的图片 (弱引用, 内容区域)，同一张图片裁边距时不再重新计算
+        self._recent_boxes = deque(maxlen=16)
+
+    def _small_gray(self, image: np.ndarray) -> Tuple[np.ndarray, float]:
+        """缩小的灰度图和缩放比例"""
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        longest = max(gray.shape)
+        # 最多缩小一半，避免小字号的笔画在缩放后消失
+        scale = max(0.5, min(1.0, self.max_side / longest))
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return gray, scale
+
+    def features(self, image: np.ndarray) -> Dict[str, float]:
+        """计算预检特征：灰度标准差、边缘密度和类文字连通域数量"""
+        return self._gray_features(self._small_gray(image)[0])
+
+    def _gray_features(self, gray: np.ndarray) -> Dict[str, float]:
+        std = float(gray.std())
+        if std < self.min_std:
+            return {"std": std, "edge_density": 0.0, "components": 0}
+
+        gx = cv2.Sobel(gray, cv2.CV_16S, 1, 0)
+        gy = cv2.Sobel(gray, cv2.CV_16S, 0, 1)
+        magnitude = np.abs(gx).astype(np.int32) + np.abs(gy)
+        edge_density = float((magnitude > 128).mean())
+
+        height, width = gray.shape
+        _, _, stats, _ = cv2.connectedComponentsWithStats(ink_mask(gray).astype(np.uint8), connectivity=8)
+        w, h, area = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT], stats[1:, cv2.CC_STAT_AREA]
+        fill = area / np.maximum(w * h, 1)
+        text_like = (h >= 2) & (h <= 0.9 * height) & (w <= 0.9 * width) & (area >= 3) & (fill > 0.08) & (fill < 0.95)
+        return {"std": std, "edge_density": edge_density, "components": int(text_like.sum())}
+
+    def has_text(self, image: np.ndarray) -> Tuple[bool, Dict[str, float]]:
+        """返回 (是否可能有文字, 特征)，特征在去掉均匀边距后的内容区域上计算"""
+        gray, scale = self._small_gray(image)
+        small_box = self._gray_content_box(gray)
+        self._remember(image, self._scale_box(small_box, scale, image.shape[0], image.shape[1]))
+        if small_box is None:
+            features = {"std": 0.0, "edge_density": 0.0, "components": 0}
+        else:
+            x1, y1, x2, y2 = small_box
+            features = self._gray_features(gray[y1:y2, x1:x2])
+        ok = (features["std"] >= self.min_std and features["edge_density"] >= self.min_edge_density
+              and features["components"] >= self.min_components)
+        with self._lock:
+            self._counts["checked"] += 1
+            if not ok:
+                self._counts["rejected"] += 1
+        return ok, features
+
+    def _gray_content_box(self, gray: np.ndarray):
+        """缩小的灰度图上与四周背景色不同的区域，整张图都是背景时返回None"""
+        border = np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+        content = cv2.absdiff(gray, np.full_like(gray, int(np.median(border)))) > self.margin_tolerance
+        rows = np.flatnonzero(content.any(axis=1))
+        cols = np.flatnonzero(content.any(axis=0))
+        if len(rows) == 0:
+            return None
+        return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+    def _scale_box(self, box, scale: float, height: int, width: int):
+        """把缩小图上的区域映射回原图并留出 margin_pad 的余量"""
+        if box is None:
+            return None
+        x1, y1, x2, y2 = box
+        pad = self.margin_pad
+        return (max(0, int(x1 / scale) - pad), max(0, int(y1 / scale) - pad),
+                min(width, math.ceil(x2 / scale) + pad), min(height, math.ceil(y2 / scale) + pad))
+
+    def _remember(self, image: np.ndarray, box):
+        with self._lock:
+            self._recent_boxes.append((weakref.ref(image), box))
+
+    def content_box(self, image: np.ndarray):
+        """与四周背景色不同的内容区域 (x1, y1, x2, y2)，整张图都是背景时返回None
+
+        同一张图片已经在 has_text 中算过时直接复用
+        """
+        with self._lock:
+            for ref, box in self._recent_boxes:
+                if ref() is image:
+                    return box
+        gray, scale = self._small_gray(image)
+        return self._scale_box(self._gray_content_box(gray), scale, image.shape[0], image.shape[1])
+
+    def crop_margins(self, image: np.ndarray) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """裁掉四周与背景色一致的边距，返回 (裁剪后的图片, 左上角偏移)"""
+        height, width = image.shape[:2]
+        box = self.content_box(image)
+        if box is None:
+            return image, (0, 0)
+        x1, y1, x2, y2 = box
+
+        # 边距太小时不值得多一次拷贝
+        if (x2 - x1) * (y2 - y1) > (1 - self.min_margin_ratio) * height * width:
+            return image, (0, 0)
+        with self._lock:
+            self._counts["cropped"] += 1
+            self._counts["pixels_before"] += height * width
+            self._counts["pixels_after"] += (x2 - x1) * (y2 - y1)
+        return np.ascontiguousarray(image[y1:y2, x1:x2]), (x1, y1)
+
+    def wrap(self, ocr_fn: Callable[[np.ndarray], Future]) -> Callable[[np.ndarray], Future]:
+        """包装 submit_async 形式的OCR函数：先裁边距，结果中的框再映射回原图坐标"""
+        def submit(image: np.ndarray) -> Future:
+            cropped, (dx, dy) = self.crop_margins(image)
+            inner = ocr_fn(cropped)
+            if dx == 0 and dy == 0:
+                return inner
+
+            outer = Future()
+
+            def done(future: Future):
+                try:
+                    result = dict(future.result())
+                except Exception as e:
+                    outer.set_exception(e)
+                    return
+                result["rec_boxes"] = [[x1 + dx, y1 + dy, x2 + dx, y2 + dy] for x1, y1, x2, y2 in result.get("rec_boxes", [])]
+                result["rec_polys"] = [[[x + dx, y + dy] for x, y in poly] for poly in result.get("rec_polys", [])]
+                outer.set_result(result)
+
+            inner.add_done_callback(done)
+            return outer
+        return submit
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            before = self._counts["pixels_before"]
+            return dict(self._counts, cropped_pixel_ratio=round(self._counts["pixels_after"] / before, 3) if before else 1.0)
@@ -0,0 +1,167 @@
+# coding: utf-8
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+
+class _Entry:
+    def __init__(self, model, pinned: bool):
+        self.model = model
+        self.pinned = pinned
+        self.refs = 0
+        self.uses = 0
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+
+
+class OCRModelRegistry:
+    """按语言模型管理的OCR档位注册表
+
+    模型在第一次用到时加载，同一个模型同时只加载一次，其余请求等待加载完成。
+    已加载模型的工作进程常驻内存之和超过预算时，淘汰最久未使用且没有请求在用的模型；
+    没有安装psutil无法统计内存时，改为按模型数量上限淘汰。常驻的默认语言模型标记为pinned，不会被淘汰。
+    """
+
+    def __init__(self, rss_budget: int = 3 * 1024 * 1024 * 1024, max_models: int = 4):
+        self.rss_budget = rss_budget
+        self.max_models = max_models
+        self._models: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._loading: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "loads": 0, "load_failures": 0, "evictions": 0}
+
+    def add(self, key: str, model, pinned: bool = False):
+        """登记一个已经加载好的模型"""
+        with self._lock:
+            self._models[key] = _Entry(model, pinned)
+        self._evict(protect=key)
+
+    def get(self, key: str):
+        """已加载的模型，未加载时返回None，不触发加载"""
+        with self._lock:
+            entry = self._models.get(key)
+            return entry.model if entry is not None else None
+
+    @contextmanager
+    def use(self, key: str, loader: Callable[[], Any]):
+        """取出模型使用，未加载时调用 loader() 加载；使用期间该模型不会被淘汰"""
+        entry = self._acquire(key, loader)
+        try:
+            yield entry.model
+        finally:
+            with self._lock:
+                entry.refs -= 1
+                entry.last_used = time.time()
+
+    def _acquire(self, key: str, loader: Callable[[], Any]) -> _Entry:
+        while True:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    entry.refs += 1
+                    entry.uses += 1
+                    self._models.move_to_end(key)
+                    self._counts["hits"] += 1
+                    return entry
+                loading = self._loading.get(key)
+                owner = loading is None
+                if owner:
+                    loading = self._loading[key] = Future()
+
+            if not owner:
+                # 其他请求正在加载同一个模型，等它完成后重新查找
+                loading.result()
+                continue
+
+            print(f"正在按需加载OCR模型: {key}")
+            start = time.perf_counter()
+            try:
+                model = loader()
+            except Exception as e:
+                with self._lock:
+                    del self._loading[key]
+                    self._counts["load_failures"] += 1
+                loading.set_exception(e)
+                raise
+            with self._lock:
+                entry = self._models[key] = _Entry(model, pinned=False)
+                entry.refs += 1
+                entry.uses += 1
+                del self._loading[key]
+                self._counts["loads"] += 1
+            loading.set_result(None)
+            print(f"OCR模型 {key} 加载完成 (耗时 {time.perf_counter() - start:.1f}s)")
+            self._evict(protect=key)
+            return entry
+
+    def _total_rss(self) -> Optional[int]:
+        total = 0
+        for entry in list(self._models.values()):
+            rss = entry.model.rss()
+            if rss is None:
+                return None
+            total += rss
+        return total
+
+    def _evict(self, protect: str = None):
+        """超出内存预算(或数量上限)时按最久未使用的顺序淘汰"""
+        while True:
+            total = self._total_rss()
+            with self._lock:
+                if total is not None:
+                    over = total > self.rss_budget
+                else:
+                    over = len(self._models) > self.max_models
+                if not over:
+                    return
+                victim = next((key for key, entry in self._models.items()
+                               if key != protect and not entry.pinned and entry.refs == 0), None)
+                if victim is None:
+                    return
+                entry = self._models.pop(victim)
+                self._counts["evictions"] += 1
+            print(f"OCR模型内存超出预算，淘汰: {victim}")
+            entry.model.close()
+
+    def models(self) -> Dict[str, Any]:
+        """当前已加载的模型"""
+        with self._lock:
+            return {key: entry.model for key, entry in self._models.items()}
+
+    def close(self):
+        """关闭所有模型，服务退出时调用"""
+        with self._lock:
+            entries = list(self._models.values())
+            self._models.clear()
+        for entry in entries:
+            entry.model.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = list(self._models.items())
+            loading = list(self._loading)
+            counts = dict(self._counts)
+        models = {}
+        total = 0
+        for key, entry in entries:
+            rss = entry.model.rss()
+            total = total + rss if rss is not None and total is not None else None
+            models[key] = {
+                "pinned": entry.pinned,
+                "in_use": entry.refs,
+                "uses": entry.uses,
+                "rss_mb": round(rss / 1024 / 1024, 1) if rss is not None else None,
+                "idle_seconds": round(time.time() - entry.last_used, 1),
+            }
+        return dict(
+            counts,
+            models=models,
+            loading=loading,
+            rss_mb=round(total / 1024 / 1024, 1) if total is not None else None,
+            rss_budget_mb=round(self.rss_budget / 1024 / 1024, 1),
+            max_models=self.max_models,
+        )
@@ -0,0 +1,35 @@
+# coding: utf-8
+
+import re
+from typing import Dict, List, Tuple
+
+# 按Unicode区段统计文字类别
+_KANA = re.compile(r"[぀-ヿㇰ-ㇿｦ-ﾟ]")
+_HAN = re.compile(r"[㐀-䶿一-鿿豈-﫿]")
+_LATIN = re.compile(r"[A-Za-zÀ-ɏ]")
+
+
+def script_counts(texts: List[str]) -> Dict[str, int]:
+    """统计文本中假名、汉字和拉丁字母的数量"""
+    text = "".join(texts)
+    return {
+        "kana": len(_KANA.findall(text)),
+        "han": len(_HAN.findall(text)),
+        "latin": len(_LATIN.findall(text)),
+    }
+
+
+def detect_lang(texts: List[str], min_kana_ratio: float = 0.05, min_han_ratio: float = 0.2) -> Tuple[str, Dict[str, int]]:
+    """根据识别文本的文字类别选择OCR语言，返回 (PaddleOCR语言代码, 各类字符数)
+
+    出现一定比例的假名判为日文；汉字占比足够判为中文；其余(包括没有识别到文字)按英文处理。
+    """
+    counts = script_counts(texts)
+    total = sum(counts.values())
+    if total == 0:
+        return "en", counts
+    if counts["kana"] >= max(1, min_kana_ratio * total):
+        return "japan", counts
+    if counts["han"] >= min_han_ratio * total:
+        return "ch", counts
+    return "en", counts
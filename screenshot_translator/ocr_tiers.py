@@ -0,0 +1,199 @@
+# coding: utf-8
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from ocr_batcher import OCRBatcher
+from ocr_cache import CacheKey, OCRResultCache
+from ocr_engine import make_warmup_image
+from ocr_fastpath import single_line_box, crop_line
+from ocr_incremental import IncrementalOCR
+from ocr_precheck import TextPrecheck
+from ocr_tiling import TiledOCR
+from ocr_worker_pool import OCRWorkerPool
+
+# 请求可选的识别质量
+QUALITIES = ("fast", "accurate", "progressive")
+
+
+def min_score(result: Dict[str, list]) -> float:
+    """结果中最低的行置信度，没有识别到文字时为0"""
+    scores = result.get("rec_scores") or []
+    return float(min(scores)) if scores else 0.0
+
+
+class OCRTier:
+    """一档OCR模型及其完整的处理链路
+
+    每档有独立的工作进程池、批处理、缓存和增量状态，同一张截图在不同档位的结果互不干扰：
+    缓存 -> 单行快速路径 -> 增量识别 -> 预检裁边 -> 分块 -> 批处理 -> 工作进程。
+    """
+
+    def __init__(self, name: str, pool: OCRWorkerPool, cache: OCRResultCache, precheck: TextPrecheck = None,
+                 max_batch_size: int = 8, max_batch_wait: float = 0.01,
+                 tile_max_pixels: int = 2560 * 1440, tile_size: int = 1280, tile_overlap: int = 160,
+                 incremental_tile_size: int = 32, incremental_max_changed_ratio: float = 0.6,
+                 fast_path_min_score: Optional[float] = 0.6):
+        self.name = name
+        self.pool = pool
+        self.cache = cache
+        self.fast_path_min_score = fast_path_min_score
+        # 每个工作进程对应一个批次分发线程，批次之间仍然并行
+        self.batcher = OCRBatcher(pool.predict, max_batch_size, max_batch_wait, pool.num_workers,
+                                  pool.idle_workers)
+        self.rec_batcher = OCRBatcher(lambda images: pool.call("recognize", images),
+                                      max_batch_size, max_batch_wait, pool.num_workers, pool.idle_workers)
+        self.tiled = TiledOCR(self.batcher.submit_async, tile_max_pixels, tile_size, tile_overlap,
+                              max_inflight=pool.num_workers * 2)
+        self.submit_full = precheck.wrap(self.tiled.submit_async) if precheck else self.tiled.submit_async
+        self.incremental = IncrementalOCR(incremental_tile_size, max_changed_ratio=incremental_max_changed_ratio)
+        self._lock = threading.Lock()
+        self._fast_path = {"hits": 0, "fallbacks": 0}
+
+    def recognize_single_line(self, image: np.ndarray) -> Optional[Dict[str, list]]:
+        """单行截图跳过检测直接识别，不满足条件或置信度不足时返回None"""
+        box = single_line_box(image)
+        if box is None:
+            return None
+
+        res = self.rec_batcher.submit(crop_line(image, box))
+        text = res["rec_texts"][0].strip() if res["rec_texts"] else ""
+        score = res["rec_scores"][0] if res["rec_scores"] else 0.0
+        with self._lock:
+            if not text or score < self.fast_path_min_score:
+                self._fast_path["fallbacks"] += 1
+                return None
+            self._fast_path["hits"] += 1
+
+        res["rec_boxes"] = [box]
+        res["rec_polys"] = [[[box[0], box[1]], [box[2], box[1]], [box[2], box[3]], [box[0], box[3]]]]
+        return res
+
+    def run(self, image: np.ndarray, cache_key: CacheKey = None) -> Tuple[Dict[str, list], Optional[str]]:
+        """识别一张截图，返回 (结果, 缓存命中类型)"""
+        if cache_key is None:
+            cache_key = self.cache.key(image)
+        # 感知匹配关闭时只做精确匹配，内容相近的截图交给增量OCR只重识别变化的区域
+        res, cache_hit = self.cache.get(cache_key)
+        if res is not None:
+            return res, cache_hit
+
+        if self.fast_path_min_score is not None:
+            res = self.recognize_single_line(image)
+        if res is None:
+            # 与上一帧相比只重新识别变化的区域，其余复用上一帧的框和文本
+            res = self.incremental.run(image, self.submit_full)
+        self.cache.put(cache_key, res)
+        return res, None
+
+    def warmup(self) -> float:
+        """经过批处理链路跑一次完整识别，返回端到端耗时(秒)"""
+        start = time.perf_counter()
+        self.batcher.submit(make_warmup_image())
+        return time.perf_counter() - start
+
+    def rss(self) -> Optional[int]:
+        return self.pool.rss()
+
+    def close(self):
+        """停止批处理线程并关闭工作进程，被注册表淘汰时调用"""
+        self.batcher.close()
+        self.rec_batcher.close()
+        self.tiled.close()
+        self.pool.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            fast_path = dict(self._fast_path)
+        return {
+            "pool": self.pool.stats(),
+            "batcher": self.batcher.stats(),
+            "cache": self.cache.stats(),
+            "incremental": self.incremental.stats(),
+            "tiling": self.tiled.stats(),
+            "fast_path": dict(fast_path, recognizer_batcher=self.rec_batcher.stats()),
+        }
+
+
+class ProgressiveResults:
+    """渐进式OCR的精修任务
+
+    快速档的结果先返回给客户端，精修任务在后台用精确档重新识别，结果按id保存一段时间，
+    客户端带 wait 参数长轮询获取。
+    """
+
+    def __init__(self, max_workers: int = 1, max_entries: int = 256, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ocr-refine")
+        self._jobs: "OrderedDict[str, Tuple[Future, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0, "expired": 0}
+
+    def submit(self, fn: Callable[..., Dict[str, list]], *args) -> str:
+        """提交精修任务，返回任务id"""
+        job_id = uuid.uuid4().hex
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._on_done)
+        with self._lock:
+            self._expire()
+            self._jobs[job_id] = (future, time.time())
+            self._counts["submitted"] += 1
+        return job_id
+
+    def _on_done(self, future: Future):
+        # 被取消的任务调用 exception() 会抛出 CancelledError，要先判断
+        if future.cancelled():
+            kind = "cancelled"
+        else:
+            kind = "failed" if future.exception() is not None else "completed"
+        with self._lock:
+            self._counts[kind] += 1
+
+    def _expire(self):
+        now = time.time()
+        while self._jobs:
+            job_id, (future, created) = next(iter(self._jobs.items()))
+            if len(self._jobs) <= self.max_entries and now - created < self.ttl:
+                break
+            # 只淘汰已经结束的任务，未完成的任务留到结束后再过期
+            if not future.done() and len(self._jobs) <= self.max_entries:
+                break
+            del self._jobs[job_id]
+            self._counts["expired"] += 1
+
+    def future(self, job_id: str) -> Optional[Future]:
+        """精修任务的Future，用于取消还没开始的任务"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job[0] if job is not None else None
+
+    def get(self, job_id: str, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """查询精修任务，最多等待 wait 秒；任务不存在或已过期时返回None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        future, created = job
+        if future.cancelled():
+            return {"state": "cancelled", "error": "精修任务已取消"}
+        try:
+            result = future.result(timeout=max(0.0, wait))
+        except FutureTimeout:
+            return {"state": "pending", "elapsed": round(time.time() - created, 3)}
+        except CancelledError:
+            return {"state": "cancelled", "error": "精修任务已取消"}
+        except Exception as e:
+            return {"state": "failed", "error": str(e)}
+        return {"state": "done", "result": result}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = sum(1 for future, _ in self._jobs.values() if not future.done())
+            return dict(self._counts, pending=pending, stored=len(self._jobs))
@@ -0,0 +1,161 @@
+# coding: utf-8
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ocr_incremental import make_result, result_lines
+
+
+def split_tiles(height: int, width: int, tile_size: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """把图片切成相互重叠的块，返回 (x1, y1, x2, y2) 列表"""
+    def starts(length: int) -> List[int]:
+        if length <= tile_size:
+            return [0]
+        step = tile_size - overlap
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)
+        return positions
+
+    return [(x, y, min(width, x + tile_size), min(height, y + tile_size))
+            for y in starts(height) for x in starts(width)]
+
+
+def _stitch(left: str, right: str, min_overlap: int = 3, min_overlap_ratio: float = 0.5) -> Optional[str]:
+    """拼接同一行在接缝两侧被截断的文本，去掉重叠部分
+
+    重叠至少 min_overlap 个字符或较短文本的 min_overlap_ratio，否则只是碰巧首尾相同，返回None
+    """
+    shorter = min(len(left), len(right))
+    for size in range(shorter, 0, -1):
+        if size < min_overlap and size < shorter * min_overlap_ratio:
+            break
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return None
+
+
+def _center_distance(box, tile) -> float:
+    """框的中心到块中心的距离"""
+    return (abs((box[0] + box[2]) - (tile[0] + tile[2])) + abs((box[1] + box[3]) - (tile[1] + tile[3]))) / 2
+
+
+def _merge_pair(a: tuple, b: tuple, min_same_row: float, min_contained: float) -> Optional[tuple]:
+    """两行是接缝处重复检测到的同一行时返回合并后的行，否则返回None"""
+    box_a, text_a, score_a, tile_a = a
+    box_b, text_b, score_b, tile_b = b
+    inter_w = min(box_a[2], box_b[2]) - max(box_a[0], box_b[0])
+    inter_h = min(box_a[3], box_b[3]) - max(box_a[1], box_b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return None
+    min_h = min(box_a[3] - box_a[1], box_b[3] - box_b[1])
+    if inter_h < min_same_row * min_h:
+        return None
+
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    if inter_w * inter_h >= min_contained * min(area_a, area_b):
+        return a if area_a >= area_b else b
+    first, second = (a, b) if box_a[0] <= box_b[0] else (b, a)
+    box = [min(box_a[0], box_b[0]), min(box_a[1], box_b[1]),
+           max(box_a[2], box_b[2]), max(box_a[3], box_b[3])]
+    text = _stitch(first[1], second[1])
+    if text is not None:
+        return box, text, min(score_a, score_b), first[3]
+    return min(a, b, key=lambda line: _center_distance(box, line[3]))
+
+
+def merge_seam_lines(lines: List[tuple], min_same_row: float = 0.6, min_contained: float = 0.8) -> List[tuple]:
+    """合并相邻块在重叠区域重复检测到的文本行，行为 (框, 文本, 置信度, 所在块)
+
+    同一行(垂直方向重叠度高)且水平相交的两个框：一个基本包含另一个时保留较大的，
+    否则认为是被接缝截断的两段，合并框并拼接文本；文本拼接不上时按几何位置取舍，
+    保留合并后的框中心离块中心更近的那一块识别的行(块边缘的识别结果更容易被截断)。
+    按上边缘排序后扫描一遍，每行只和垂直方向仍与它重叠的行比较，全屏截图的几百行也只需线性附近的比较次数。
+    """
+    done, active = [], []
+    for line in sorted(lines, key=lambda line: (line[0][1], line[0][0])):
+        # 下边缘在当前行上边缘之上的行不会再与之后的任何行重叠
+        overlapping = []
+        for other in active:
+            (done if other[0][3] <= line[0][1] else overlapping).append(other)
+        active = overlapping
+
+        # 合并后框变大，可能又与别的行重叠，重新比较直到没有可合并的
+        i = 0
+        while i < len(active):
+            merged = _merge_pair(active[i], line, min_same_row, min_contained)
+            if merged is None:
+                i += 1
+                continue
+            line = merged
+            del active[i]
+            i = 0
+        active.append(line)
+    return sorted(done + active, key=lambda line: (line[0][1], line[0][0]))
+
+
+class TiledOCR:
+    """超大截图(多显示器/4K整屏)的分块并行OCR
+
+    超过像素阈值的图片切成重叠的块分别OCR，框映射回原图坐标后在接缝处去重合并。
+    同时在途的块数有上限，峰值内存只和块大小有关，而不是整张图。
+    """
+
+    def __init__(self, ocr_fn: Callable[[np.ndarray], Future], max_pixels: int = 2560 * 1440,
+                 tile_size: int = 1280, overlap: int = 160, max_inflight: int = 4):
+        self.ocr_fn = ocr_fn
+        self.max_pixels = max_pixels
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.max_inflight = max(1, max_inflight)
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ocr-tiling")
+        self._lock = threading.Lock()
+        self._counts = {"images": 0, "tiled_images": 0, "tiles": 0, "seam_merges": 0}
+
+    def submit_async(self, image: np.ndarray) -> Future:
+        """与 OCRBatcher.submit_async 相同的接口，大图在后台线程中分块处理"""
+        with self._lock:
+            self._counts["images"] += 1
+        height, width = image.shape[:2]
+        if height * width <= self.max_pixels:
+            return self.ocr_fn(image)
+        return self._executor.submit(self.run_tiled, image)
+
+    def run_tiled(self, image: np.ndarray) -> Dict[str, list]:
+        height, width = image.shape[:2]
+        tiles = split_tiles(height, width, self.tile_size, self.overlap)
+
+        lines = []
+        pending = []
+        for tile in tiles:
+            # 限制同时在途的块数，已提交的块完成后再切下一块
+            if len(pending) >= self.max_inflight:
+                lines.extend(self._tile_lines(*pending.pop(0)))
+            x1, y1, x2, y2 = tile
+            crop = np.ascontiguousarray(image[y1:y2, x1:x2])
+            pending.append((tile, self.ocr_fn(crop)))
+        for tile, future in pending:
+            lines.extend(self._tile_lines(tile, future))
+
+        count = len(lines)
+        lines = [(box, text, score) for box, text, score, _ in merge_seam_lines(lines)]
+        with self._lock:
+            self._counts["tiled_images"] += 1
+            self._counts["tiles"] += len(tiles)
+            self._counts["seam_merges"] += count - len(lines)
+        return make_result(lines)
+
+    @staticmethod
+    def _tile_lines(tile: Tuple[int, int, int, int], future: Future) -> List[tuple]:
+        """取出一块的识别结果，框映射回原图坐标，并记下所在的块"""
+        return [line + (tile,) for line in result_lines(future.result(), tile[0], tile[1])]
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counts, max_pixels=self.max_pixels, tile_size=self.tile_size, overlap=self.overlap)
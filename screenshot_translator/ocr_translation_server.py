@@ -1,142 +1,581 @@
-from flask import Flask, request, jsonify
-from paddleocr import PaddleOCR
+from flask import Flask, Response, request, jsonify, stream_with_context
 import argostranslate.translate
+import argostranslate.package
 import base64
+import json
 import cv2
 import numpy as np
 import io
 from PIL import Image
-import sqlite3
 import os
-from typing import List, Dict, Optional
-from contextlib import contextmanager
+import time
+from typing import List, Dict
+from concurrent.futures import CancelledError
+from ocr_image_io import decode_request_image
+from ocr_engine import DEFAULT_OCR_KWARGS, tier_ocr_kwargs
+from ocr_worker_pool import OCRWorkerPool
+from ocr_cache import OCRResultCache, image_key
+from ocr_layout import build_layout
+from ocr_precheck import TextPrecheck
+from ocr_tiers import QUALITIES, OCRTier, ProgressiveResults, min_score
+from ocr_registry import OCRModelRegistry
+from ocr_script import detect_lang
+from ocr_tuning import DEFAULT_PROFILE_PATH, load_profile, profile_path
+from service_status import ServiceRegistry, ServiceUnavailable
+from single_flight import SingleFlight
+from priority_scheduler import LaneScheduler
+from job_registry import JobCancelled, JobRegistry
+from translation_cache import TranslationCache, normalize_text
+from translation_batch import join_sentences, sentence_separator, split_sentences
+from translation_registry import TranslatorRegistry
+from translation_memory import TranslationMemory
+from phrase_table import PhraseTable
+from stardict import DEFAULT_DB_PATH, StarDictSQLite, resolve_db_path
 
 app = Flask(__name__)
 
-# 字典查询类 - 线程安全版本
-class StarDictSQLite:
-    def __init__(self, db_path: str):
-        self.db_path = db_path
+# OCR工作进程数量，每个进程持有独立预热的模型
+CPU_COUNT = os.cpu_count() or 4
+OCR_WORKER_COUNT = max(1, CPU_COUNT // 4)
+# 两档模型：fast(mobile检测+识别)先返回，accurate(server检测)用于精修；快速档进程数为0时只用精确档
+OCR_FAST_WORKER_COUNT = max(1, OCR_WORKER_COUNT // 2)
+# 工作进程单次推理的最长时间(秒)，超时视为卡死，杀掉并重启该进程
+OCR_CALL_TIMEOUT = 120
+# 两档的工作进程同时常驻、可能同时忙碌，CPU线程在两档的全部进程之间平分，避免超额订阅
+OCR_KWARGS = dict(DEFAULT_OCR_KWARGS,
+                  cpu_threads=max(1, CPU_COUNT // (OCR_WORKER_COUNT + OCR_FAST_WORKER_COUNT)))
+# quality参数的默认值：fast/accurate/progressive
+OCR_DEFAULT_QUALITY = "accurate"
+# progressive模式下快速档结果的最低行置信度低于该值时在后台用精确档精修
+OCR_REFINE_MIN_SCORE = 0.85
+# 为真时progressive模式总是精修，不论置信度
+OCR_REFINE_ALWAYS = False
+
+# 多语言OCR：默认语言的两档模型启动时加载并常驻，其他语言第一次用到时加载
+OCR_DEFAULT_LANG = "en"
+OCR_LANGS = ("en", "ch", "chinese_cht", "japan")
+# 按需加载的语言每档的工作进程数
+OCR_EXTRA_LANG_WORKER_COUNT = 1
+# 已加载模型的工作进程常驻内存预算，超出时淘汰最久未用的；没有安装psutil时按模型数量上限淘汰
+OCR_RSS_BUDGET = 4 * 1024 * 1024 * 1024
+OCR_MAX_MODELS = 6
+# lang=auto 时先用该语言(中日英通用)的模型识别，再按识别出的文字类别选择模型
+OCR_AUTO_PROBE_LANG = "ch"
+
+# ocr_tuning.py 保存的CPU调优结果的路径模板，每档模型各有一份，
+# 与当前机器、PaddleOCR版本以及该档的检测/识别模型相符时在启动时应用
+OCR_PROFILE_PATH = DEFAULT_PROFILE_PATH
+
+# 微批处理：突发请求在最长等待时间内合并为一次批量推理
+OCR_MAX_BATCH_SIZE = 8
+OCR_MAX_BATCH_WAIT = 0.01
+
+# OCR结果缓存：重复截取同一个对话框/提示/字幕时直接返回，只有精确档的结果写入磁盘
+OCR_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "ocr_cache.db")
+OCR_CACHE_MAX_ENTRIES = 2048
+OCR_CACHE_MAX_BYTES = 32 * 1024 * 1024
+OCR_CACHE_MAX_DISTANCE = 3
+# 感知匹配(dHash/pHash找候选、再与保存的灰度图逐像素核对)：要为每张截图计算哈希并保存整张灰度图，
+# 内存预算里只放得下几张全屏截图；关闭时只做精确匹配，内容相近的截图由增量OCR处理
+OCR_CACHE_PERCEPTUAL = False
+
+# 增量OCR：与上一帧尺寸相同的截图只对变化的块重新识别
+OCR_INCREMENTAL_TILE_SIZE = 32
+OCR_INCREMENTAL_MAX_CHANGED_RATIO = 0.6
+
+# 分块OCR：超过像素阈值的大图切成重叠的块并行识别
+OCR_TILE_MAX_PIXELS = 2560 * 1440
+OCR_TILE_SIZE = 1280
+OCR_TILE_OVERLAP = 160
+
+# 单行/单词快速路径：矮小的单行截图跳过文字检测直接识别，置信度过低时回退到完整流程
+OCR_FAST_PATH = True
+OCR_FAST_PATH_MIN_SCORE = 0.6
+
+# 预检：明显没有文字的截图直接返回，送检前裁掉四周均匀的边距
+OCR_PRECHECK = True
+OCR_PRECHECK_MIN_STD = 6.0
+OCR_PRECHECK_MIN_EDGE_DENSITY = 0.003
+OCR_PRECHECK_MIN_COMPONENTS = 1
+
+# 翻译缓存：内存LRU + SQLite磁盘层，按 (规范化文本, 源语言, 目标语言, 模型版本) 查找
+TRANSLATION_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "translation_cache.db")
+TRANSLATION_CACHE_MAX_ENTRIES = 8192
+TRANSLATION_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# 分句后整批交给CTranslate2时，每批最多的token数
+TRANSLATION_MAX_BATCH_TOKENS = 2048
+TRANSLATION_BEAM_SIZE = 4
+
+# 流式翻译时第一批只翻一句，尽快返回第一段译文，之后每批翻倍直到上限
+TRANSLATION_STREAM_FIRST_BATCH = 1
+TRANSLATION_STREAM_MAX_BATCH = 16
+
+# 翻译记忆：与已翻译句子的字符3-gram相似度达到阈值时改写旧译文，不再调用翻译模型
+TRANSLATION_MEMORY = True
+TRANSLATION_MEMORY_MIN_SIMILARITY = 0.8
+# 太短的句子改动一个词相似度变化很大，不做模糊匹配
+TRANSLATION_MEMORY_MIN_CHARS = 20
+TRANSLATION_MEMORY_MAX_ENTRIES = 50000
+# 启动时从翻译缓存的磁盘层载入最近使用的句子
+TRANSLATION_MEMORY_PRELOAD = 20000
+
+# 默认的翻译方向，单词查词典只用于英译中
+TRANSLATION_DEFAULT_PAIR = ("en", "zh")
+# 翻译界面可选的语言之间的所有方向，启动后在后台预加载，切换语言时不用临时加载模型
+TRANSLATION_PRELOAD_PAIRS = [(source, target) for source in ("en", "zh", "ja") for target in ("en", "zh", "ja") if source != target]
+# 翻译模型按模型文件大小估算的内存预算，超出时淘汰最久未用的语言对
+TRANSLATION_MEMORY_BUDGET = 2 * 1024 * 1024 * 1024
+
+# 常驻内存的常用词数量(按词频排序的前N个)，这些单词查询不访问SQLite；0为不使用
+DICT_HOT_WORDS = 30000
+
+# 短语查找：不超过该词数的短文本先查短语表和词典，都没有时才调用翻译模型
+PHRASE_LOOKUP = True
+PHRASE_MAX_WORDS = 3
+PHRASE_MAX_CHARS = 40
+# 翻译模型对同一短语翻译满该次数后，译文收录进短语表
+PHRASE_LEARN_MIN_COUNT = 2
+PHRASE_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "phrase_table.db")
+# 人工整理的短语译文，每行为 源语言<TAB>目标语言<TAB>短语<TAB>译文，启动时导入
+PHRASE_TABLE_USER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dict_rsrc", "phrases.tsv")
+
+# 后台加载服务时，请求最多等待对应服务就绪的时间(秒)，超时返回"正在启动"
+SERVICE_WAIT_TIMEOUT = 30
+
+# 调度通道及各自的工作线程数：词典查询、短文本翻译、长文本翻译和OCR互不排队
+SCHEDULER_LANES = {
+    "dictionary": 2,
+    "mt_short": 2,
+    "mt_long": 1,
+    "ocr": max(2, OCR_WORKER_COUNT * 2),
+}
+# 不超过该字符数的文本走短文本翻译通道
+MT_SHORT_MAX_CHARS = 200
+
+dict_db_path = DEFAULT_DB_PATH
+dictionary = None
+phrase_table = None
+text_precheck = TextPrecheck(OCR_PRECHECK_MIN_STD, OCR_PRECHECK_MIN_EDGE_DENSITY, OCR_PRECHECK_MIN_COMPONENTS)
+ocr_registry = OCRModelRegistry(OCR_RSS_BUDGET, OCR_MAX_MODELS)
+refinements = ProgressiveResults(max_workers=OCR_WORKER_COUNT)
+installed_languages = None
+translation_cache = None
+model_versions = {}
+translation_memory = TranslationMemory(TRANSLATION_MEMORY_MIN_SIMILARITY, TRANSLATION_MEMORY_MIN_CHARS,
+                                       TRANSLATION_MEMORY_MAX_ENTRIES) if TRANSLATION_MEMORY else None
+translators = TranslatorRegistry(TRANSLATION_MEMORY_BUDGET, TRANSLATION_MAX_BATCH_TOKENS, TRANSLATION_BEAM_SIZE)
+services = ServiceRegistry()
+# 托盘、翻译界面和命令行同时发来相同的截图或文本时，只计算一次
+ocr_flights = SingleFlight()
+translation_flights = SingleFlight()
+# 调度通道的工作线程在 start_services() 中创建：OCR工作进程以spawn方式启动会重新导入本模块，
+# 在模块级创建会让每个工作进程都带上一组空转的通道线程
+scheduler = None
+# 截图翻译流程的作业，新截图取代旧截图时丢弃旧作业排队中的任务
+jobs = JobRegistry()
+
+def load_dictionary(status):
+    """初始化本地词典和短语表，载入常用词层，并用一次查询预热SQLite的页缓存"""
+    global dictionary, phrase_table
+
+    # dict_build.py 生成的优化副本存在时使用副本
+    db_path = resolve_db_path(dict_db_path)
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"词典文件不存在: {db_path}")
+    if db_path == dict_db_path:
+        print("未找到词典的优化副本，运行 dict_build.py 生成后查询更快")
+    loaded = StarDictSQLite(db_path)
+    hot_tier = loaded.load_hot_tier(DICT_HOT_WORDS)
+    if hot_tier is not None:
+        print(f"常用词层: {len(hot_tier)} 个单词，约 {hot_tier.memory_bytes / 1024 / 1024:.1f}MB")
+        status.loaded(hot_words=len(hot_tier), hot_tier_mb=round(hot_tier.memory_bytes / 1024 / 1024, 1))
+    else:
+        status.loaded()
+    start = time.perf_counter()
+    loaded.lookup_word("hello")
+    status.warmed(time.perf_counter() - start)
+    dictionary = loaded
+    if PHRASE_LOOKUP:
+        table = PhraseTable(PHRASE_MAX_WORDS, PHRASE_MAX_CHARS, PHRASE_LEARN_MIN_COUNT, disk_path=PHRASE_TABLE_PATH)
+        imported = table.import_tsv(PHRASE_TABLE_USER_PATH)
+        if imported:
+            print(f"导入人工短语译文 {imported} 条")
+        phrase_table = table
+
+def ocr_kwargs_with_profile(tier: str, lang: str):
+    """在默认参数上应用 ocr_tuning.py 为该档模型保存的调优结果，返回 (参数, 调优摘要)"""
+    ocr_kwargs = dict(OCR_KWARGS)
+    profile = load_profile(profile_path(tier, lang, OCR_PROFILE_PATH), tier, lang)
+    if profile is None:
+        return ocr_kwargs, None
+    ocr_kwargs.update(profile["ocr_kwargs"])
+    # 调优时单个进程独占全部线程，这里不能超过每个工作进程分到的线程数
+    ocr_kwargs["cpu_threads"] = min(ocr_kwargs["cpu_threads"], OCR_KWARGS["cpu_threads"])
+    print(f"应用OCR调优参数({tier}:{profile['rec_model']}): {profile['params']} (调优时加速 x{profile['speedup']})")
+    return ocr_kwargs, {"params": profile["params"], "created": profile["created"]}
+
+def tier_key(tier: str, lang: str) -> str:
+    """注册表中的模型键，识别模型相同的语言(如ch和japan)共用同一个实例"""
+    return f"{tier}:{tier_ocr_kwargs(tier, {'lang': lang})['text_recognition_model_name']}"
+
+def create_ocr_tier(tier: str, lang: str, num_workers: int, status=None) -> OCRTier:
+    """启动一档OCR模型的工作进程池以及批处理、缓存、分块等外围组件
+
+    OCR工作进程以spawn方式启动会重新导入本模块，所以只能在主进程的入口中调用
+    """
+    ocr_kwargs, tuning = ocr_kwargs_with_profile(tier, lang)
+    ocr_kwargs = tier_ocr_kwargs(tier, dict(ocr_kwargs, lang=lang))
+
+    # 每个工作进程各自加载并预热模型，全部加载完成后进入预热阶段
+    loaded_workers = []
+    def on_loaded(worker_id):
+        loaded_workers.append(worker_id)
+        if status is not None and len(loaded_workers) == num_workers:
+            status.loaded(workers=num_workers, det_model=ocr_kwargs["text_detection_model_name"],
+                          rec_model=ocr_kwargs["text_recognition_model_name"], tuning_profile=tuning)
+    pool = OCRWorkerPool(num_workers, ocr_kwargs, call_timeout=OCR_CALL_TIMEOUT).start(on_loaded)
+
+    # 只有精确档的结果写入磁盘缓存，非默认语言使用单独的缓存文件
+    disk_path = None
+    if tier == "accurate":
+        root, ext = os.path.splitext(OCR_CACHE_PATH)
+        disk_path = OCR_CACHE_PATH if lang == OCR_DEFAULT_LANG else f"{root}_{lang}{ext}"
+    cache = OCRResultCache(OCR_CACHE_MAX_ENTRIES, OCR_CACHE_MAX_BYTES, OCR_CACHE_MAX_DISTANCE, disk_path=disk_path,
+                           perceptual=OCR_CACHE_PERCEPTUAL)
+    ocr_tier = OCRTier(tier, pool, cache, text_precheck if OCR_PRECHECK else None,
+                       OCR_MAX_BATCH_SIZE, OCR_MAX_BATCH_WAIT,
+                       OCR_TILE_MAX_PIXELS, OCR_TILE_SIZE, OCR_TILE_OVERLAP,
+                       OCR_INCREMENTAL_TILE_SIZE, OCR_INCREMENTAL_MAX_CHANGED_RATIO,
+                       OCR_FAST_PATH_MIN_SCORE if OCR_FAST_PATH else None)
+
+    # 工作进程内已各自预热，这里经过批处理链路再跑一次，记录端到端的推理延迟
+    warmup_seconds = ocr_tier.warmup()
+    if status is not None:
+        status.warmed(warmup_seconds,
+                      worker_warmup_seconds=round(max(w["warmup_seconds"] or 0.0 for w in pool.stats()["per_worker"]), 3))
+    return ocr_tier
+
+def load_ocr_tier(status, tier: str, num_workers: int):
+    """加载默认语言的一档模型，常驻注册表不会被淘汰"""
+    ocr_tier = create_ocr_tier(tier, OCR_DEFAULT_LANG, num_workers, status)
+    ocr_registry.add(tier_key(tier, OCR_DEFAULT_LANG), ocr_tier, pinned=True)
+
+def load_translation(status):
+    """加载默认方向的翻译模型并预热，其余语言对在就绪后转入后台预加载"""
+    global installed_languages, translation_cache
+
+    installed_languages = argostranslate.translate.get_installed_languages()
+    translators.set_languages(installed_languages)
+    # 记录已安装翻译包的版本，作为翻译缓存键的一部分
+    for package in argostranslate.package.get_installed_packages():
+        model_versions[(package.from_code, package.to_code)] = f"{package.from_code}-{package.to_code}@{package.package_version}"
+    translation_cache = TranslationCache(TRANSLATION_CACHE_MAX_ENTRIES, TRANSLATION_CACHE_MAX_BYTES,
+                                         disk_path=TRANSLATION_CACHE_PATH)
+    if translation_memory is not None:
+        # 缓存中的整段文本不放进翻译记忆，只收录单句
+        for source, target, version, text, translated in translation_cache.disk_entries(TRANSLATION_MEMORY_PRELOAD):
+            paragraphs = split_sentences(text)
+            if len(paragraphs) == 1 and len(paragraphs[0]) == 1:
+                translation_memory.add(text, translated, (source, target, version))
+    status.loaded(languages=[lang.code for lang in installed_languages])
+    start = time.perf_counter()
+    translators.preload([TRANSLATION_DEFAULT_PAIR], pinned=True)
+    status.warmed(time.perf_counter() - start)
+    translators.preload(TRANSLATION_PRELOAD_PAIRS, background=True)
+
+def translation_model_version(source: str, target: str) -> str:
+    """语言对的模型版本，没有直接的翻译包时经英文中转，由两段的版本组成"""
+    version = model_versions.get((source, target))
+    if version is None:
+        version = "+".join(model_versions.get(pair, "?") for pair in ((source, "en"), ("en", target)))
+    return version
+
+def translate_cached(text: str, source: str, target: str):
+    """整段文本先查翻译缓存；未命中时分句，逐句查缓存，剩下的句子整批翻译后逐句写入缓存
+
+    返回 (译文, 整段的缓存命中类型, 句子数, 命中缓存的句子数, 命中翻译记忆的句子数)
+    """
+    version = translation_model_version(source, target)
+    translated, cache_hit = translation_cache.get(text, source, target, version)
+    if translated is not None:
+        return translated, cache_hit, None, None, None
+
+    paragraphs, sentences, done = cached_sentences(text, source, target, version)
+    sentence_hits = len(done)
+
+    pending = [sentence for sentence in sentences if sentence not in done]
+    memory_hits = translate_sentences(pending, source, target, version, done)
+
+    translated = join_sentences([[done[sentence] for sentence in paragraph] for paragraph in paragraphs], target)
+    if len(paragraphs) > 1 or len(sentences) > 1:
+        translation_cache.put(text, source, target, version, translated)
+    return translated, None, len(sentences), sentence_hits, memory_hits
+
+def cached_sentences(text: str, source: str, target: str, version: str):
+    """分句并逐句查缓存，返回 (分段的句子, 去重后的句子, 已缓存的译文)"""
+    paragraphs = split_sentences(text)
+    sentences = list(dict.fromkeys(sentence for paragraph in paragraphs for sentence in paragraph))
+    done = {}
+    # 只有一句时整段和句子是同一个缓存键，调用前已经查过
+    if len(paragraphs) > 1 or len(sentences) > 1:
+        for sentence in sentences:
+            value, _ = translation_cache.get(sentence, source, target, version)
+            if value is not None:
+                done[sentence] = value
+    return paragraphs, sentences, done
+
+def translate_sentences(sentences: List[str], source: str, target: str, version: str, done: Dict[str, str]) -> int:
+    """先查翻译记忆，其余句子整批翻译，译文写入 done；返回命中翻译记忆的句子数
+
+    模型翻译的结果写入逐句缓存并加入翻译记忆；翻译记忆改写出的译文不写入逐句缓存。
+    """
+    scope = (source, target, version)
+    memory_hits = 0
+    if translation_memory is not None:
+        for sentence in sentences:
+            match = translation_memory.lookup(sentence, scope)
+            if match is not None:
+                done[sentence] = match[0]
+                memory_hits += 1
+
+    pending = [sentence for sentence in sentences if sentence not in done]
+    if not pending:
+        return memory_hits
+    with translators.use(source, target) as translator:
+        translated_sentences = translator.translate_batch(pending)
+    for sentence, value in zip(pending, translated_sentences):
+        done[sentence] = value
+        translation_cache.put(sentence, source, target, version, value)
+        if translation_memory is not None:
+            translation_memory.add(sentence, value, scope)
+    return memory_hits
+
+def lookup_phrase(text: str, source: str, target: str, priority: str = "normal", job_id: str = None):
+    """短文本先查短语表，英译中再查词典，返回 (译文, 来源)；不是短语或都没有时返回None，改用翻译模型
+
+    短语表随词典一起加载，词典还没就绪时直接改用翻译模型
+    """
+    if phrase_table is None or not phrase_table.accepts(text):
+        return None
+    dictionary_lookup = None
+    if (source, target) == TRANSLATION_DEFAULT_PAIR:
+        dictionary_lookup = lambda phrase: schedule("dictionary", dictionary.lookup_phrase, phrase,
+                                                    priority=priority, job_id=job_id)
+    return phrase_table.lookup(text, source, target, translation_model_version(source, target), dictionary_lookup)
+
+def mt_lane(text_length: int) -> str:
+    """按文本长度选择机器翻译的调度通道"""
+    return "mt_short" if text_length <= MT_SHORT_MAX_CHARS else "mt_long"
+
+def translate_stream(text: str, source: str, target: str, priority: str = "normal", job_id: str = None):
+    """流式翻译：按原文顺序逐句产出要追加到译文末尾的片段
+
+    已缓存的句子立即产出；未缓存的句子第一批只翻一句，之后每批翻倍，
+    首段译文的等待时间与全文长度无关，后面的批次仍然整批翻译。全部片段拼起来与 translate_cached 的结果一致。
+    """
+    version = translation_model_version(source, target)
+    translated, cache_hit = translation_cache.get(text, source, target, version)
+    if translated is not None:
+        yield translated
+        return
+
+    paragraphs, sentences, done = cached_sentences(text, source, target, version)
+    pending = [sentence for sentence in sentences if sentence not in done]
+    batch_size = TRANSLATION_STREAM_FIRST_BATCH
+    separator = sentence_separator(target)
+    prefix = ""
+    for i, paragraph in enumerate(paragraphs):
+        if i > 0:
+            prefix += "\n"
+        for j, sentence in enumerate(paragraph):
+            if sentence not in done:
+                # pending按原文顺序排列，第一个未翻译的句子就是当前这一句
+                batch, pending = pending[:batch_size], pending[batch_size:]
+                batch_size = min(batch_size * 2, TRANSLATION_STREAM_MAX_BATCH)
+                # 每批按自身长度调度，第一句通常走短文本通道，不会排在别人的长文本后面
+                schedule(mt_lane(sum(len(sentence) for sentence in batch)), translate_sentences,
+                         batch, source, target, version, done, priority=priority, job_id=job_id)
+            yield prefix + (separator if j > 0 else "") + done[sentence]
+            prefix = ""
+    if prefix:
+        yield prefix
+
+    if len(paragraphs) > 1 or len(sentences) > 1:
+        translated = join_sentences([[done[sentence] for sentence in paragraph] for paragraph in paragraphs], target)
+        translation_cache.put(text, source, target, version, translated)
+
+def start_services():
+    """在后台线程中加载各个服务后立即返回，端口可以马上绑定，哪个服务先就绪就先对外可用"""
+    global scheduler
+    scheduler = LaneScheduler(SCHEDULER_LANES)
+    services.start("dictionary", load_dictionary)
+    services.start("ocr", lambda status: load_ocr_tier(status, "accurate", OCR_WORKER_COUNT))
+    if OCR_FAST_WORKER_COUNT > 0:
+        services.start("ocr_fast", lambda status: load_ocr_tier(status, "fast", OCR_FAST_WORKER_COUNT))
+    services.start("translation", load_translation)
+
+def schedule(lane: str, fn, *args, priority: str = "normal", job_id: str = None):
+    """在调度通道中执行并等待结果；所属作业被取消时，还在排队的任务直接丢弃，抛出 JobCancelled"""
+    jobs.check(job_id)
+    future = scheduler.submit(lane, fn, *args, priority=priority)
+    jobs.track(job_id, future)
+    try:
+        return future.result()
+    except CancelledError:
+        raise JobCancelled(job_id)
+
+def run_coalesced(flights: SingleFlight, key, job_id: str, fn):
+    """合并相同的计算，返回 (结果, 是否共用)；共用的计算属于已被取消的其他作业时自己重新计算"""
+    try:
+        return flights.do(key, fn)
+    except JobCancelled as e:
+        if e.job_id == job_id:
+            raise
+        return fn(), False
+
+def request_job() -> str:
+    """登记请求所属的作业，带 supersede 时取消同组之前的作业；作业已被取消时抛出 JobCancelled"""
+    job_id = request_option('job_id')
+    jobs.begin(job_id, request_option('job_group', 'capture'), request_flag('supersede'))
+    jobs.check(job_id)
+    return job_id
+
+def job_cancelled(e: JobCancelled):
+    """作业已取消时的统一返回"""
+    return jsonify({
+        "success": False,
+        "cancelled": True,
+        "error": str(e),
+        "job_id": e.job_id
+    })
+
+def service_unavailable(e: ServiceUnavailable):
+    """服务未就绪时的统一返回"""
+    return jsonify({
+        "success": False,
+        "error": str(e),
+        "service": e.name,
+        "state": e.state
+    })
+
+def request_option(name: str, default=None):
+    """读取请求参数，依次查找URL参数、表单字段和JSON字段"""
+    if name in request.args:
+        return request.args[name]
+    if name in request.form:
+        return request.form[name]
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and name in data:
+        return data[name]
+    return default
+
+def request_priority() -> str:
+    """请求的优先级提示 high/normal/low，决定在调度通道内的先后"""
+    return request_option('priority', 'normal')
+
+def request_flag(name: str) -> bool:
+    """读取布尔型请求参数"""
+    value = request_option(name, False)
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+def fast_tier_available() -> bool:
+    """快速档已就绪，或仍在加载(请求会等待它)；未启用或加载失败时回退到精确档"""
+    return services.state("ocr_fast") not in (None, "failed")
+
+def use_tier(tier: str, lang: str):
+    """取出某种语言的一档模型使用，默认语言等待启动加载完成，其他语言按需加载"""
+    if lang == OCR_DEFAULT_LANG:
+        services.require("ocr" if tier == "accurate" else "ocr_fast", SERVICE_WAIT_TIMEOUT)
+    workers = OCR_EXTRA_LANG_WORKER_COUNT
+    return ocr_registry.use(tier_key(tier, lang), lambda: create_ocr_tier(tier, lang, workers))
+
+def detect_capture_lang(image, quality: str, cache_key):
+    """lang=auto：用中日英通用的模型识别一次，按文字类别(拉丁字母/汉字/假名)选择语言
+
+    探测用的档位与请求的档位一致，返回 (语言, 各类字符数, 探测结果)；识别出的语言与探测模型
+    共用同一个识别模型(中文、日文)时，探测结果 (档位, 结果, 缓存命中类型) 直接作为最终结果，
+    否则为None，需要用该语言的模型再识别一次。
+    """
+    probe_tier = "accurate" if quality == "accurate" or not fast_tier_available() else "fast"
+    with use_tier(probe_tier, OCR_AUTO_PROBE_LANG) as ocr_tier:
+        res, cache_hit = ocr_tier.run(image, cache_key)
+    lang, counts = detect_lang(res["rec_texts"])
+    if tier_key(probe_tier, lang) != tier_key(probe_tier, OCR_AUTO_PROBE_LANG):
+        return lang, counts, None
+    return lang, counts, (probe_tier, res, cache_hit)
+
+def run_ocr(image, quality: str, lang: str, cache_key=None):
+    """按请求的识别质量和语言选择模型识别，返回 (结果, 附加的返回字段)
+
+    cache_key 为调用方已经算好的缓存键，各档、各语言的缓存共用同一个键，整张图只哈希一次
+    """
+    if quality not in QUALITIES:
+        raise ValueError(f"不支持的quality参数: {quality}，可选 {', '.join(QUALITIES)}")
+    if lang not in OCR_LANGS and lang != "auto":
+        raise ValueError(f"不支持的lang参数: {lang}，可选 auto, {', '.join(OCR_LANGS)}")
     
-    @contextmanager
-    def get_connection(self):
-        """使用上下文管理器自动管理连接"""
-        conn = sqlite3.connect(self.db_path)
-        try:
-            yield conn
-        finally:
-            conn.close()
+    if cache_key is None:
+        cache_key = image_key(image, OCR_CACHE_PERCEPTUAL)
+    script = probe = None
+    if lang == "auto":
+        lang, script, probe = detect_capture_lang(image, quality, cache_key)
+    extra = {"lang": lang, "script": script, "refine_id": None}
     
-    def lookup_word(self, word: str) -> Optional[Dict]:
-        """查询单词的完整信息"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT id, word, sw, phonetic, definition, translation, pos, collins, oxford, tag, bnc, frq, exchange, detail, audio FROM stardict WHERE word = ? OR sw = ?",
-                (word.lower(), word.lower())
-            )
-            result = cursor.fetchone()
-            if result:
-                fields = ['id', 'word', 'sw', 'phonetic', 'definition', 'translation', 
-                         'pos', 'collins', 'oxford', 'tag', 'bnc', 'frq', 'exchange', 'detail', 'audio']
-                return dict(zip(fields, result))
-        return None
+    if probe is not None:
+        probe_tier, res, cache_hit = probe
+        if probe_tier == "fast" and quality == "progressive" and (
+                OCR_REFINE_ALWAYS or min_score(res) < OCR_REFINE_MIN_SCORE):
+            extra["refine_id"] = refinements.submit(refine_ocr, image, cache_key, lang)
+        return res, dict(extra, cache=cache_hit, quality=probe_tier)
     
-    def _parse_pos_distribution(self, pos_str: str) -> Dict[str, int]:
-        """解析词性分布字符串"""
-        pos_dist = {}
-        if pos_str:
-            parts = pos_str.split('/')
-            for part in parts:
-                if ':' in part:
-                    pos, percent = part.split(':')
-                    pos_dist[pos.strip()] = int(percent)
-        return pos_dist
+    if quality == "accurate" or not fast_tier_available():
+        with use_tier("accurate", lang) as ocr_tier:
+            res, cache_hit = ocr_tier.run(image, cache_key)
+        return res, dict(extra, cache=cache_hit, quality="accurate")
     
-    def get_detailed_translations(self, word: str) -> Dict:
-        """获取单词的详细翻译信息"""
-        result = self.lookup_word(word)
-        if not result:
-            return {}
-        
-        # 解析词性分布
-        pos_dist = self._parse_pos_distribution(result.get('pos', ''))
-        
-        # 构建返回结果
-        detailed_info = {
-            'word': result.get('word'),
-            'phonetic': result.get('phonetic'),
-            'pos_distribution': pos_dist,
-            'definition': result.get('definition', ''),
-            'translation': result.get('translation', ''),
-            'collins_star': result.get('collins'),
-            'is_oxford_core': bool(result.get('oxford')),
-            'frequency': result.get('frq')
-        }
-        
-        return detailed_info
+    # 精确档已有同一张截图(像素完全相同)的结果时直接使用，不必再跑快速档；
+    # 只是顺便看一眼，不计入精确档缓存的命中统计
+    with use_tier("fast", lang) as ocr_tier:
+        accurate_tier = ocr_registry.get(tier_key("accurate", lang))
+        if accurate_tier is not None:
+            res = accurate_tier.cache.peek(cache_key)
+            if res is not None:
+                return res, dict(extra, cache="exact", quality="accurate")
+        res, cache_hit = ocr_tier.run(image, cache_key)
     
-    def format_dictionary_output(self, word: str) -> str:
-        """格式化字典查询输出"""
-        detailed_info = self.get_detailed_translations(word)
-        if not detailed_info:
-            return f"未找到单词: {word}"
-        
-        output_parts = []
-        
-        # 中文翻译
-        if detailed_info['translation']:
-            translation = detailed_info['translation']
-            # 清理翻译文本，取主要部分
-            lines = translation.split('\n')
-            clean_translations = []
-            for line in lines[:3]:  # 取前3行
-                line = line.strip()
-                if line and '。' not in line and len(line) < 100:
-                    clean_translations.append(line)
-            
-            if clean_translations:
-                output_parts.append(f"中文释义: {'; '.join(clean_translations)}")
-        
-        # 词性分布
-        if detailed_info['pos_distribution']:
-            pos_str = "，".join([f"{pos}({percent}%)" for pos, percent in detailed_info['pos_distribution'].items()])
-            output_parts.append(f"词性: {pos_str}")
-        
-        # 基本信息
-        if detailed_info['phonetic']:
-            output_parts.append(f"音标: {detailed_info['phonetic']}")
-        
-        # 英文释义（限制长度）
-        if detailed_info['definition']:
-            definition = detailed_info['definition']
-            if len(definition) > 200:
-                definition = definition[:200] + "..."
-            output_parts.append(f"英文释义: {definition}")
-        
-        return "\n".join(output_parts)
-
-# 初始化字典
-print("正在初始化本地词典...")
-dict_db_path = r"C:\MY_SPACE\Sources\tools\screenshot_translator\dict_rsrc\ecdict-sqlite-28\stardict.db"
-dictionary = StarDictSQLite(dict_db_path)
-print("本地词典初始化完成！")
-
-# 启动时一次性加载OCR模型
-print("正在加载OCR模型...")
-ocr = PaddleOCR(
-    use_doc_orientation_classify=False,
-    use_doc_unwarping=False,
-    use_textline_orientation=False,
-    device='cpu',
-    lang='en',
-)
-print("OCR模型加载完成！")
-
-# 启动时预加载翻译模型
-print("正在加载翻译模型...")
-installed_languages = argostranslate.translate.get_installed_languages()
-print("翻译模型加载完成！")
+    if quality == "progressive" and (OCR_REFINE_ALWAYS or min_score(res) < OCR_REFINE_MIN_SCORE):
+        extra["refine_id"] = refinements.submit(refine_ocr, image, cache_key, lang)
+    return res, dict(extra, cache=cache_hit, quality="fast")
+
+def refine_ocr(image, cache_key, lang: str):
+    """后台精修：用精确档重新识别"""
+    with use_tier("accurate", lang) as ocr_tier:
+        return ocr_tier.run(image, cache_key)[0]
+
+def ocr_response(res, **extra):
+    """OCR结果的统一返回格式；structured 时按阅读顺序分段，文本以换行分隔段落"""
+    if request_flag('structured'):
+        layout = build_layout(res)
+        return jsonify(dict({
+            "success": True,
+            "text": "\n".join(p["text"] for p in layout["paragraphs"]),
+            "lines": layout["lines"],
+            "paragraphs": layout["paragraphs"]
+        }, **extra))
+    
+    all_text_lines = []
+    if "rec_texts" in res and res["rec_texts"]:
+        all_text_lines.extend(res["rec_texts"])
+    
+    all_text = " ".join(all_text_lines) if all_text_lines else ""
+    
+    return jsonify(dict({
+        "success": True,
+        "text": all_text
+    }, **extra))
 
 def is_single_word(text: str) -> bool:
     """判断文本是否为单个单词"""
@@ -152,25 +591,62 @@ def is_single_word(text: str) -> bool:
 def ocr_endpoint():
     """OCR识别接口"""
     try:
-        # 接收base64图片
-        data = request.json
-        image_path = data['image']
-        
-        # OCR识别
-        result = ocr.predict(input=image_path)
+        job_id = request_job()
+        # 直接在内存中解码图片(multipart/base64/原始像素缓冲区)，不经过磁盘
+        image = decode_request_image(request)
         
-        # 解析结果
-        all_text_lines = []
-        for res in result:
-            if "rec_texts" in res and res["rec_texts"]:
-                all_text_lines.extend(res["rec_texts"])
+        # 空白、纯色或图标等明显没有文字的截图不运行检测模型
+        if OCR_PRECHECK:
+            has_text, features = text_precheck.has_text(image)
+            if not has_text:
+                return jsonify({
+                    "success": True,
+                    "text": "",
+                    "lines": [],
+                    "paragraphs": [],
+                    "rejected": True,
+                    "precheck": features
+                })
         
-        all_text = " ".join(all_text_lines) if all_text_lines else ""
+        # fast只用快速档，accurate只用精确档，progressive先返回快速档结果，置信度不足时在后台精修
+        # lang 指定识别语言，auto 时按截图中的文字类别自动选择
+        quality = request_option('quality', OCR_DEFAULT_QUALITY)
+        lang = request_option('lang', OCR_DEFAULT_LANG)
+        priority = request_priority()
+        # 同一个键既用于合并相同的并发请求，也用于各档的结果缓存，整张图只哈希一次
+        cache_key = image_key(image, OCR_CACHE_PERCEPTUAL)
+        (res, extra), coalesced = run_coalesced(
+            ocr_flights, (cache_key.exact, quality, lang), job_id,
+            lambda: schedule("ocr", run_ocr, image, quality, lang, cache_key, priority=priority, job_id=job_id))
+        # 作业被取消时还没开始的精修任务一并丢弃
+        if extra["refine_id"]:
+            jobs.track(job_id, refinements.future(extra["refine_id"]))
+        return ocr_response(res, coalesced=coalesced, job_id=job_id, **extra)
         
+    except JobCancelled as e:
+        return job_cancelled(e)
+    except ServiceUnavailable as e:
+        return service_unavailable(e)
+    except Exception as e:
         return jsonify({
-            "success": True,
-            "text": all_text
+            "success": False,
+            "error": str(e)
         })
+
+@app.route('/ocr/refined/<refine_id>', methods=['GET'])
+def ocr_refined_endpoint(refine_id):
+    """获取progressive模式的精修结果，wait 为最长等待秒数"""
+    try:
+        wait = min(float(request_option('wait', 0)), SERVICE_WAIT_TIMEOUT)
+        job = refinements.get(refine_id, wait)
+        if job is None:
+            return jsonify({
+                "success": False,
+                "error": f"精修任务不存在或已过期: {refine_id}"
+            })
+        if job["state"] != "done":
+            return jsonify(dict(job, success=job["state"] == "pending"))
+        return ocr_response(job["result"], state="done", quality="accurate")
         
     except Exception as e:
         return jsonify({
@@ -184,14 +660,20 @@ def translate_endpoint():
     try:
         data = request.json
         text = data['text'].strip()
+        source_lang = data.get('source_lang') or TRANSLATION_DEFAULT_PAIR[0]
+        target_lang = data.get('target_lang') or TRANSLATION_DEFAULT_PAIR[1]
         
-        print(f"收到翻译请求: '{text}'")
+        print(f"收到翻译请求 ({source_lang} -> {target_lang}): '{text}'")
+        # 所属作业已被新的截图取代时，不再翻译这次的OCR结果
+        job_id = request_job()
         
-        # 判断是否为单个单词
-        if is_single_word(text):
+        # 判断是否为单个单词，词典只有英译中
+        if is_single_word(text) and (source_lang, target_lang) == TRANSLATION_DEFAULT_PAIR:
             # 使用字典查询
+            services.require("dictionary", SERVICE_WAIT_TIMEOUT)
             # print(f"使用字典查询单词: {text}")
-            dict_result = dictionary.format_dictionary_output(text)
+            dict_result = schedule("dictionary", dictionary.format_dictionary_output, text,
+                                   priority=request_priority(), job_id=job_id)
             # print(f"字典查询结果:\n{dict_result}")
             return jsonify({
                 "success": True,
@@ -199,16 +681,44 @@ def translate_endpoint():
                 "source": "dictionary"
             })
         else:
-            # 使用argostranslate翻译
+            # 短语先查短语表和词典，查不到才用argostranslate翻译
+            priority = request_priority()
+            phrase = lookup_phrase(text, source_lang, target_lang, priority, job_id)
+            if phrase is not None:
+                return jsonify({
+                    "success": True,
+                    "translated": phrase[0],
+                    "source": phrase[1],
+                    "phrase": True
+                })
+            
+            services.require("translation", SERVICE_WAIT_TIMEOUT)
             # print(f"使用机器翻译文本: {text}")
-            translated = argostranslate.translate.translate(text, "en", "zh")
+            key = (normalize_text(text), source_lang, target_lang)
+            (translated, cache_hit, sentences, sentence_hits, memory_hits), coalesced = run_coalesced(
+                translation_flights, key, job_id,
+                lambda: schedule(mt_lane(len(text)), translate_cached, text, source_lang, target_lang,
+                                 priority=priority, job_id=job_id))
+            if phrase_table is not None and not coalesced:
+                phrase_table.learn(text, source_lang, target_lang,
+                                   translation_model_version(source_lang, target_lang), translated)
             # print(f"机器翻译结果: {translated}")
             return jsonify({
                 "success": True,
                 "translated": translated,
-                "source": "argostranslate"
+                "source": "argostranslate",
+                "cache": cache_hit,
+                "sentences": sentences,
+                "sentence_cache_hits": sentence_hits,
+                "memory_hits": memory_hits,
+                "coalesced": coalesced
             })
         
+    except JobCancelled as e:
+        print(f"翻译已取消: {e}")
+        return job_cancelled(e)
+    except ServiceUnavailable as e:
+        return service_unavailable(e)
     except Exception as e:
         print(f"翻译出错: {e}")
         return jsonify({
@@ -216,6 +726,115 @@ def translate_endpoint():
             "error": str(e)
         })
 
+def sse_event(payload: Dict) -> str:
+    """一条Server-Sent Events消息"""
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@app.route('/translate/stream', methods=['POST'])
+def translate_stream_endpoint():
+    """流式翻译接口(Server-Sent Events)
+
+    每条消息为 {"chunk": 片段}，按顺序追加即为完整译文；最后一条为 {"done": true, "success": ...}
+    """
+    data = request.json or {}
+    text = data.get('text', '').strip()
+    source_lang = data.get('source_lang') or TRANSLATION_DEFAULT_PAIR[0]
+    target_lang = data.get('target_lang') or TRANSLATION_DEFAULT_PAIR[1]
+    priority = data.get('priority') or 'normal'
+    print(f"收到流式翻译请求 ({source_lang} -> {target_lang}): '{text}'")
+
+    def generate():
+        try:
+            job_id = request_job()
+            if is_single_word(text) and (source_lang, target_lang) == TRANSLATION_DEFAULT_PAIR:
+                services.require("dictionary", SERVICE_WAIT_TIMEOUT)
+                yield sse_event({"chunk": schedule("dictionary", dictionary.format_dictionary_output, text,
+                                                   priority=priority, job_id=job_id)})
+                yield sse_event({"done": True, "success": True, "source": "dictionary"})
+                return
+
+            phrase = lookup_phrase(text, source_lang, target_lang, priority, job_id)
+            if phrase is not None:
+                yield sse_event({"chunk": phrase[0]})
+                yield sse_event({"done": True, "success": True, "source": phrase[1], "phrase": True})
+                return
+
+            services.require("translation", SERVICE_WAIT_TIMEOUT)
+            chunks = []
+            for chunk in translate_stream(text, source_lang, target_lang, priority, job_id):
+                chunks.append(chunk)
+                yield sse_event({"chunk": chunk})
+            if phrase_table is not None:
+                phrase_table.learn(text, source_lang, target_lang,
+                                   translation_model_version(source_lang, target_lang), "".join(chunks))
+            yield sse_event({"done": True, "success": True, "source": "argostranslate", "chunks": len(chunks)})
+        except JobCancelled as e:
+            print(f"流式翻译已取消: {e}")
+            yield sse_event({"done": True, "success": False, "cancelled": True, "error": str(e)})
+        except Exception as e:
+            print(f"流式翻译出错: {e}")
+            yield sse_event({"done": True, "success": False, "error": str(e)})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/translate/prepare', methods=['POST'])
+def translate_prepare_endpoint():
+    """预加载语言对的翻译模型，界面切换语言时调用，加载在后台进行，不等待完成"""
+    try:
+        data = request.json
+        source_lang = data['source_lang']
+        target_lang = data['target_lang']
+        services.require("translation", SERVICE_WAIT_TIMEOUT)
+        if not translators.available(source_lang, target_lang):
+            return jsonify({
+                "success": False,
+                "error": f"没有安装 {source_lang} -> {target_lang} 的翻译模型"
+            })
+        loaded = (source_lang, target_lang) in translators.pairs()
+        if not loaded:
+            translators.preload([(source_lang, target_lang)], background=True)
+        return jsonify({
+            "success": True,
+            "loaded": loaded
+        })
+
+    except ServiceUnavailable as e:
+        return service_unavailable(e)
+    except Exception as e:
+        print(f"预加载翻译模型出错: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        })
+
+@app.route('/jobs', methods=['POST'])
+def job_begin_endpoint():
+    """登记一次截图翻译作业；托盘程序在用户开始新的截图时调用，带 supersede 立即取消之前的作业"""
+    try:
+        job_id = request_option('job_id')
+        if not job_id:
+            raise ValueError("缺少job_id参数")
+        superseded = jobs.begin(job_id, request_option('job_group', 'capture'), request_flag('supersede'))
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "superseded": superseded
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        })
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def job_cancel_endpoint(job_id):
+    """取消作业，丢弃它还在排队的任务"""
+    return jsonify({
+        "success": True,
+        "cancelled": jobs.cancel(job_id)
+    })
+
 @app.route('/dict_lookup', methods=['POST'])
 def dict_lookup_endpoint():
     """专门的字典查询接口"""
@@ -224,7 +843,9 @@ def dict_lookup_endpoint():
         word = data['word'].strip()
         
         print(f"字典查询请求: {word}")
-        dict_result = dictionary.format_dictionary_output(word)
+        services.require("dictionary", SERVICE_WAIT_TIMEOUT)
+        dict_result = schedule("dictionary", dictionary.format_dictionary_output, word,
+                               priority=request_priority())
         print(f"字典查询结果:\n{dict_result}")
         
         return jsonify({
@@ -232,6 +853,8 @@ def dict_lookup_endpoint():
             "result": dict_result
         })
         
+    except ServiceUnavailable as e:
+        return service_unavailable(e)
     except Exception as e:
         print(f"字典查询出错: {e}")
         return jsonify({
@@ -241,15 +864,34 @@ def dict_lookup_endpoint():
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """健康检查接口"""
+    """健康检查接口：各服务的加载状态(loading/warming/ready/failed)、加载耗时和预热延迟"""
     return jsonify({
-        "status": "healthy",
-        "services": {
-            "dictionary": "available",
-            "ocr": "available", 
-            "translation": "available"
+        "status": services.overall(),
+        "services": services.stats(),
+        "ocr_models": ocr_registry.stats(),
+        "ocr_tiers": {key: ocr_tier.stats() for key, ocr_tier in ocr_registry.models().items()},
+        "ocr_refinements": refinements.stats(),
+        "ocr_precheck": text_precheck.stats(),
+        "translation_cache": translation_cache.stats() if translation_cache else None,
+        "translators": translators.stats(),
+        "translation_memory": translation_memory.stats() if translation_memory else None,
+        "dictionary": dictionary.stats() if dictionary else None,
+        "phrase_table": phrase_table.stats() if phrase_table else None,
+        "scheduler": scheduler.stats() if scheduler else None,
+        "jobs": jobs.stats(),
+        "coalescing": {
+            "ocr": ocr_flights.stats(),
+            "translation": translation_flights.stats()
         }
     })
 
 if __name__ == '__main__':
-    app.run(host='127.0.0.1', port=5000, debug=False)
\ No newline at end of file
+    start_services()
+    try:
+        app.run(host='127.0.0.1', port=5000, debug=False, threaded=True)
+    finally:
+        if scheduler is not None:
+            scheduler.close()
+        ocr_registry.close()
+        if dictionary is not None:
+            dictionary.close()
\ No newline at end of file
@@ -0,0 +1,291 @@
+# coding: utf-8
+"""OCR CPU推理参数自动调优
+
+在一组参考截图上依次扫描CPU线程数、MKL-DNN(oneDNN)开关、精度、检测输入尺寸和识别批大小，
+每组参数在独立的工作进程中加载、预热并计时，识别结果与基线差异过大的参数直接淘汰。
+快速档和精确档的检测、识别模型不同，最优参数也不同，每档(及识别模型不同的语言)分别调优，
+各自保存为JSON，服务端启动某一档模型时只应用同一档、同一组模型的调优结果。
+升级PaddleOCR或换机器后重新运行本脚本即可：
+
+    python ocr_tuning.py [参考图片 ...] [--tiers accurate fast] [--langs en ch]
+"""
+
+import argparse
+import difflib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from ocr_engine import DEFAULT_OCR_KWARGS, tier_ocr_kwargs
+from ocr_worker_pool import OCRWorkerPool
+
+# 调优结果的路径模板，每档模型保存为 ocr_profile_<档位>_<识别模型>.json
+DEFAULT_PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "ocr_profile.json")
+
+# 结果文本与基线的相似度低于该值的参数视为影响了识别效果
+MIN_TEXT_SIMILARITY = 0.97
+
+# 耗时相差不到该比例时保留更保守的取值(更少的线程、默认的输入尺寸)
+TIE_TOLERANCE = 0.03
+
+
+def _paddleocr_version() -> Optional[str]:
+    try:
+        from importlib.metadata import version
+        return version("paddleocr")
+    except Exception:
+        return None
+
+
+def machine_signature() -> Dict[str, Any]:
+    """调优结果只对同一台机器、同一版本的PaddleOCR有效"""
+    return {
+        "cpu": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "paddleocr": _paddleocr_version(),
+    }
+
+
+def default_worker_threads() -> int:
+    """与服务端的划分一致：每4个核一个精确档进程，快速档进程数减半，线程在两档的全部进程之间平分"""
+    cpu_count = os.cpu_count() or 4
+    accurate_workers = max(1, cpu_count // 4)
+    return max(1, cpu_count // (accurate_workers + max(1, accurate_workers // 2)))
+
+
+def tier_models(tier: str, lang: str) -> Dict[str, str]:
+    """一档模型在某种语言下实际使用的检测和识别模型"""
+    kwargs = tier_ocr_kwargs(tier, {"lang": lang})
+    return {"det_model": kwargs["text_detection_model_name"], "rec_model": kwargs["text_recognition_model_name"]}
+
+
+def profile_path(tier: str, lang: str, path: str = DEFAULT_PROFILE_PATH) -> str:
+    """一档模型的调优结果路径，识别模型相同的语言(如ch和japan)共用同一份"""
+    root, ext = os.path.splitext(path)
+    return f"{root}_{tier}_{tier_models(tier, lang)['rec_model']}{ext}"
+
+
+def search_space(cpu_threads: int, device: str = "cpu") -> Dict[str, List[Any]]:
+    """各参数的候选值，第一个为基线取值
+
+    线程数从少到多排列，更多的线程必须明显更快才会被采用，耗时相当时保留更少的线程。
+    CPU推理只支持fp32，精度只在GPU上扫描。
+    """
+    threads = sorted({max(1, cpu_threads), max(1, cpu_threads // 2), max(1, cpu_threads * 3 // 4)})
+    return {
+        "cpu_threads": threads,
+        "enable_mkldnn": [True, False],
+        "precision": ["fp32"] if device == "cpu" else ["fp32", "fp16"],
+        # None表示使用模型自带的默认值
+        "text_det_limit": [None, (960, "max"), (1280, "max"), (736, "max")],
+        "text_recognition_batch_size": [None, 8, 16],
+    }
+
+
+def apply_params(base_kwargs: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """把候选参数转换成PaddleOCR的构造参数"""
+    kwargs = dict(base_kwargs)
+    for name, value in params.items():
+        if value is None:
+            continue
+        if name == "text_det_limit":
+            kwargs["text_det_limit_side_len"], kwargs["text_det_limit_type"] = value
+        else:
+            kwargs[name] = value
+    return kwargs
+
+
+def make_reference_images() -> List[np.ndarray]:
+    """没有提供参考截图时生成的合成截图：单行、多行段落和整屏大图"""
+    def render(lines: List[str], width: int, height: int, scale: float) -> np.ndarray:
+        image = np.full((height, width, 3), 245, dtype=np.uint8)
+        line_height = int(40 * scale)
+        for i, text in enumerate(lines):
+            cv2.putText(image, text, (16, line_height * (i + 1)), cv2.FONT_HERSHEY_SIMPLEX, scale, (20, 20, 20), 2)
+        return image
+
+    paragraph = [
+        "Screen capture translation works best when the",
+        "recognizer sees clean, horizontal lines of text.",
+        "Each capture is decoded in memory and sent to",
+        "the OCR worker pool for detection and recognition.",
+    ]
+    return [
+        render(["Quick brown fox 12345"], 480, 56, 1.0),
+        render(paragraph, 900, 200, 0.8),
+        render(paragraph * 6, 1920, 1080, 1.2),
+    ]
+
+
+def load_images(paths: List[str]) -> List[np.ndarray]:
+    images = []
+    for path in paths:
+        image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            print(f"跳过无法读取的图片: {path}")
+            continue
+        images.append(image)
+    return images
+
+
+def _result_text(results: List[Dict[str, list]]) -> str:
+    return "\n".join(" ".join(res["rec_texts"]) for res in results)
+
+
+def benchmark(ocr_kwargs: Dict[str, Any], images: List[np.ndarray], repeats: int = 3) -> Dict[str, Any]:
+    """在独立的工作进程中加载一组参数，预热后对参考图片计时，返回耗时中位数和识别文本"""
+    pool = OCRWorkerPool(1, ocr_kwargs).start()
+    try:
+        timings = []
+        results = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            results = [pool.predict(image)[0] for image in images]
+            timings.append(time.perf_counter() - start)
+        stats = pool.stats()["per_worker"][0]
+    finally:
+        pool.shutdown()
+    return {
+        "latency_ms": round(statistics.median(timings) * 1000, 1),
+        "load_seconds": stats["load_seconds"],
+        "warmup_seconds": stats["warmup_seconds"],
+        "text": _result_text(results),
+    }
+
+
+def tune(images: List[np.ndarray], base_kwargs: Dict[str, Any] = None, cpu_threads: int = None,
+         repeats: int = 3, tier: str = "accurate", lang: str = "en") -> Dict[str, Any]:
+    """逐个参数做坐标下降：其他参数固定为当前最优，依次尝试该参数的每个候选值
+
+    网格全扫描的组合数太多，每组又要重新加载模型；逐个参数扫描只需各候选值之和次加载。
+    tier 和 lang 决定加载的检测、识别模型，记录在结果中，服务端只对同一组模型应用。
+    """
+    base_kwargs = tier_ocr_kwargs(tier, dict(DEFAULT_OCR_KWARGS, **dict(base_kwargs or {}, lang=lang)))
+    cpu_threads = cpu_threads or base_kwargs.get("cpu_threads") or default_worker_threads()
+    space = search_space(cpu_threads, base_kwargs.get("device", "cpu"))
+    best = {name: values[0] for name, values in space.items()}
+
+    trials = []
+
+    def run(params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        kwargs = apply_params(base_kwargs, params)
+        print(f"测试参数: {params}")
+        try:
+            result = benchmark(kwargs, images, repeats)
+        except Exception as e:
+            print(f"  失败: {e}")
+            trials.append({"params": dict(params), "error": str(e)})
+            return None
+        print(f"  耗时 {result['latency_ms']:.1f}ms")
+        trials.append({"params": dict(params), "latency_ms": result["latency_ms"],
+                       "load_seconds": result["load_seconds"], "warmup_seconds": result["warmup_seconds"]})
+        return result
+
+    baseline = run(best)
+    if baseline is None:
+        raise RuntimeError("基线参数运行失败，无法调优")
+    best_latency = baseline["latency_ms"]
+
+    for name, values in space.items():
+        for value in values[1:]:
+            params = dict(best, **{name: value})
+            result = run(params)
+            if result is None:
+                continue
+            similarity = difflib.SequenceMatcher(None, baseline["text"], result["text"]).ratio()
+            trials[-1]["similarity"] = round(similarity, 4)
+            if similarity < MIN_TEXT_SIMILARITY:
+                print(f"  识别结果与基线差异过大 (相似度 {similarity:.3f})，淘汰")
+                continue
+            if result["latency_ms"] < best_latency * (1 - TIE_TOLERANCE):
+                best, best_latency = params, result["latency_ms"]
+
+    return {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": machine_signature(),
+        "tier": tier,
+        "lang": lang,
+        **tier_models(tier, lang),
+        "params": best,
+        "ocr_kwargs": apply_params({}, best),
+        "latency_ms": best_latency,
+        "baseline_latency_ms": baseline["latency_ms"],
+        "speedup": round(baseline["latency_ms"] / best_latency, 2) if best_latency else None,
+        "images": len(images),
+        "trials": trials,
+    }
+
+
+def save_profile(profile: Dict[str, Any], path: str = DEFAULT_PROFILE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+
+
+def load_profile(path: str = DEFAULT_PROFILE_PATH, tier: str = None, lang: str = None) -> Optional[Dict[str, Any]]:
+    """读取调优结果；文件不存在、损坏、与当前机器/PaddleOCR版本不符，
+    或指定了 tier/lang 而调优时用的不是同一档、同一组模型时返回None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"读取OCR调优结果失败: {e}")
+        return None
+
+    current = machine_signature()
+    if profile.get("machine") != current:
+        print(f"OCR调优结果与当前环境不符 ({profile.get('machine')} != {current})，请重新运行 ocr_tuning.py")
+        return None
+    if tier is not None:
+        expected = dict(tier_models(tier, lang or DEFAULT_OCR_KWARGS["lang"]), tier=tier)
+        recorded = {name: profile.get(name) for name in expected}
+        if recorded != expected:
+            print(f"OCR调优结果不是针对该档模型的 ({recorded} != {expected})，不应用")
+            return None
+    return profile
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="OCR CPU推理参数自动调优")
+    parser.add_argument("images", nargs="*", help="参考截图，不提供时使用合成图片")
+    parser.add_argument("--output", default=DEFAULT_PROFILE_PATH, help="调优结果的路径模板，档位和识别模型名加在文件名后")
+    parser.add_argument("--tiers", nargs="+", default=["accurate", "fast"], choices=["accurate", "fast"],
+                        help="要调优的模型档位")
+    parser.add_argument("--langs", nargs="+", default=[DEFAULT_OCR_KWARGS["lang"]],
+                        help="要调优的识别语言，识别模型相同的语言只调优一次")
+    parser.add_argument("--threads", type=int, default=None, help="单个工作进程可用的最大CPU线程数，默认与服务端的划分一致")
+    parser.add_argument("--repeats", type=int, default=3, help="每组参数的计时轮数")
+    args = parser.parse_args(argv)
+
+    images = load_images(args.images) if args.images else make_reference_images()
+    if not images:
+        print("没有可用的参考图片")
+        return 1
+
+    for tier in args.tiers:
+        tuned = set()
+        for lang in args.langs:
+            output = profile_path(tier, lang, args.output)
+            if output in tuned:
+                continue
+            tuned.add(output)
+            print(f"调优 {tier} 档 ({lang}, {tier_models(tier, lang)['rec_model']})")
+            profile = tune(images, cpu_threads=args.threads, repeats=args.repeats, tier=tier, lang=lang)
+            save_profile(profile, output)
+            print(f"最优参数: {profile['params']}")
+            print(f"耗时 {profile['baseline_latency_ms']:.1f}ms -> {profile['latency_ms']:.1f}ms (x{profile['speedup']})")
+            print(f"已保存到: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+# coding: utf-8
+
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def _worker_main(worker_id: int, ocr_kwargs: Dict[str, Any], conn):
+    """工作进程入口：加载并预热独立的模型，然后循环处理任务"""
+    try:
+        from ocr_engine import OCREngine
+
+        load_start = time.perf_counter()
+        engine = OCREngine(ocr_kwargs)
+        load_seconds = time.perf_counter() - load_start
+        conn.send(("loaded", {"load_seconds": load_seconds}))
+        warmup_seconds = engine.warmup()
+        conn.send(("ready", {"load_seconds": load_seconds, "warmup_seconds": warmup_seconds}))
+    except Exception as e:
+        conn.send(("failed", f"{e}\n{traceback.format_exc()}"))
+        return
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+
+        method, args, kwargs = job
+        try:
+            if method.startswith("_"):
+                raise AttributeError(f"不允许调用的方法: {method}")
+            result = getattr(engine, method)(*args, **kwargs)
+            conn.send(("ok", result))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class _Worker:
+    """父进程中对一个工作进程的记录"""
+
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.process = None
+        self.conn = None
+        self.jobs = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.busy_since = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        # 重启失败的进程不再回到空闲队列
+        self.failed = False
+
+
+class OCRWorkerPool:
+    """OCR工作进程池
+
+    每个进程持有独立预热的PaddleOCR实例，调度器把任务交给空闲的进程，
+    并发的截图请求因此可以在多核上并行执行，而不是在同一个模型上串行。
+    """
+
+    def __init__(self, num_workers: int, ocr_kwargs: Dict[str, Any] = None, start_timeout: float = 600,
+                 call_timeout: float = 120):
+        self.num_workers = max(1, int(num_workers))
+        self.ocr_kwargs = dict(ocr_kwargs or {})
+        self.start_timeout = start_timeout
+        # 单次调用超过该时间没有返回时认为工作进程卡死，按异常退出处理并重启
+        self.call_timeout = call_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._workers = [_Worker(i) for i in range(self.num_workers)]
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._started_at = None
+        self._closed = False
+
+    def start(self, on_loaded: Callable[[int], None] = None):
+        """启动所有工作进程并等待模型加载和预热完成
+
+        每个工作进程预热完成后立即加入空闲队列；on_loaded(worker_id) 在该进程模型加载完成、
+        开始预热时调用，用于上报启动进度。
+        """
+        for worker in self._workers:
+            self._spawn(worker)
+        for worker in self._workers:
+            self._wait_ready(worker, on_loaded)
+            self._idle.put(worker)
+            if self._started_at is None:
+                self._started_at = time.time()
+        return self
+
+    def _spawn(self, worker: _Worker):
+        parent_conn, child_conn = self._ctx.Pipe()
+        worker.conn = parent_conn
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.worker_id, self.ocr_kwargs, child_conn),
+            name=f"ocr-worker-{worker.worker_id}",
+            daemon=True,
+        )
+        worker.process.start()
+        child_conn.close()
+
+    def _wait_ready(self, worker: _Worker, on_loaded: Callable[[int], None] = None):
+        deadline = time.perf_counter() + self.start_timeout
+        while True:
+            if not worker.conn.poll(max(0.0, deadline - time.perf_counter())):
+                raise RuntimeError(f"OCR工作进程 {worker.worker_id} 启动超时")
+            status, payload = worker.conn.recv()
+            if status != "loaded":
+                break
+            worker.load_seconds = payload["load_seconds"]
+            if on_loaded is not None:
+                on_loaded(worker.worker_id)
+        if status != "ready":
+            raise RuntimeError(f"OCR工作进程 {worker.worker_id} 启动失败: {payload}")
+        worker.load_seconds = payload["load_seconds"]
+        worker.warmup_seconds = payload["warmup_seconds"]
+        print(f"OCR工作进程 {worker.worker_id} 就绪 (加载 {worker.load_seconds:.1f}s, 预热 {worker.warmup_seconds:.2f}s)")
+
+    def _restart(self, worker: _Worker):
+        """工作进程异常退出时重新拉起"""
+        print(f"OCR工作进程 {worker.worker_id} 异常退出，正在重启...")
+        try:
+            worker.conn.close()
+        except OSError:
+            pass
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(timeout=5)
+        self._spawn(worker)
+        self._wait_ready(worker)
+
+    def _recover(self, worker: _Worker) -> bool:
+        """重启异常退出的工作进程，重启失败时标记为失败，返回是否可以继续使用"""
+        try:
+            self._restart(worker)
+            return True
+        except Exception as e:
+            worker.failed = True
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.kill()
+            print(f"OCR工作进程 {worker.worker_id} 重启失败，不再使用: {e}")
+            return False
+
+    def _next_idle(self) -> _Worker:
+        """取一个空闲的工作进程，所有进程都已失败时抛出异常，而不是一直等待"""
+        while True:
+            if all(worker.failed for worker in self._workers):
+                raise RuntimeError("所有OCR工作进程都已失败")
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    def call(self, method: str, *args, **kwargs):
+        """在一个空闲的工作进程上执行 OCREngine 的方法，阻塞直到返回"""
+        if self._closed:
+            raise RuntimeError("OCR工作进程池已关闭")
+
+        with self._lock:
+            self._waiting += 1
+        try:
+            worker = self._next_idle()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        worker.busy_since = time.perf_counter()
+        usable = True
+        try:
+            worker.conn.send((method, args, kwargs))
+            if not worker.conn.poll(self.call_timeout):
+                raise TimeoutError(f"{self.call_timeout}s 内没有返回")
+            status, payload = worker.conn.recv()
+        except (EOFError, OSError, BrokenPipeError) as e:
+            worker.errors += 1
+            usable = self._recover(worker)
+            raise RuntimeError(f"OCR工作进程 {worker.worker_id} 异常: {e}")
+        finally:
+            worker.busy_seconds += time.perf_counter() - worker.busy_since
+            worker.busy_since = None
+            worker.jobs += 1
+            # 只有正常返回或重启成功的进程回到空闲队列
+            if usable:
+                self._idle.put(worker)
+
+        if status != "ok":
+            worker.errors += 1
+            raise RuntimeError(payload)
+        return payload
+
+    def idle_workers(self) -> int:
+        """空闲队列中的工作进程数"""
+        return self._idle.qsize()
+
+    def predict(self, images) -> List[Dict[str, list]]:
+        """对单张图片或图片列表执行OCR"""
+        return self.call("predict", images)
+
+    def rss(self) -> Optional[int]:
+        """所有工作进程的常驻内存之和(字节)，没有安装psutil时返回None"""
+        if psutil is None:
+            return None
+        total = 0
+        for worker in self._workers:
+            if worker.process is None or not worker.process.is_alive():
+                continue
+            try:
+                total += psutil.Process(worker.process.pid).memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        """进程池利用率统计"""
+        now = time.perf_counter()
+        elapsed = time.time() - self._started_at if self._started_at else 0.0
+        workers = []
+        total_busy = 0.0
+        busy_count = 0
+        for worker in self._workers:
+            busy = worker.busy_seconds
+            busy_since = worker.busy_since
+            if busy_since is not None:
+                busy += now - busy_since
+                busy_count += 1
+            total_busy += busy
+            workers.append({
+                "id": worker.worker_id,
+                "alive": bool(worker.process and worker.process.is_alive()),
+                "failed": worker.failed,
+                "busy": busy_since is not None,
+                "jobs": worker.jobs,
+                "errors": worker.errors,
+                "busy_seconds": round(busy, 3),
+                "utilization": round(busy / elapsed, 3) if elapsed > 0 else 0.0,
+                "load_seconds": worker.load_seconds,
+                "warmup_seconds": worker.warmup_seconds,
+            })
+        return {
+            "workers": self.num_workers,
+            "busy": busy_count,
+            "idle": self.num_workers - busy_count - sum(1 for worker in self._workers if worker.failed),
+            "failed": sum(1 for worker in self._workers if worker.failed),
+            "waiting": self._waiting,
+            "utilization": round(total_busy / (elapsed * self.num_workers), 3) if elapsed > 0 else 0.0,
+            "per_worker": workers,
+        }
+
+    def shutdown(self, timeout: float = 5):
+        """通知所有工作进程退出"""
+        self._closed = True
+        for worker in self._workers:
+            if worker.process is None:
+                continue
+            try:
+                worker.conn.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+            worker.process.join(timeout=timeout)
+            if worker.process.is_alive():
+                worker.process.kill()
@@ -0,0 +1,165 @@
+# coding: utf-8
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+# 短语两端去掉的标点，OCR截取的短语常带句号、引号或括号
+_EDGE_PUNCTUATION = " \t.,;:!?\"'()[]{}<>«»“”‘’。，；：！？、（）【】「」『』"
+_APOSTROPHES = str.maketrans({"’": "'", "‘": "'", "‐": "-", "‑": "-", "–": "-"})
+
+
+def normalize_phrase(text: str) -> str:
+    """短语查找用的规范化：Unicode NFC、统一撇号和连字符、小写、合并空白、去掉两端的标点"""
+    text = unicodedata.normalize("NFC", text).translate(_APOSTROPHES).lower()
+    return _WHITESPACE.sub(" ", text).strip(_EDGE_PUNCTUATION)
+
+
+def is_short_phrase(text: str, max_words: int = 3, max_chars: int = 40) -> bool:
+    """规范化后是否为不超过 max_words 个词的短语，词中只有字母、连字符和撇号"""
+    phrase = normalize_phrase(text)
+    if not phrase or len(phrase) > max_chars:
+        return False
+    words = phrase.split(" ")
+    return len(words) <= max_words and all(word.replace("-", "").replace("'", "").isalpha() for word in words)
+
+
+class PhraseTable:
+    """短语翻译表：短文本在调用翻译模型之前先查表
+
+    查找顺序为短语表、词典(如 ECDICT 中的 take off、machine learning)，都没有时由调用方改用翻译模型。
+    表中的条目有两种：导入的人工译文对所有模型版本有效；学习到的译文来自翻译模型，
+    同一短语被翻译满 min_count 次后才收录(避免收录一次性的OCR错误)，带模型版本，升级模型后失效。
+    条目保存在SQLite中，重启后依然有效。
+    """
+
+    def __init__(self, max_words: int = 3, max_chars: int = 40, min_count: int = 2, max_entries: int = 100000,
+                 disk_path: Optional[str] = None):
+        self.max_words = max_words
+        self.max_chars = max_chars
+        self.min_count = min_count
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[str, str]]" = OrderedDict()  # -> (译文, 模型版本)
+        self._seen: "OrderedDict[Tuple[str, str, str, str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"lookups": 0, "table_hits": 0, "dictionary_hits": 0, "model_fallbacks": 0, "learned": 0}
+
+        self._db = None
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, disk_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+        self._db = sqlite3.connect(disk_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS phrase_table ("
+            "source TEXT, target TEXT, phrase TEXT, translation TEXT, model TEXT, updated REAL, "
+            "PRIMARY KEY (source, target, phrase))"
+        )
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT source, target, phrase, translation, model FROM phrase_table ORDER BY updated DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for source, target, phrase, translation, model in reversed(rows):
+            self._entries[(source, target, phrase)] = (translation, model)
+
+    def accepts(self, text: str) -> bool:
+        """文本是否足够短，走短语查找"""
+        return is_short_phrase(text, self.max_words, self.max_chars)
+
+    def lookup(self, text: str, source: str, target: str, model_version: str,
+               dictionary: Optional[Callable[[str], Optional[str]]] = None) -> Optional[Tuple[str, str]]:
+        """查找短语，返回 (译文, 来源)，来源为 phrase_table/dictionary；未命中返回None，调用方改用翻译模型
+
+        dictionary 为词典查询函数，参数是规范化的短语，查不到时返回None
+        """
+        phrase = normalize_phrase(text)
+        key = (source, target, phrase)
+        with self._lock:
+            self._counts["lookups"] += 1
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] in ("", model_version):
+                self._entries.move_to_end(key)
+                self._counts["table_hits"] += 1
+                return entry[0], "phrase_table"
+
+        if dictionary is not None:
+            translated = dictionary(phrase)
+            if translated:
+                with self._lock:
+                    self._counts["dictionary_hits"] += 1
+                return translated, "dictionary"
+
+        with self._lock:
+            self._counts["model_fallbacks"] += 1
+        return None
+
+    def add(self, text: str, source: str, target: str, translation: str, model_version: str = ""):
+        """写入短语译文，model_version 为空表示人工译文，对所有模型版本有效"""
+        key = (source, target, normalize_phrase(text))
+        with self._lock:
+            self._store(key, translation, model_version)
+
+    def learn(self, text: str, source: str, target: str, model_version: str, translation: str):
+        """记录一次翻译模型的短语译文，同一短语满 min_count 次后收录"""
+        if not translation or not self.accepts(text):
+            return
+        key = (source, target, normalize_phrase(text))
+        seen_key = key + (model_version,)
+        with self._lock:
+            if key in self._entries:
+                return
+            count = self._seen.pop(seen_key, 0) + 1
+            if count < self.min_count:
+                self._seen[seen_key] = count
+                while len(self._seen) > self.max_entries:
+                    self._seen.popitem(last=False)
+                return
+            self._store(key, translation, model_version)
+            self._counts["learned"] += 1
+
+    def import_tsv(self, path: str) -> int:
+        """导入人工整理的短语译文，每行为 源语言<TAB>目标语言<TAB>短语<TAB>译文，返回导入的条数"""
+        if not os.path.exists(path):
+            return 0
+        count = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 4 or line.startswith("#"):
+                    continue
+                source, target, phrase, translation = parts
+                self.add(phrase, source, target, translation)
+                count += 1
+        return count
+
+    def _store(self, key: Tuple[str, str, str], translation: str, model_version: str):
+        self._entries.pop(key, None)
+        self._entries[key] = (translation, model_version)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        if self._db is not None:
+            self._db.execute("INSERT OR REPLACE INTO phrase_table VALUES (?, ?, ?, ?, ?, ?)",
+                             key + (translation, model_version, time.time()))
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """短语路径的命中统计，phrase_hit_ratio 为不用调用翻译模型的短文本占比"""
+        with self._lock:
+            counts = dict(self._counts)
+            entries = len(self._entries)
+        lookups = counts["lookups"]
+        hits = counts["table_hits"] + counts["dictionary_hits"]
+        return dict(
+            counts,
+            entries=entries,
+            phrase_hit_ratio=round(hits / lookups, 3) if lookups else 0.0,
+        )
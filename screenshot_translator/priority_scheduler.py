@@ -0,0 +1,117 @@
+# coding: utf-8
+
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+# 请求可指定的优先级，同一通道内数值小的先执行
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Lane:
+    def __init__(self, name: str, workers: int, window: int):
+        self.name = name
+        self.workers = workers
+        self.queue = queue.PriorityQueue()
+        self.active = 0
+        self.counts = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0}
+        self.waits = deque(maxlen=window)
+        self.totals = deque(maxlen=window)
+        self.threads = []
+
+
+class LaneScheduler:
+    """分通道的任务调度
+
+    每类任务一个通道，各自有固定数量的工作线程：词典查询不会排在长文本机器翻译或OCR后面，
+    长文本翻译也不会占满短文本翻译的线程。通道内按请求的优先级、再按提交顺序执行。
+    每个通道统计排队等待和端到端耗时的分位数。
+    """
+
+    def __init__(self, lanes: Dict[str, int], window: int = 512):
+        self._lanes = {name: _Lane(name, max(1, workers), window) for name, workers in lanes.items()}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        for lane in self._lanes.values():
+            for i in range(lane.workers):
+                thread = threading.Thread(target=self._worker, args=(lane,), name=f"lane-{lane.name}-{i}", daemon=True)
+                thread.start()
+                lane.threads.append(thread)
+
+    def submit(self, lane_name: str, fn: Callable[..., Any], *args, priority: str = "normal") -> Future:
+        """提交任务到指定通道，返回Future"""
+        lane = self._lanes.get(lane_name)
+        if lane is None:
+            raise ValueError(f"未知的调度通道: {lane_name}")
+        if priority not in PRIORITIES:
+            raise ValueError(f"不支持的priority参数: {priority}，可选 {', '.join(PRIORITIES)}")
+        future = Future()
+        with self._lock:
+            lane.counts["submitted"] += 1
+        lane.queue.put((PRIORITIES[priority], next(self._sequence), time.perf_counter(), future, fn, args))
+        return future
+
+    def run(self, lane_name: str, fn: Callable[..., Any], *args, priority: str = "normal") -> Any:
+        """在指定通道执行任务并等待结果"""
+        return self.submit(lane_name, fn, *args, priority=priority).result()
+
+    def _worker(self, lane: _Lane):
+        while True:
+            _, _, submitted, future, fn, args = lane.queue.get()
+            if future is None:
+                return
+            # 排队期间已被取消(所属作业被取代)的任务直接丢弃
+            if not future.set_running_or_notify_cancel():
+                with self._lock:
+                    lane.counts["cancelled"] += 1
+                continue
+            started = time.perf_counter()
+            with self._lock:
+                lane.active += 1
+                lane.waits.append(started - submitted)
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+                failed = True
+            else:
+                future.set_result(result)
+                failed = False
+            with self._lock:
+                lane.active -= 1
+                lane.counts["failed" if failed else "completed"] += 1
+                lane.totals.append(time.perf_counter() - submitted)
+
+    def close(self):
+        """停止所有工作线程，已排队的任务执行完后退出"""
+        for lane in self._lanes.values():
+            for _ in lane.threads:
+                lane.queue.put((len(PRIORITIES), next(self._sequence), 0.0, None, None, None))
+
+    def stats(self) -> Dict[str, Any]:
+        lanes = {}
+        with self._lock:
+            for name, lane in self._lanes.items():
+                waits, totals = list(lane.waits), list(lane.totals)
+                lanes[name] = dict(
+                    lane.counts,
+                    workers=lane.workers,
+                    active=lane.active,
+                    queued=lane.queue.qsize(),
+                    wait_ms_p50=round(_percentile(waits, 0.5) * 1000, 2),
+                    wait_ms_p95=round(_percentile(waits, 0.95) * 1000, 2),
+                    latency_ms_p50=round(_percentile(totals, 0.5) * 1000, 2),
+                    latency_ms_p95=round(_percentile(totals, 0.95) * 1000, 2),
+                )
+        return lanes
@@ -4,13 +4,16 @@ import time
 from datetime import datetime
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QLabel)
 from PyQt5.QtCore import Qt, QTimer, QPoint, QRect
-from PyQt5.QtGui import (QPixmap, QPainter, QPen, QColor, QCursor, QScreen)
+from PyQt5.QtGui import (QPixmap, QPainter, QPen, QColor, QCursor, QScreen, QImage)
 from PyQt5.QtWidgets import QShortcut
 from PyQt5.QtGui import QKeySequence
 import pyautogui
 
+# 作业被新的截图取代时的退出码
+EXIT_CANCELLED = 2
+
 class ScreenshotTool(QMainWindow):
-    def __init__(self):
+    def __init__(self, ocr_direct=False, ocr_lang=None, job_id=None, supersede=False):
         super().__init__()
         # 初始化变量
         self.start_pos = None
@@ -28,6 +31,16 @@ class ScreenshotTool(QMainWindow):
         self.save_path = r"C:/MY_SPACE/Sources/tools/screenshot_translator/temp"
         os.makedirs(self.save_path, exist_ok=True)
         
+        # 直接OCR模式：选区像素直接发给OCR服务，结果写入ocr.txt，不再保存PNG
+        self.ocr_direct = ocr_direct
+        self.ocr_lang = ocr_lang
+        # 截图翻译作业的id，新截图带 supersede 时服务端丢弃之前截图还在排队的任务
+        self.job_id = job_id
+        self.supersede = supersede
+        self.ocr_result_path = os.path.join(self.save_path, "ocr.txt")
+        # 快速档识别结果的精修任务id，结果窗口在后台取精修结果
+        self.refine_id_path = os.path.join(self.save_path, "ocr_refine_id.txt")
+        
         print("截图工具初始化...")
         self.init_ui()
         
@@ -175,6 +188,12 @@ class ScreenshotTool(QMainWindow):
                 selection_rect.height()
             )
             
+            if self.ocr_direct:
+                # 原始像素直接送OCR，省去PNG编码、写盘、读盘和解码
+                self.hide()
+                self.safe_exit(self.send_to_ocr(cropped_image))
+                return
+            
             # 转换为 PIL Image 用于保存
             cropped_pixmap = QPixmap.fromImage(cropped_image)
             
@@ -209,6 +228,35 @@ class ScreenshotTool(QMainWindow):
         print(f"截图已保存: {filepath}")
         return filepath
     
+    def send_to_ocr(self, image):
+        """把选区的BGRA像素缓冲区直接发送到OCR服务，结果写入ocr.txt"""
+        from ocr_client import ocr_raw_image
+        
+        # ARGB32 在小端机器上的内存布局为 B,G,R,A，每行恰好 4*宽度 字节
+        image = image.convertToFormat(QImage.Format_ARGB32)
+        ptr = image.constBits()
+        ptr.setsize(image.sizeInBytes())
+        
+        # 先用快速档识别，置信度不足时服务端在后台用精确档精修，这里不等精修结果，
+        # 精修任务id写入文件，结果窗口先显示快速档的结果，精修完成后再更新
+        ocr_result = ocr_raw_image(ptr.asstring(), image.width(), image.height(), quality="progressive",
+                                   lang=self.ocr_lang, job_id=self.job_id, supersede=self.supersede)
+        if ocr_result.get("cancelled"):
+            print(f"OCR已取消: {ocr_result['error']}")
+            return EXIT_CANCELLED
+        if not ocr_result["success"]:
+            print(f"OCR识别失败: {ocr_result['error']}")
+            return -1
+        
+        with open(self.ocr_result_path, 'w', encoding='utf-8') as f:
+            f.write(ocr_result["text"])
+        print(f"OCR结果已保存: {self.ocr_result_path}")
+        if ocr_result.get("refine_id"):
+            with open(self.refine_id_path, 'w', encoding='utf-8') as f:
+                f.write(ocr_result["refine_id"])
+            print(f"精修任务: {ocr_result['refine_id']}")
+        return 0
+    
     def show_success_message(self, position):
         success_pixmap = self.screenshot_pixmap.copy()
         painter = QPainter(success_pixmap)
@@ -233,8 +281,12 @@ def main():
         print("启动截图工具...")
         app = QApplication(sys.argv)
         
-        # 创建并显示窗口
-        tool = ScreenshotTool()
+        # 创建并显示窗口，--ocr 表示截图后直接送OCR，--lang=<语言> 指定识别语言(auto为自动识别)
+        # --job-id=<id> 为截图翻译作业id，--supersede 表示取代之前未完成的截图
+        ocr_lang = next((arg.split("=", 1)[1] for arg in sys.argv[1:] if arg.startswith("--lang=")), None)
+        job_id = next((arg.split("=", 1)[1] for arg in sys.argv[1:] if arg.startswith("--job-id=")), None)
+        tool = ScreenshotTool(ocr_direct="--ocr" in sys.argv[1:], ocr_lang=ocr_lang, job_id=job_id,
+                              supersede="--supersede" in sys.argv[1:])
         tool.show()
         
         # 运行应用
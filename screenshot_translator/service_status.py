@@ -0,0 +1,145 @@
+# coding: utf-8
+
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+# 服务状态
+PENDING = "pending"
+LOADING = "loading"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+class ServiceUnavailable(RuntimeError):
+    """服务尚未就绪或加载失败"""
+
+    def __init__(self, name: str, state: str, error: Optional[str] = None):
+        if state == FAILED:
+            message = f"{name} 服务加载失败: {error}"
+        else:
+            message = f"{name} 服务正在启动 ({state})，请稍后重试"
+        super().__init__(message)
+        self.name = name
+        self.state = state
+
+
+class ServiceStatus:
+    """单个后台加载服务的状态记录，加载函数通过它上报进度和耗时"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = PENDING
+        self.error = None
+        self.started_at = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.ready_at = None
+        self.details = {}
+        # 加载结束(就绪或失败)时置位，等待中的请求在失败时也能立即醒来
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def loaded(self, **details):
+        """模型加载完成，进入预热阶段"""
+        with self._lock:
+            self.load_seconds = time.perf_counter() - self.started_at
+            self.state = WARMING
+            self.details.update(details)
+
+    def warmed(self, warmup_seconds: float, **details):
+        """记录一次预热推理的耗时"""
+        with self._lock:
+            self.warmup_seconds = warmup_seconds
+            self.details.update(details)
+
+    def wait(self, timeout: float = 0) -> bool:
+        """最多等待 timeout 秒直到加载结束，返回服务是否就绪"""
+        if timeout > 0:
+            self._done.wait(timeout)
+        return self.state == READY
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = None
+            if self.started_at is not None:
+                end = self.ready_at if self.ready_at is not None else time.perf_counter()
+                elapsed = round(end - self.started_at, 3)
+            return dict(
+                self.details,
+                state=self.state,
+                elapsed_seconds=elapsed,
+                load_seconds=round(self.load_seconds, 3) if self.load_seconds is not None else None,
+                warmup_seconds=round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+                error=self.error,
+            )
+
+
+class ServiceRegistry:
+    """在后台线程中加载各个服务，端口可以立即绑定，已就绪的服务先对外可用
+
+    状态依次为 pending -> loading -> warming -> ready，任何阶段出错则为 failed。
+    """
+
+    def __init__(self):
+        self._services: Dict[str, ServiceStatus] = {}
+
+    def start(self, name: str, loader: Callable[[ServiceStatus], None]) -> ServiceStatus:
+        """启动后台线程执行 loader(status)，加载函数返回即视为就绪"""
+        status = ServiceStatus(name)
+        self._services[name] = status
+
+        def run():
+            with status._lock:
+                status.state = LOADING
+                status.started_at = time.perf_counter()
+            print(f"正在加载 {name} 服务...")
+            try:
+                loader(status)
+            except Exception as e:
+                with status._lock:
+                    status.state = FAILED
+                    status.error = str(e)
+                    status.ready_at = time.perf_counter()
+                status._done.set()
+                print(f"{name} 服务加载失败: {e}\n{traceback.format_exc()}")
+                return
+            with status._lock:
+                if status.load_seconds is None:
+                    status.load_seconds = time.perf_counter() - status.started_at
+                status.state = READY
+                status.ready_at = time.perf_counter()
+            status._done.set()
+            print(f"{name} 服务就绪 (耗时 {status.ready_at - status.started_at:.1f}s)")
+
+        threading.Thread(target=run, name=f"load-{name}", daemon=True).start()
+        return status
+
+    def require(self, name: str, timeout: float = 0):
+        """服务就绪则直接返回，否则最多等待 timeout 秒，仍未就绪时抛出 ServiceUnavailable"""
+        status = self._services[name]
+        if status.state != FAILED and status.wait(timeout):
+            return
+        # 醒来后重新读取状态，加载失败时报告失败原因而不是“正在启动”
+        with status._lock:
+            state, error = status.state, status.error
+        raise ServiceUnavailable(name, state, error)
+
+    def state(self, name: str) -> Optional[str]:
+        """服务当前的状态，未注册的服务返回None"""
+        status = self._services.get(name)
+        return status.state if status is not None else None
+
+    def overall(self) -> str:
+        """整体状态：全部就绪为healthy，有失败为degraded，否则为starting"""
+        states = [status.state for status in self._services.values()]
+        if all(state == READY for state in states):
+            return "healthy"
+        if FAILED in states:
+            return "degraded"
+        return "starting"
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: status.snapshot() for name, status in self._services.items()}
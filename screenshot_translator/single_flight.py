@@ -0,0 +1,49 @@
+# coding: utf-8
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """合并同时进行的相同计算
+
+    同一个键的计算正在进行时，后到的请求不再重复计算，等待这次计算完成后共用它的结果(或异常)。
+    计算结束后键即移除，之后的请求重新计算(结果复用交给各自的缓存)。
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._counts = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args) -> Tuple[Any, bool]:
+        """执行 fn(*args)，返回 (结果, 是否与其他请求共用了结果)"""
+        with self._lock:
+            self._counts["calls"] += 1
+            future = self._calls.get(key)
+            shared = future is not None
+            if shared:
+                self._counts["coalesced"] += 1
+            else:
+                future = self._calls[key] = Future()
+                self._counts["executed"] += 1
+
+        if shared:
+            return future.result(), True
+
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counts, in_flight=len(self._calls))
@@ -0,0 +1,329 @@
+# coding: utf-8
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# ECDICT词典的SQLite版本
+DEFAULT_DB_PATH = r"C:\MY_SPACE\Sources\tools\screenshot_translator\dict_rsrc\ecdict-sqlite-28\stardict.db"
+
+# 只读连接的内存映射大小和页缓存大小(KiB)，词典文件不会变化，整个文件映射进内存也无妨
+DICT_MMAP_SIZE = 512 * 1024 * 1024
+DICT_CACHE_SIZE_KB = 64 * 1024
+# 每个连接缓存的预编译语句数
+DICT_CACHED_STATEMENTS = 64
+
+LOOKUP_FIELDS = ['id', 'word', 'sw', 'phonetic', 'definition', 'translation',
+                 'pos', 'collins', 'oxford', 'tag', 'bnc', 'frq', 'exchange', 'detail', 'audio']
+# SQL文本保持不变，连接的语句缓存才能复用预编译好的语句
+LOOKUP_SQL = f"SELECT {', '.join(LOOKUP_FIELDS)} FROM stardict WHERE word = ? OR sw = ?"
+
+# dict_build.py 生成的优化副本：显示用的热字段和很少用到的冷字段(detail等大字段)分表存放，
+# 查询走 lookup 表 (规范化键, 匹配类型, id) 的主键，先按单词本身匹配，再按去掉标点的 sw 匹配
+OPTIMIZED_LAYOUT = "stardict-opt-1"
+COLD_FIELDS = ['sw', 'exchange', 'detail', 'audio']
+HOT_FIELDS = [field for field in LOOKUP_FIELDS if field not in COLD_FIELDS]
+OPT_LOOKUP_SQL = (f"SELECT {', '.join('e.' + field for field in HOT_FIELDS)} "
+                  "FROM lookup l JOIN entry e ON e.id = l.id WHERE l.key = ? ORDER BY l.rank, l.id LIMIT 1")
+OPT_LOOKUP_FULL_SQL = (f"SELECT {', '.join(('c.' if field in COLD_FIELDS else 'e.') + field for field in LOOKUP_FIELDS)} "
+                       "FROM lookup l JOIN entry e ON e.id = l.id LEFT JOIN entry_cold c ON c.id = l.id "
+                       "WHERE l.key = ? ORDER BY l.rank, l.id LIMIT 1")
+# 按前缀列出单词，优化副本走 lookup 主键的范围查询
+PREFIX_SQL = "SELECT word FROM stardict WHERE word LIKE ? LIMIT ?"
+OPT_PREFIX_SQL = ("SELECT e.word FROM lookup l JOIN entry e ON e.id = l.id "
+                  "WHERE l.key >= ? AND l.key < ? AND l.rank = 0 ORDER BY l.key LIMIT ?")
+
+
+# 常用词层按词频排序：COCA(frq)和BNC(bnc)排名取较小者(0为无排名)，再看牛津核心词和柯林斯星级
+HOT_TIER_FIELDS = ['word', 'phonetic', 'definition', 'translation', 'pos', 'collins', 'oxford', 'frq']
+HOT_TIER_SQL = (f"SELECT {', '.join(HOT_TIER_FIELDS)} FROM {{table}} "
+                "WHERE frq > 0 OR bnc > 0 OR oxford > 0 OR collins > 0 "
+                "ORDER BY MIN(CASE WHEN frq > 0 THEN frq ELSE 1000000000 END, "
+                "CASE WHEN bnc > 0 THEN bnc ELSE 1000000000 END), oxford DESC, collins DESC LIMIT ?")
+
+
+def normalize_key(word: str) -> str:
+    """查询用的规范化键：去掉首尾空白并小写"""
+    return word.strip().lower()
+
+
+def readonly_uri(db_path: str) -> str:
+    """只读、不可变方式打开数据库的URI：不加锁、不检查文件变化"""
+    return Path(os.path.abspath(db_path)).as_uri() + "?mode=ro&immutable=1"
+
+
+def optimized_path(db_path: str) -> str:
+    """词典的优化副本路径，与原词典放在同一目录"""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.opt{ext}"
+
+
+def resolve_db_path(db_path: str) -> str:
+    """优化副本存在且不比原词典旧时使用副本，否则使用原词典"""
+    optimized = optimized_path(db_path)
+    if os.path.exists(optimized) and (not os.path.exists(db_path)
+                                      or os.path.getmtime(optimized) >= os.path.getmtime(db_path)):
+        return optimized
+    return db_path
+
+
+def is_optimized(conn: sqlite3.Connection) -> bool:
+    """数据库是否为 dict_build.py 生成的优化副本"""
+    has_meta = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'meta'").fetchone()
+    if not has_meta:
+        return False
+    row = conn.execute("SELECT value FROM meta WHERE name = 'layout'").fetchone()
+    return row is not None and row[0] == OPTIMIZED_LAYOUT
+
+
+def parse_pos_distribution(pos_str: Optional[str]) -> Tuple[Tuple[str, int], ...]:
+    """解析词性分布字符串，如 'u:97/n:3'"""
+    pos_dist = []
+    if pos_str:
+        for part in pos_str.split('/'):
+            if ':' in part:
+                pos, percent = part.split(':')
+                pos_dist.append((pos.strip(), int(percent)))
+    return tuple(pos_dist)
+
+
+def _deep_size(objects: Iterable[Any]) -> int:
+    """对象及其包含的字符串、数字、元组占用的字节数，共用的对象只算一次"""
+    seen = set()
+    total = 0
+    stack = list(objects)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, tuple):
+            stack.extend(obj)
+    return total
+
+
+class HotTier:
+    """常驻内存的常用词层
+
+    按词频取前N个单词，每个单词一条元组记录(显示用的字段和预先解析好的词性分布)，按规范化键索引。
+    相同的词性分布只保存一份。只收录单词本身的键，按 sw 匹配的查询交给SQLite，结果与查库一致。
+    """
+
+    def __init__(self, rows: Iterable[Tuple]):
+        self._index: Dict[str, Tuple] = {}
+        distributions = {}
+        for word, phonetic, definition, translation, pos, collins, oxford, frq in rows:
+            pos_dist = parse_pos_distribution(pos)
+            pos_dist = distributions.setdefault(pos_dist, pos_dist)
+            self._index.setdefault(normalize_key(word), (word, phonetic, definition, translation, pos_dist,
+                                                         collins, oxford, frq))
+        # 包括从SQLite读出这些单词的时间，由 StarDictSQLite.load_hot_tier 填写
+        self.load_seconds = 0.0
+        self.memory_bytes = sys.getsizeof(self._index) + _deep_size(
+            obj for item in self._index.items() for obj in item)
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0}
+
+    def get(self, word: str) -> Optional[Dict]:
+        """查找常用词，返回与 get_detailed_translations 相同格式的信息，不在本层时返回None"""
+        record = self._index.get(normalize_key(word))
+        with self._lock:
+            self._counts["hits" if record is not None else "misses"] += 1
+        if record is None:
+            return None
+        word, phonetic, definition, translation, pos_dist, collins, oxford, frq = record
+        return {
+            'word': word,
+            'phonetic': phonetic,
+            'pos_distribution': dict(pos_dist),
+            'definition': definition or '',
+            'translation': translation or '',
+            'collins_star': collins,
+            'is_oxford_core': bool(oxford),
+            'frequency': frq
+        }
+
+    def __len__(self):
+        return len(self._index)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        total = counts["hits"] + counts["misses"]
+        return dict(
+            counts,
+            words=len(self._index),
+            memory_mb=round(self.memory_bytes / 1024 / 1024, 1),
+            load_seconds=round(self.load_seconds, 2),
+            hit_ratio=round(counts["hits"] / total, 3) if total else 0.0,
+        )
+
+
+# 字典查询类 - 线程安全版本
+class StarDictSQLite:
+    """ECDICT词典查询
+
+    每个线程持有一个常驻的只读连接(sqlite3连接不能跨线程使用)，第一次查询时打开，
+    之后的查询复用连接的页缓存、内存映射和预编译语句，不再为每次查询打开文件、解析表结构。
+    同时支持ECDICT原始的 stardict.db 和 dict_build.py 生成的优化副本。
+    load_hot_tier() 之后常用词直接从内存返回，不查SQLite。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self.hot_tier: Optional[HotTier] = None
+        with self.get_connection() as conn:
+            self.optimized = is_optimized(conn)
+    
+    def load_hot_tier(self, size: int) -> Optional[HotTier]:
+        """把词频最高的 size 个单词载入内存，size 为0时不使用常用词层"""
+        if size <= 0:
+            return None
+        start = time.perf_counter()
+        with self.get_connection() as conn:
+            rows = conn.execute(HOT_TIER_SQL.format(table="entry" if self.optimized else "stardict"),
+                                (size,)).fetchall()
+        hot_tier = HotTier(rows)
+        hot_tier.load_seconds = time.perf_counter() - start
+        self.hot_tier = hot_tier
+        return hot_tier
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(readonly_uri(self.db_path), uri=True, check_same_thread=False,
+                               cached_statements=DICT_CACHED_STATEMENTS)
+        conn.execute(f"PRAGMA mmap_size = {DICT_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = {-DICT_CACHE_SIZE_KB}")
+        conn.execute("PRAGMA query_only = ON")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+    
+    @contextmanager
+    def get_connection(self):
+        """当前线程的常驻只读连接，用完不关闭"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        yield conn
+    
+    def close(self):
+        """关闭所有线程的连接"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+    
+    def lookup_word(self, word: str, cold: bool = False) -> Optional[Dict]:
+        """查询单词的信息；优化副本默认只读取显示用的字段，cold 为真时连同 exchange、detail 等字段一起读取"""
+        key = normalize_key(word)
+        if not self.optimized:
+            sql, fields, params = LOOKUP_SQL, LOOKUP_FIELDS, (key, key)
+        elif cold:
+            sql, fields, params = OPT_LOOKUP_FULL_SQL, LOOKUP_FIELDS, (key,)
+        else:
+            sql, fields, params = OPT_LOOKUP_SQL, HOT_FIELDS, (key,)
+        with self.get_connection() as conn:
+            result = conn.execute(sql, params).fetchone()
+        with self._lock:
+            self._lookups += 1
+        if result:
+            return dict(zip(fields, result))
+        return None
+    
+    def _parse_pos_distribution(self, pos_str: str) -> Dict[str, int]:
+        """解析词性分布字符串"""
+        return dict(parse_pos_distribution(pos_str))
+    
+    def get_detailed_translations(self, word: str) -> Dict:
+        """获取单词的详细翻译信息，常用词直接从内存返回"""
+        if self.hot_tier is not None:
+            detailed_info = self.hot_tier.get(word)
+            if detailed_info is not None:
+                return detailed_info
+        result = self.lookup_word(word)
+        if not result:
+            return {}
+        
+        # 解析词性分布
+        pos_dist = self._parse_pos_distribution(result.get('pos', ''))
+        
+        # 构建返回结果
+        detailed_info = {
+            'word': result.get('word'),
+            'phonetic': result.get('phonetic'),
+            'pos_distribution': pos_dist,
+            'definition': result.get('definition', ''),
+            'translation': result.get('translation', ''),
+            'collins_star': result.get('collins'),
+            'is_oxford_core': bool(result.get('oxford')),
+            'frequency': result.get('frq')
+        }
+        
+        return detailed_info
+    
+    def format_dictionary_output(self, word: str) -> str:
+        """格式化字典查询输出"""
+        detailed_info = self.get_detailed_translations(word)
+        if not detailed_info:
+            return f"未找到单词: {word}"
+        return self._format_detailed(detailed_info)
+    
+    def lookup_phrase(self, phrase: str) -> Optional[str]:
+        """查询短语(如 take off)并格式化输出，词典中没有时返回None"""
+        detailed_info = self.get_detailed_translations(phrase)
+        if not detailed_info:
+            return None
+        return self._format_detailed(detailed_info) or None
+    
+    def _format_detailed(self, detailed_info: Dict) -> str:
+        output_parts = []
+        
+        # 中文翻译
+        if detailed_info['translation']:
+            translation = detailed_info['translation']
+            # 清理翻译文本，取主要部分
+            lines = translation.split('\n')
+            clean_translations = []
+            for line in lines[:3]:  # 取前3行
+                line = line.strip()
+                if line and '。' not in line and len(line) < 100:
+                    clean_translations.append(line)
+            
+            if clean_translations:
+                output_parts.append(f"中文释义: {'; '.join(clean_translations)}")
+        
+        # 词性分布
+        if detailed_info['pos_distribution']:
+            pos_str = "，".join([f"{pos}({percent}%)" for pos, percent in detailed_info['pos_distribution'].items()])
+            output_parts.append(f"词性: {pos_str}")
+        
+        # 基本信息
+        if detailed_info['phonetic']:
+            output_parts.append(f"音标: {detailed_info['phonetic']}")
+        
+        # 英文释义（限制长度）
+        if detailed_info['definition']:
+            definition = detailed_info['definition']
+            if len(definition) > 200:
+                definition = definition[:200] + "..."
+            output_parts.append(f"英文释义: {definition}")
+        
+        return "\n".join(output_parts)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {"lookups": self._lookups, "connections": len(self._connections), "optimized": self.optimized,
+                     "path": self.db_path}
+        stats["hot_tier"] = self.hot_tier.stats() if self.hot_tier is not None else None
+        return stats
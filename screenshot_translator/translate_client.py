@@ -3,12 +3,33 @@
 import sys
 import requests
 import io
+import json
 
 if sys.stdout.encoding != 'utf-8':
     print(sys.stdout.encoding, file=sys.stderr)
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-def main(text):
+# 作业被新的截图取代时的退出码
+EXIT_CANCELLED = 2
+
+# 界面上的语言对应的翻译语言代码
+GUI_LANG_CODES = {"英文": "en", "中文": "zh", "日文": "ja"}
+
+def lang_code(lang):
+    """界面语言名称转换成翻译语言代码，本身已是代码时原样返回"""
+    return GUI_LANG_CODES.get(lang, lang) if lang else None
+
+def prepare(source_lang, target_lang):
+    """通知服务端预加载语言对的翻译模型，不等待加载完成"""
+    try:
+        requests.post("http://127.0.0.1:5000/translate/prepare", json={
+            "source_lang": lang_code(source_lang),
+            "target_lang": lang_code(target_lang)
+        }, timeout=5)
+    except Exception as e:
+        print(f"预加载翻译模型失败：{str(e)}", file=sys.stderr)
+
+def main(text, source_lang=None, target_lang=None, priority=None, job_id=None):
     if not text.strip():
         print("翻译失败：输入文本为空", file=sys.stderr)
         return
@@ -19,9 +40,20 @@ def main(text):
         translate_data = {
             "text": text
         }
+        if source_lang:
+            translate_data["source_lang"] = lang_code(source_lang)
+        if target_lang:
+            translate_data["target_lang"] = lang_code(target_lang)
+        if priority:
+            translate_data["priority"] = priority
+        if job_id:
+            translate_data["job_id"] = job_id
         translate_response = requests.post("http://127.0.0.1:5000/translate", json=translate_data)
         translate_result = translate_response.json()
         
+        if translate_result.get("cancelled"):
+            print(f"翻译已取消：{translate_result['error']}", file=sys.stderr)
+            return EXIT_CANCELLED
         if not translate_result["success"]:
             print(f"翻译失败：{translate_result['error']}", file=sys.stderr)
             return
@@ -35,17 +67,64 @@ def main(text):
     except Exception as e:
         print(f"翻译处理失败：{str(e)}", file=sys.stderr)
 
+def main_stream(text, source_lang=None, target_lang=None, priority=None, job_id=None):
+    """流式翻译，每收到一段译文就向stdout输出一行JSON: {"chunk": 片段}，最后一行为 {"done": true, ...}"""
+    if not text.strip():
+        print("翻译失败：输入文本为空", file=sys.stderr)
+        return
+
+    try:
+        translate_data = {
+            "text": text
+        }
+        if source_lang:
+            translate_data["source_lang"] = lang_code(source_lang)
+        if target_lang:
+            translate_data["target_lang"] = lang_code(target_lang)
+        if priority:
+            translate_data["priority"] = priority
+        if job_id:
+            translate_data["job_id"] = job_id
+        with requests.post("http://127.0.0.1:5000/translate/stream", json=translate_data, stream=True) as response:
+            for line in response.iter_lines(decode_unicode=True):
+                # Server-Sent Events 的数据行以 "data: " 开头，空行分隔消息
+                if not line or not line.startswith("data: "):
+                    continue
+                event = json.loads(line[len("data: "):])
+                print(json.dumps(event), file=sys.stdout)
+                sys.stdout.flush()
+                if event.get("done") and event.get("cancelled"):
+                    print(f"翻译已取消：{event.get('error')}", file=sys.stderr)
+                    return EXIT_CANCELLED
+                if event.get("done") and not event.get("success"):
+                    print(f"翻译失败：{event.get('error')}", file=sys.stderr)
+
+    except Exception as e:
+        print(f"翻译处理失败：{str(e)}", file=sys.stderr)
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
+    # --source=<语言> --target=<语言> 指定翻译方向，--prepare 只预加载该方向的模型，--stream 流式输出
+    # --priority=<high|normal|low> 为服务端调度通道内的优先级，--job-id=<id> 为所属的截图翻译作业
+    options = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    source_lang = next((arg.split("=", 1)[1] for arg in options if arg.startswith("--source=")), None)
+    target_lang = next((arg.split("=", 1)[1] for arg in options if arg.startswith("--target=")), None)
+    priority = next((arg.split("=", 1)[1] for arg in options if arg.startswith("--priority=")), None)
+    job_id = next((arg.split("=", 1)[1] for arg in options if arg.startswith("--job-id=")), None)
+    translate = main_stream if "--stream" in options else main
+    if "--prepare" in options:
+        prepare(source_lang, target_lang)
+    elif args:
         # 从命令行参数获取文本
-        text = sys.argv[1]
-        main(text)
+        text = args[0]
+        sys.exit(translate(text, source_lang, target_lang, priority, job_id))
     else:
         # 从stdin读取文本（支持管道操作）
         text = sys.stdin.read().strip()
         if text:
-            main(text)
+            sys.exit(translate(text, source_lang, target_lang, priority, job_id))
         else:
             print("错误：请提供要翻译的文本", file=sys.stderr)
             print("用法1: python translate_client.py \"要翻译的文本\"", file=sys.stderr)
-            print("用法2: echo \"要翻译的文本\" | python translate_client.py", file=sys.stderr)
\ No newline at end of file
+            print("用法2: echo \"要翻译的文本\" | python translate_client.py", file=sys.stderr)
+            print("可选参数: --source=英文 --target=中文 --stream --priority=high|normal|low", file=sys.stderr)
\ No newline at end of file
@@ -1,12 +1,14 @@
 # coding: utf-8
 
 import sys
+import json
 import subprocess
+import time
 from pathlib import Path
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QTextEdit, QPushButton, QComboBox, QMessageBox)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from PyQt5.QtGui import QFont
+from PyQt5.QtGui import QFont, QTextCursor
 import io
 
 if sys.stdout.encoding != 'utf-8':
@@ -14,7 +16,8 @@ if sys.stdout.encoding != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 class TranslationThread(QThread):
-    """翻译线程，避免界面卡顿"""
+    """翻译线程，避免界面卡顿，译文按句流式返回"""
+    chunk = pyqtSignal(str)  # 信号：新到的一段译文
     finished = pyqtSignal(str, bool)  # 信号：翻译结果, 是否成功
     
     def __init__(self, text, source_lang, target_lang):
@@ -28,15 +31,31 @@ class TranslationThread(QThread):
             # 调用 translate_client.py
             script_path = Path("C:/MY_SPACE/Sources/tools/screenshot_translator/translate_client.py")
             
-            result = subprocess.run([
-                sys.executable, str(script_path), self.text
-            ], capture_output=True, text=True, encoding='utf-8') #, timeout=30)
-            
-            if result.returncode == 0:
-                print(result.stdout.strip())
-                self.finished.emit(result.stdout.strip(), True)
+            process = subprocess.Popen([
+                sys.executable, str(script_path), self.text, "--stream", "--priority=high",
+                f"--source={self.source_lang}", f"--target={self.target_lang}"
+            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8')
+
+            # 每行是一条JSON消息，收到一段译文就交给界面追加显示
+            chunks = []
+            done = None
+            for line in process.stdout:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if "chunk" in event:
+                    chunks.append(event["chunk"])
+                    self.chunk.emit(event["chunk"])
+                if event.get("done"):
+                    done = event
+            stderr = process.stderr.read()
+            process.wait()
+
+            if done is not None and done.get("success"):
+                print("".join(chunks))
+                self.finished.emit("".join(chunks), True)
             else:
-                error_msg = result.stderr.strip() if result.stderr else "翻译失败"
+                error_msg = (done or {}).get("error") or stderr.strip() or "翻译失败"
                 self.finished.emit(error_msg, False)
                 
         except subprocess.TimeoutExpired:
@@ -44,13 +63,41 @@ class TranslationThread(QThread):
         except Exception as e:
             self.finished.emit(f"翻译错误: {str(e)}", False)
 
+class RefineThread(QThread):
+    """在后台等待渐进式OCR的精修结果，不阻塞结果窗口"""
+    refined = pyqtSignal(str)  # 信号：精修后的识别文本
+
+    def __init__(self, refine_id, timeout=60):
+        super().__init__()
+        self.refine_id = refine_id
+        self.timeout = timeout
+
+    def run(self):
+        from ocr_client import get_refined
+
+        deadline = time.time() + self.timeout
+        while time.time() < deadline and not self.isInterruptionRequested():
+            # 服务端长轮询，精修完成时立即返回
+            result = get_refined(self.refine_id, wait=5)
+            if result.get("state") == "done":
+                self.refined.emit(result["text"].strip())
+                return
+            if result.get("state") != "pending":
+                print(f"精修结果不可用: {result.get('error')}")
+                return
+
 class TranslationApp(QMainWindow):
-    def __init__(self, initial_src_text="", initial_rst_text=""):
+    def __init__(self, initial_src_text="", initial_rst_text="", refine_id=None):
         super().__init__()
         self.initial_src_text = initial_src_text
         self.initial_rst_text = initial_rst_text
         self.translation_thread = None
+        self.refine_thread = None
         self.init_ui()
+        if refine_id:
+            self.refine_thread = RefineThread(refine_id)
+            self.refine_thread.refined.connect(self.on_refined)
+            self.refine_thread.start()
             
     def init_ui(self):
         """初始化界面"""
@@ -122,6 +169,10 @@ class TranslationApp(QMainWindow):
         right_layout.addWidget(self.target_combo)
         
         right_layout.addStretch(1)  # 底部空间
+
+        # 切换语言时通知服务端预加载该方向的模型，点击翻译时不用再等模型加载
+        self.source_combo.currentTextChanged.connect(self.prepare_translation)
+        self.target_combo.currentTextChanged.connect(self.prepare_translation)
         
         # 将左右布局添加到主布局
         main_layout.addLayout(left_layout, 6)  # 左列占4份
@@ -139,6 +190,21 @@ class TranslationApp(QMainWindow):
             (screen.height() - size.height()) // 2
         )
     
+    def prepare_translation(self):
+        """后台调用 translate_client.py --prepare，不阻塞界面"""
+        source_lang = self.source_combo.currentText()
+        target_lang = self.target_combo.currentText()
+        if source_lang == target_lang:
+            return
+        script_path = Path("C:/MY_SPACE/Sources/tools/screenshot_translator/translate_client.py")
+        try:
+            subprocess.Popen([
+                sys.executable, str(script_path), "--prepare",
+                f"--source={source_lang}", f"--target={target_lang}"
+            ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except Exception as e:
+            print(f"预加载翻译模型失败: {e}")
+    
     def start_translation(self):
         """开始翻译"""
         text = self.source_text.toPlainText().strip()
@@ -159,10 +225,20 @@ class TranslationApp(QMainWindow):
         self.statusBar().showMessage("翻译中...")
         
         # 启动翻译线程
+        self.target_text.clear()
         self.translation_thread = TranslationThread(text, source_lang, target_lang)
+        self.translation_thread.chunk.connect(self.on_translation_chunk)
         self.translation_thread.finished.connect(self.on_translation_finished)
         self.translation_thread.start()
     
+    def on_translation_chunk(self, chunk):
+        """收到一段译文，追加到译文框末尾"""
+        cursor = self.target_text.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(chunk)
+        self.target_text.setTextCursor(cursor)
+        self.statusBar().showMessage("翻译中...")
+    
     def on_translation_finished(self, result, success):
         """翻译完成回调"""
         self.translate_btn.setEnabled(True)
@@ -175,11 +251,27 @@ class TranslationApp(QMainWindow):
             QMessageBox.critical(self, "错误", result)
             self.statusBar().showMessage("翻译失败")
     
+    def on_refined(self, text):
+        """精修结果到达：文字有变化且用户没有改动过原文时，替换原文并重新翻译"""
+        if not text or text == self.initial_src_text:
+            return
+        if self.source_text.toPlainText().strip() != self.initial_src_text:
+            self.statusBar().showMessage("精确识别结果已就绪，原文已修改，未替换")
+            return
+        if self.translation_thread and self.translation_thread.isRunning():
+            return
+        self.initial_src_text = text
+        self.source_text.setPlainText(text)
+        self.start_translation()
+        self.statusBar().showMessage("已使用精确识别结果，重新翻译中...")
+
     def closeEvent(self, event):
         """关闭事件处理"""
-        if self.translation_thread and self.translation_thread.isRunning():
-            self.translation_thread.terminate()
-            self.translation_thread.wait()
+        for thread in (self.translation_thread, self.refine_thread):
+            if thread and thread.isRunning():
+                thread.requestInterruption()
+                thread.terminate()
+                thread.wait()
         event.accept()
 
 def main():
@@ -210,7 +302,9 @@ def main():
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     
-    window = TranslationApp(source_text, target_text)
+    # --refine-id=<id> 为快速档识别结果的精修任务，精修完成后更新原文并重新翻译
+    refine_id = next((arg.split("=", 1)[1] for arg in sys.argv[1:] if arg.startswith("--refine-id=")), None)
+    window = TranslationApp(source_text, target_text, refine_id)
     window.show()
     
     # 存储应用实例以便获取结果
@@ -0,0 +1,136 @@
+# coding: utf-8
+
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+# 句末标点后跟空白、下一句以大写字母/数字/引号开头时断句；中日文句号后直接断句
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"'”’)\]]*\s+(?=[\"'“‘(\[]?[A-Z0-9])|(?<=[。！？])")
+# 这些缩写后面的句点不作为句末
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "fig", "no", "vol", "approx"}
+# 目标语言为这些语言时，同一段内的句子之间不加空格
+_NO_SPACE_LANGS = ("zh", "ja", "ko")
+
+
+def _ends_with_abbreviation(sentence: str) -> bool:
+    words = sentence.rstrip("\"'”’)]").split()
+    if not words:
+        return False
+    last = words[-1].rstrip(".").lower()
+    # 单个大写字母加句点多半是姓名缩写
+    return last in _ABBREVIATIONS or (len(last) == 1 and last.isalpha())
+
+
+def split_sentences(text: str) -> List[List[str]]:
+    """把文本按行分段、段内按句切分，返回每段的句子列表(空行为空列表)"""
+    paragraphs = []
+    for line in text.split("\n"):
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(line):
+            sentence = line[start:match.start()].strip()
+            if not sentence or _ends_with_abbreviation(sentence):
+                continue
+            sentences.append(sentence)
+            start = match.end()
+        tail = line[start:].strip()
+        if tail:
+            sentences.append(tail)
+        paragraphs.append(sentences)
+    return paragraphs
+
+
+def sentence_separator(target: str) -> str:
+    """目标语言中同一段内句子之间的分隔符"""
+    return "" if target.split("_")[0] in _NO_SPACE_LANGS else " "
+
+
+def join_sentences(paragraphs: List[List[str]], target: str) -> str:
+    """按 split_sentences 的分段结构把译文拼回去"""
+    separator = sentence_separator(target)
+    return "\n".join(separator.join(sentences) for sentences in paragraphs)
+
+
+def _package_translations(translation) -> Optional[List[Any]]:
+    """把argos的翻译对象拆成逐段的翻译包(中转翻译为两段)，无法拆开时返回None"""
+    translation = getattr(translation, "underlying", translation)
+    if hasattr(translation, "t1") and hasattr(translation, "t2"):
+        first = _package_translations(translation.t1)
+        second = _package_translations(translation.t2)
+        return first + second if first is not None and second is not None else None
+    if hasattr(translation, "pkg") and hasattr(translation, "translator"):
+        return [translation]
+    return None
+
+
+class BatchTranslator:
+    """一个语言对的整批翻译
+
+    argostranslate 的 translate() 对每段文本单独调用一次CTranslate2；这里把所有句子分词后
+    按长度排序，一次 translate_batch 交给CTranslate2，减少填充并让多句共用一次解码循环，
+    结果再按原来的顺序返回。取不到底层CTranslate2对象时退回逐句调用 translate()。
+    """
+
+    def __init__(self, translation, max_batch_tokens: int = 2048, beam_size: int = 4):
+        self.translation = translation
+        self.max_batch_tokens = max_batch_tokens
+        self.beam_size = beam_size
+        self.packages = _package_translations(translation)
+        self._lock = threading.Lock()
+        self._counts = {"batches": 0, "sentences": 0, "fallback_sentences": 0}
+
+    def _translator(self, package_translation):
+        # argos在第一次翻译时才创建CTranslate2对象
+        if package_translation.translator is None:
+            package_translation.translate("Hello world.")
+        return package_translation.translator
+
+    def _translate_step(self, package_translation, sentences: List[str]) -> List[str]:
+        pkg = package_translation.pkg
+        tokenized = [pkg.tokenizer.encode(sentence) for sentence in sentences]
+        # 按长度从长到短排序，长度相近的句子分在同一批里，填充最少
+        order = sorted(range(len(tokenized)), key=lambda i: len(tokenized[i]), reverse=True)
+        target_prefix = [[pkg.target_prefix]] * len(order) if pkg.target_prefix else None
+        results = self._translator(package_translation).translate_batch(
+            [tokenized[i] for i in order],
+            target_prefix=target_prefix,
+            replace_unknowns=True,
+            max_batch_size=self.max_batch_tokens,
+            batch_type="tokens",
+            beam_size=self.beam_size,
+            num_hypotheses=1,
+            length_penalty=0.2,
+        )
+
+        translated = [""] * len(sentences)
+        for i, result in zip(order, results):
+            value = pkg.tokenizer.decode(result.hypotheses[0])
+            if pkg.target_prefix and value.startswith(pkg.target_prefix):
+                value = value[len(pkg.target_prefix):]
+            translated[i] = value[1:] if value.startswith(" ") else value
+        return translated
+
+    def translate_batch(self, sentences: List[str]) -> List[str]:
+        """翻译一组句子，返回与输入顺序一致的译文"""
+        if not sentences:
+            return []
+        if self.packages is None:
+            with self._lock:
+                self._counts["fallback_sentences"] += len(sentences)
+            return [self.translation.translate(sentence) for sentence in sentences]
+
+        translated = list(sentences)
+        for package_translation in self.packages:
+            translated = self._translate_step(package_translation, translated)
+        with self._lock:
+            self._counts["batches"] += 1
+            self._counts["sentences"] += len(sentences)
+        return translated
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["avg_batch_size"] = round(counts["sentences"] / counts["batches"], 2) if counts["batches"] else 0.0
+        counts["batched"] = self.packages is not None
+        return counts
+
@@ -0,0 +1,147 @@
+# coding: utf-8
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """缓存用的规范化文本：Unicode NFC、合并连续空白、去掉首尾空白，大小写保持不变"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(text: str, source: str, target: str, model_version: str) -> str:
+    """(规范化文本, 源语言, 目标语言, 模型版本) 的摘要"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (source, target, model_version, normalize_text(text)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class TranslationCache:
+    """两级翻译缓存
+
+    内存层是按条目数和字节数双重限制的LRU，SQLite磁盘层(WAL模式)在重启后依然有效。
+    键包含模型版本，升级翻译模型后旧的译文自然失效。
+    """
+
+    def __init__(self, max_entries: int = 8192, max_bytes: int = 16 * 1024 * 1024,
+                 disk_path: Optional[str] = None, disk_max_entries: int = 200000, disk_preload: int = 2048):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_max_entries = disk_max_entries
+        self._entries = OrderedDict()  # key -> (translation, size)
+        self._bytes = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._db = None
+        if disk_path:
+            self._open_disk(disk_path, disk_preload)
+
+    def _open_disk(self, disk_path: str, preload: int):
+        os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+        self._db = sqlite3.connect(disk_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translation_cache ("
+            "key TEXT PRIMARY KEY, source TEXT, target TEXT, model TEXT, text TEXT, translation TEXT, used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS translation_cache_used ON translation_cache (used)")
+        self._db.commit()
+
+        # 最近使用的条目预加载到内存层
+        rows = self._db.execute(
+            "SELECT key, translation FROM translation_cache ORDER BY used DESC LIMIT ?", (preload,)
+        ).fetchall()
+        for key, translation in reversed(rows):
+            self._store(key, translation)
+
+    def get(self, text: str, source: str, target: str, model_version: str) -> Tuple[Optional[str], Optional[str]]:
+        """查找缓存，返回 (译文, 命中类型)，命中类型为 memory/disk"""
+        key = cache_key(text, source, target, model_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counts["memory_hits"] += 1
+                return entry[0], "memory"
+
+            if self._db is not None:
+                row = self._db.execute("SELECT translation FROM translation_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._store(key, row[0])
+                    self._db.execute("UPDATE translation_cache SET used = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    self._counts["disk_hits"] += 1
+                    return row[0], "disk"
+
+            self._counts["misses"] += 1
+        return None, None
+
+    def put(self, text: str, source: str, target: str, model_version: str, translation: str):
+        """写入缓存，同时写入磁盘层"""
+        key = cache_key(text, source, target, model_version)
+        with self._lock:
+            self._store(key, translation)
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO translation_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, source, target, model_version, normalize_text(text), translation, time.time()),
+            )
+            # 每写入一批检查一次磁盘条目数，超出上限时删掉最久未用的
+            self._puts += 1
+            if self._puts % 1000 == 0:
+                self._db.execute(
+                    "DELETE FROM translation_cache WHERE key IN "
+                    "(SELECT key FROM translation_cache ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_entries,),
+                )
+            self._db.commit()
+
+    def _store(self, key: str, translation: str):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        size = len(key) + len(translation.encode("utf-8"))
+        self._entries[key] = (translation, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def disk_entries(self, limit: int) -> Iterator[Tuple[str, str, str, str, str]]:
+        """磁盘层最近使用的条目 (源语言, 目标语言, 模型版本, 规范化文本, 译文)，用于建立翻译记忆"""
+        if self._db is None:
+            return iter(())
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT source, target, model, text, translation FROM translation_cache ORDER BY used DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return iter(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        with self._lock:
+            hits = self._counts["memory_hits"] + self._counts["disk_hits"]
+            total = hits + self._counts["misses"]
+            return dict(
+                self._counts,
+                hit_ratio=round(hits / total, 3) if total else 0.0,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                disk=self._db is not None,
+            )
@@ -0,0 +1,190 @@
+# coding: utf-8
+
+import difflib
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+# OCR常见的字形混淆，改动恰好是其中一处替换时才视为识别错误；
+# then/than、last/lost 这类普通的单字母差异可能是另一个真实的单词，不在此列
+_OCR_CONFUSIONS = [("l", "1"), ("I", "1"), ("l", "I"), ("O", "0"), ("o", "0"), ("S", "5"), ("B", "8"),
+                   ("Z", "2"), ("rn", "m"), ("cl", "d"), ("vv", "w")]
+# 梅森素数 2^61-1，MinHash的哈希函数 (a*x+b) mod p
+_PRIME = np.uint64((1 << 61) - 1)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text)
+
+
+def shingles(text: str, n: int = 3) -> set:
+    """小写、合并空白后的字符n-gram集合"""
+    text = _WHITESPACE.sub(" ", text.lower()).strip()
+    if len(text) <= n:
+        return {text}
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _occurrences(token: str, text: str) -> List[re.Match]:
+    return list(re.finditer(rf"(?<![0-9A-Za-z]){re.escape(token)}(?![0-9A-Za-z])", text))
+
+
+def _ocr_typo(old: str, new: str) -> bool:
+    """两个词是否只差一处OCR常见的字形混淆(如 available/avai1able、return/retum)"""
+    for a, b in _OCR_CONFUSIONS:
+        for source, target in ((a, b), (b, a)):
+            start = old.find(source)
+            while start >= 0:
+                if old[:start] + target + old[start + len(source):] == new:
+                    return True
+                start = old.find(source, start + 1)
+    return False
+
+
+def substitute(stored_tokens: List[str], query_tokens: List[str], translation: str) -> Optional[str]:
+    """把记忆中的译文改写成新句子的译文，不能安全改写时返回None
+
+    两句逐词对齐，被替换的词必须原样出现在译文中恰好一次(数字、保留原文的人名等)，先换成占位符再换成新词，
+    避免新旧词互相覆盖。插入、删除、词数不同的替换，以及在译文中找不到对应位置的替换一律放弃，
+    只有差一处OCR常见字形混淆(l/1/I、O/0、rn/m 等)的词沿用记忆中的译文。
+    """
+    replacements = {}
+    matcher = difflib.SequenceMatcher(None, stored_tokens, query_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        old, new = stored_tokens[i1:i2], query_tokens[j1:j2]
+        if tag != "replace" or len(old) != len(new):
+            return None
+        for old_token, new_token in zip(old, new):
+            matches = _occurrences(old_token, translation)
+            if len(matches) == 1:
+                # 同一个词在原句中出现多次、改成了不同的词时无法确定对应关系
+                if replacements.setdefault(matches[0].span(), new_token) != new_token:
+                    return None
+            elif not _ocr_typo(old_token, new_token):
+                return None
+
+    # 从后往前按位置替换，相当于先放占位符再统一填入新词
+    for (start, end), new_token in sorted(replacements.items(), reverse=True):
+        translation = translation[:start] + new_token + translation[end:]
+    return translation
+
+
+class _Entry:
+    __slots__ = ("scope", "text", "tokens", "translation", "bands")
+
+    def __init__(self, scope, text, translation, bands):
+        self.scope = scope
+        self.text = text
+        self.tokens = tokenize(text)
+        self.translation = translation
+        self.bands = bands
+
+
+class TranslationMemory:
+    """翻译记忆：找到与新句子足够相似的已翻译句子，改写后直接复用，不再调用翻译模型
+
+    句子按字符3-gram计算MinHash签名，签名分成若干段做局部敏感哈希(LSH)，同一段完全相同的句子作为候选，
+    再用准确的Jaccard相似度过滤。相似度达到阈值的候选按 substitute() 改写数字、专有名词等差异。
+    记忆按 (源语言, 目标语言, 模型版本) 分开，超过条目上限时淘汰最早加入的。
+    """
+
+    def __init__(self, min_similarity: float = 0.8, min_chars: int = 20, max_entries: int = 50000,
+                 num_perm: int = 32, bands: int = 8):
+        self.min_similarity = min_similarity
+        self.min_chars = min_chars
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.RandomState(20240601)
+        self._a = rng.randint(1, 1 << 31, num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, num_perm).astype(np.uint64)
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple, set] = {}
+        self._lock = threading.Lock()
+        self._counts = {"lookups": 0, "fuzzy_hits": 0, "rejected": 0, "model_fallbacks": 0, "added": 0, "evicted": 0}
+
+    def _bands(self, grams: set) -> List[bytes]:
+        hashes = np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+        signature = ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, text: str, translation: str, scope: Tuple[str, str, str]):
+        """记录一句翻译结果，scope 为 (源语言, 目标语言, 模型版本)"""
+        if len(text) < self.min_chars or not translation:
+            return
+        key = (scope, text)
+        bands = self._bands(shingles(text))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = _Entry(scope, text, translation, bands)
+            for i, band in enumerate(bands):
+                self._buckets.setdefault((scope, i, band), set()).add(key)
+            self._counts["added"] += 1
+            while len(self._entries) > self.max_entries:
+                old_key, old = self._entries.popitem(last=False)
+                for i, band in enumerate(old.bands):
+                    bucket = self._buckets.get((old.scope, i, band))
+                    if bucket is not None:
+                        bucket.discard(old_key)
+                        if not bucket:
+                            del self._buckets[(old.scope, i, band)]
+                self._counts["evicted"] += 1
+
+    def lookup(self, text: str, scope: Tuple[str, str, str]) -> Optional[Tuple[str, float]]:
+        """查找相似句子，返回 (改写后的译文, 相似度)；没有可用的匹配时返回None，调用方改用翻译模型"""
+        if len(text) < self.min_chars:
+            return None
+        grams = shingles(text)
+        bands = self._bands(grams)
+        with self._lock:
+            self._counts["lookups"] += 1
+            candidates = set()
+            for i, band in enumerate(bands):
+                candidates |= self._buckets.get((scope, i, band), set())
+            entries = [self._entries[key] for key in candidates]
+
+        scored = sorted(((jaccard(grams, shingles(entry.text)), entry) for entry in entries),
+                        key=lambda item: item[0], reverse=True)
+        rejected = False
+        tokens = tokenize(text)
+        for similarity, entry in scored:
+            if similarity < self.min_similarity:
+                break
+            translation = substitute(entry.tokens, tokens, entry.translation)
+            if translation is not None:
+                with self._lock:
+                    self._counts["fuzzy_hits"] += 1
+                return translation, similarity
+            rejected = True
+
+        with self._lock:
+            if rejected:
+                self._counts["rejected"] += 1
+            self._counts["model_fallbacks"] += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            entries = len(self._entries)
+        lookups = counts["lookups"]
+        return dict(
+            counts,
+            entries=entries,
+            hit_ratio=round(counts["fuzzy_hits"] / lookups, 3) if lookups else 0.0,
+            fallback_ratio=round(counts["model_fallbacks"] / lookups, 3) if lookups else 0.0,
+        )
@@ -0,0 +1,210 @@
+# coding: utf-8
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Tuple
+
+from translation_batch import BatchTranslator
+
+Pair = Tuple[str, str]
+
+
+def model_size(package_translation) -> int:
+    """按模型目录的文件大小估算一段翻译模型加载后占用的内存"""
+    package_path = getattr(package_translation.pkg, "package_path", None)
+    if package_path is None:
+        return 0
+    total = 0
+    for root, _, files in os.walk(os.path.join(str(package_path), "model")):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class _Entry:
+    def __init__(self, translator: BatchTranslator, pinned: bool):
+        self.translator = translator
+        self.pinned = pinned
+        self.refs = 0
+        self.uses = 0
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+
+
+class TranslatorRegistry:
+    """按语言对管理的翻译器注册表
+
+    已安装的语言只读取一次，每个 (源语言, 目标语言) 第一次用到时解析成翻译链(没有直接模型时经英文等中转)，
+    创建整批翻译器并翻译一句短文本预热，之后一直复用。同一语言对同时只加载一次，其余请求等待加载完成。
+    各段模型按目录大小估算内存，多个语言对共用的模型只算一次；超出预算时淘汰最久未使用且没有请求在用的语言对，
+    释放不再被其他语言对引用的CTranslate2模型。常驻的默认语言对标记为pinned，不会被淘汰。
+    """
+
+    def __init__(self, memory_budget: int = 2 * 1024 * 1024 * 1024, max_batch_tokens: int = 2048, beam_size: int = 4):
+        self.memory_budget = memory_budget
+        self.max_batch_tokens = max_batch_tokens
+        self.beam_size = beam_size
+        self._languages: Dict[str, Any] = {}
+        self._pairs: "OrderedDict[Pair, _Entry]" = OrderedDict()
+        self._loading: Dict[Pair, Future] = {}
+        self._sizes: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "loads": 0, "load_failures": 0, "evictions": 0}
+
+    def set_languages(self, languages: Iterable[Any]):
+        """登记 argostranslate.translate.get_installed_languages() 的结果"""
+        with self._lock:
+            self._languages = {language.code: language for language in languages}
+
+    def available(self, source: str, target: str) -> bool:
+        """是否安装了该语言对的翻译模型(含中转)"""
+        with self._lock:
+            languages = dict(self._languages)
+        if source == target or source not in languages or target not in languages:
+            return False
+        return languages[source].get_translation(languages[target]) is not None
+
+    def _load(self, pair: Pair) -> BatchTranslator:
+        source, target = pair
+        with self._lock:
+            from_lang, to_lang = self._languages.get(source), self._languages.get(target)
+        translation = from_lang.get_translation(to_lang) if from_lang and to_lang and source != target else None
+        if translation is None:
+            raise ValueError(f"没有安装 {source} -> {target} 的翻译模型")
+        translator = BatchTranslator(translation, self.max_batch_tokens, self.beam_size)
+        # 翻译一句短文本，让各段CTranslate2模型完成加载和内存分配
+        translator.translate_batch(["Hello world."])
+        return translator
+
+    @contextmanager
+    def use(self, source: str, target: str):
+        """取出语言对的翻译器使用，未加载时先加载；使用期间不会被淘汰"""
+        entry = self._acquire((source, target))
+        try:
+            yield entry.translator
+        finally:
+            with self._lock:
+                entry.refs -= 1
+                entry.last_used = time.time()
+
+    def _acquire(self, pair: Pair, pinned: bool = False) -> _Entry:
+        while True:
+            with self._lock:
+                entry = self._pairs.get(pair)
+                if entry is not None:
+                    entry.refs += 1
+                    entry.uses += 1
+                    entry.pinned = entry.pinned or pinned
+                    self._pairs.move_to_end(pair)
+                    self._counts["hits"] += 1
+                    return entry
+                loading = self._loading.get(pair)
+                owner = loading is None
+                if owner:
+                    loading = self._loading[pair] = Future()
+
+            if not owner:
+                # 其他请求正在加载同一个语言对，等它完成后重新查找
+                loading.result()
+                continue
+
+            print(f"正在加载翻译模型: {pair[0]} -> {pair[1]}")
+            start = time.perf_counter()
+            try:
+                translator = self._load(pair)
+            except Exception as e:
+                with self._lock:
+                    del self._loading[pair]
+                    self._counts["load_failures"] += 1
+                loading.set_exception(e)
+                raise
+            sizes = {id(package): model_size(package) for package in translator.packages or []}
+            with self._lock:
+                self._sizes.update(sizes)
+                entry = self._pairs[pair] = _Entry(translator, pinned)
+                entry.refs += 1
+                entry.uses += 1
+                del self._loading[pair]
+                self._counts["loads"] += 1
+            loading.set_result(None)
+            print(f"翻译模型 {pair[0]} -> {pair[1]} 加载完成 (耗时 {time.perf_counter() - start:.1f}s)")
+            self._evict(protect=pair)
+            return entry
+
+    def preload(self, pairs: Iterable[Pair], pinned: bool = False, background: bool = False):
+        """预先加载语言对并保持常驻，未安装的语言对跳过"""
+        def run():
+            for source, target in pairs:
+                if not self.available(source, target):
+                    continue
+                try:
+                    entry = self._acquire((source, target), pinned)
+                except Exception as e:
+                    print(f"预加载翻译模型 {source} -> {target} 失败: {e}")
+                    continue
+                with self._lock:
+                    entry.refs -= 1
+
+        if background:
+            threading.Thread(target=run, name="translator-preload", daemon=True).start()
+        else:
+            run()
+
+    def _memory(self, pairs: Iterable[_Entry]) -> int:
+        packages = {id(package) for entry in pairs for package in entry.translator.packages or []}
+        return sum(self._sizes.get(package, 0) for package in packages)
+
+    def _evict(self, protect: Pair = None):
+        """估算的模型内存超出预算时，按最久未使用的顺序淘汰语言对"""
+        while True:
+            with self._lock:
+                if self._memory(self._pairs.values()) <= self.memory_budget:
+                    return
+                victim = next((pair for pair, entry in self._pairs.items()
+                               if pair != protect and not entry.pinned and entry.refs == 0), None)
+                if victim is None:
+                    return
+                entry = self._pairs.pop(victim)
+                # 其他语言对还在用的模型(如中转链共用的 en -> zh)保留
+                in_use = {id(package) for other in self._pairs.values() for package in other.translator.packages or []}
+                released = [package for package in entry.translator.packages or [] if id(package) not in in_use]
+                for package in released:
+                    package.translator = None
+                    self._sizes.pop(id(package), None)
+                self._counts["evictions"] += 1
+            print(f"翻译模型内存超出预算，淘汰: {victim[0]} -> {victim[1]} (释放 {len(released)} 个模型)")
+
+    def pairs(self) -> List[Pair]:
+        with self._lock:
+            return list(self._pairs)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = list(self._pairs.items())
+            loading = [f"{source}-{target}" for source, target in self._loading]
+            counts = dict(self._counts)
+            memory = self._memory(entry for _, entry in entries)
+        pairs = {}
+        for (source, target), entry in entries:
+            pairs[f"{source}-{target}"] = {
+                "pinned": entry.pinned,
+                "in_use": entry.refs,
+                "uses": entry.uses,
+                "legs": len(entry.translator.packages or []) or None,
+                "idle_seconds": round(time.time() - entry.last_used, 1),
+                "batches": entry.translator.stats(),
+            }
+        return dict(
+            counts,
+            pairs=pairs,
+            loading=loading,
+            memory_mb=round(memory / 1024 / 1024, 1),
+            memory_budget_mb=round(self.memory_budget / 1024 / 1024, 1),
+        )
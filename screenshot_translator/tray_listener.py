@@ -10,6 +10,9 @@ from PyQt5.QtCore import QTimer, Qt
 from pynput import mouse
 import time
 
+# 截图翻译被新的截图取代时 combine.py 的退出码
+EXIT_CANCELLED = 2
+
 class ScreenshotTranslatorTray:
     def __init__(self):
         self.app = QApplication(sys.argv)
@@ -141,10 +144,13 @@ class ScreenshotTranslatorTray:
         """启动翻译流程（在后台线程中）"""
         def run_translation():
             try:
+                # 新的截图取代之前还没完成的截图翻译，服务端丢弃旧作业排队中的OCR和翻译
                 result = subprocess.run([
-                    sys.executable, str(self.script_path)
+                    sys.executable, str(self.script_path), "--supersede"
                 ], capture_output=True, text=True, encoding='utf-8')
                 
+                if result.returncode == EXIT_CANCELLED:
+                    return
                 if result.returncode == 0:
                     self.tray_icon.showMessage("翻译完成", "截图翻译成功完成", QSystemTrayIcon.Information, 1000)
                 else:
@@ -0,0 +1,6 @@
+# coding: utf-8
+import os
+import sys
+
+# 服务端模块按脚本方式互相导入，测试时把 screenshot_translator 目录加入搜索路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "screenshot_translator"))
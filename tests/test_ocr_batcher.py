@@ -0,0 +1,46 @@
+# coding: utf-8
+from ocr_batcher import OCRBatcher
+
+
+def make_batcher(idle_workers, num_dispatchers=2):
+    batcher = OCRBatcher(lambda images: [{} for _ in images], max_batch_size=8, max_wait=0.01,
+                         num_dispatchers=num_dispatchers, idle_workers=lambda: idle_workers)
+    batcher.close()
+    return batcher
+
+
+def test_single_request_is_dispatched_immediately():
+    batcher = make_batcher(idle_workers=0)
+    batcher._active = 1
+
+    assert not batcher._should_wait(["a"])
+
+
+def test_no_wait_while_another_dispatcher_is_idle():
+    # 另一个分发线程只是在等新请求，并不代表有负载
+    batcher = make_batcher(idle_workers=0)
+
+    assert not batcher._should_wait(["a", "b"])
+
+
+def test_no_wait_while_a_worker_is_idle():
+    batcher = make_batcher(idle_workers=1)
+    batcher._active = 1
+
+    assert not batcher._should_wait(["a", "b"])
+
+
+def test_wait_when_queued_and_everything_is_busy():
+    batcher = make_batcher(idle_workers=0)
+    batcher._active = 1
+
+    assert batcher._should_wait(["a", "b"])
+
+
+def test_batches_are_still_delivered():
+    batcher = OCRBatcher(lambda images: [{"n": image} for image in images], num_dispatchers=2,
+                         idle_workers=lambda: 0)
+    futures = [batcher.submit_async(i) for i in range(5)]
+
+    assert [future.result(timeout=5)["n"] for future in futures] == list(range(5))
+    batcher.close()
@@ -0,0 +1,74 @@
+# coding: utf-8
+import cv2
+import numpy as np
+
+from ocr_cache import OCRResultCache, image_key
+
+
+def dialog(text: str) -> np.ndarray:
+    image = np.full((180, 420, 3), 240, dtype=np.uint8)
+    cv2.rectangle(image, (10, 10), (409, 169), (200, 200, 200), 2)
+    cv2.putText(image, text, (24, 96), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (20, 20, 20), 2, cv2.LINE_AA)
+    return image
+
+
+def result(text: str):
+    return {"text": text, "lines": [{"text": text}]}
+
+
+def test_one_digit_difference_is_not_a_perceptual_hit():
+    cache = OCRResultCache()
+    three, eight = dialog("Delete 3 files permanently?"), dialog("Delete 8 files permanently?")
+    cache.put(image_key(three), result("Delete 3 files permanently?"))
+
+    found, hit = cache.get(image_key(eight))
+
+    assert found is None and hit is None
+
+
+def test_compression_noise_is_a_perceptual_hit():
+    cache = OCRResultCache()
+    image = dialog("Delete 3 files permanently?")
+    cache.put(image_key(image), result("Delete 3 files permanently?"))
+    noisy = np.clip(image.astype(np.int16) + np.random.default_rng(0).integers(-4, 5, image.shape), 0, 255)
+
+    found, hit = cache.get(image_key(noisy.astype(np.uint8)))
+
+    assert hit == "perceptual" and found["text"] == "Delete 3 files permanently?"
+
+
+def test_different_size_is_not_a_perceptual_hit():
+    cache = OCRResultCache()
+    image = dialog("Delete 3 files permanently?")
+    cache.put(image_key(image), result("Delete 3 files permanently?"))
+
+    found, _ = cache.get(image_key(cv2.copyMakeBorder(image, 0, 1, 0, 0, cv2.BORDER_REPLICATE)))
+
+    assert found is None
+
+
+def test_peek_is_exact_only_and_not_counted():
+    cache = OCRResultCache()
+    image = dialog("Delete 3 files permanently?")
+    cache.put(image_key(image), result("Delete 3 files permanently?"))
+    noisy = image.copy()
+    noisy[0, 0] ^= 1
+
+    assert cache.peek(image_key(image))["text"] == "Delete 3 files permanently?"
+    assert cache.peek(image_key(noisy)) is None
+    stats = cache.stats()
+    assert stats["exact_hits"] == stats["perceptual_hits"] == stats["misses"] == 0
+
+
+def test_exact_only_cache_keeps_no_frames():
+    cache = OCRResultCache(perceptual=False)
+    image = dialog("Delete 3 files permanently?")
+    key = cache.key(image)
+    cache.put(key, result("Delete 3 files permanently?"))
+    noisy = image.copy()
+    noisy[0, 0] ^= 1
+
+    assert key.gray is None and key.dhash == key.phash == 0
+    assert cache.stats()["bytes"] < image.size
+    assert cache.get(cache.key(image))[1] == "exact"
+    assert cache.get(cache.key(noisy)) == (None, None)
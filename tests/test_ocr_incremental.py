@@ -0,0 +1,43 @@
+# coding: utf-8
+from concurrent.futures import Future
+
+import numpy as np
+
+from ocr_incremental import IncrementalOCR, make_result
+
+
+def fake_ocr(text: str, calls: list):
+    def ocr_fn(image):
+        calls.append(image.shape)
+        future = Future()
+        future.set_result(make_result([([0, 0, image.shape[1], image.shape[0]], text, 0.98)]))
+        return future
+    return ocr_fn
+
+
+def test_changed_tiles_on_one_line_are_recognized_once():
+    ocr = IncrementalOCR(tile_size=8, margin=2)
+    frame = np.random.default_rng(0).integers(0, 200, (64, 96), dtype=np.uint8)
+    # 一行较高的文本(如大字号标题)两端各有一块变化，两块所在的块行不相邻
+    changed = frame.copy()
+    changed[2:6, 2:6] = 255
+    changed[34:38, 88:92] = 255
+    calls = []
+
+    ocr._update(frame, [([4, 4, 92, 40], "Delete 3 files", 0.99)], "full", 0)
+    result = ocr.run(changed, fake_ocr("Delete 8 files", calls))
+
+    assert len(calls) == 1
+    assert result["rec_texts"] == ["Delete 8 files"]
+
+
+def test_regions_merge_after_growing_to_lines():
+    ocr = IncrementalOCR(tile_size=8, margin=0)
+    tiles = np.zeros((8, 12), dtype=bool)
+    tiles[0, 0] = True
+    tiles[4, 11] = True
+    lines = [([2, 2, 94, 12], "first", 0.9), ([2, 10, 94, 36], "second", 0.9)]
+
+    regions = ocr._regions(tiles, lines, [], 64, 96)
+
+    assert regions == [[0, 0, 96, 40]]
@@ -0,0 +1,35 @@
+# coding: utf-8
+import cv2
+import numpy as np
+
+from ocr_precheck import TextPrecheck
+
+
+def capture(height=1080, width=1920):
+    image = np.full((height, width, 3), 250, dtype=np.uint8)
+    cv2.putText(image, "Delete 3 files permanently?", (700, 520), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (20, 20, 20), 2)
+    return image
+
+
+def test_content_box_is_computed_once_per_capture(monkeypatch):
+    precheck = TextPrecheck()
+    image = capture()
+    calls = []
+    small_gray = precheck._small_gray
+    monkeypatch.setattr(precheck, "_small_gray", lambda img: calls.append(img.shape) or small_gray(img))
+
+    ok, _ = precheck.has_text(image)
+    cropped, (dx, dy) = precheck.crop_margins(image)
+
+    assert ok and len(calls) == 1
+    # 缩小图上的区域映射回原图后仍然完整包含文字
+    ys, xs = np.nonzero((image < 128).any(axis=2))
+    assert dx <= xs.min() and dy <= ys.min()
+    assert dx + cropped.shape[1] > xs.max() and dy + cropped.shape[0] > ys.max()
+    assert cropped.size < image.size / 10
+
+
+def test_blank_capture_is_rejected():
+    ok, features = TextPrecheck().has_text(np.full((600, 800, 3), 128, dtype=np.uint8))
+
+    assert not ok and features["components"] == 0
@@ -0,0 +1,59 @@
+# coding: utf-8
+from concurrent.futures import Future
+
+import numpy as np
+
+from ocr_tiling import TiledOCR, _stitch, merge_seam_lines
+
+LEFT_TILE = (0, 0, 100, 40)
+RIGHT_TILE = (80, 0, 180, 40)
+
+
+def test_stitch_requires_a_real_overlap():
+    assert _stitch("hello", "one") is None
+    assert _stitch("Delete sel", "selected files") == "Delete selected files"
+    assert _stitch("ab", "bc") == "abc"
+
+
+def test_seam_lines_are_stitched():
+    lines = [([10, 5, 96, 20], "Delete sel", 0.9, LEFT_TILE), ([84, 5, 170, 20], "selected files", 0.9, RIGHT_TILE)]
+
+    merged = merge_seam_lines(lines)
+
+    assert [(box, text) for box, text, _, _ in merged] == [([10, 5, 170, 20], "Delete selected files")]
+
+
+def test_unstitchable_seam_lines_keep_the_line_from_the_tile_holding_the_box():
+    # 合并后的框中心在右侧块内，左侧块边缘识别出的残缺文本丢弃，不拼接也不重复
+    lines = [([82, 5, 99, 20], "hello", 0.9, LEFT_TILE), ([85, 5, 160, 20], "one two", 0.9, RIGHT_TILE)]
+
+    merged = merge_seam_lines(lines)
+
+    assert [text for _, text, _, _ in merged] == ["one two"]
+
+
+def test_run_tiled_returns_plain_lines():
+    def ocr_fn(crop):
+        future = Future()
+        future.set_result({"rec_texts": ["word"], "rec_scores": [0.9], "rec_boxes": [[2, 2, 20, 10]]})
+        return future
+
+    tiled = TiledOCR(ocr_fn, max_pixels=100, tile_size=64, overlap=16)
+    result = tiled.run_tiled(np.zeros((64, 112, 3), dtype=np.uint8))
+    tiled.close()
+
+    assert result["rec_texts"] == ["word", "word"]
+
+
+def test_dense_capture_merges_each_row_once():
+    # 两个块在 x=80..100 重叠，每一行在两块中各检测到一段
+    lines = []
+    for row in range(300):
+        y = row * 20
+        lines.append(([10, y, 96, y + 14], f"row {row} left", 0.9, (0, 0, 100, 6000)))
+        lines.append(([84, y, 170, y + 14], "left tail", 0.9, (80, 0, 180, 6000)))
+
+    merged = merge_seam_lines(lines)
+
+    assert len(merged) == 300
+    assert [box[1] for box, _, _, _ in merged] == [row * 20 for row in range(300)]
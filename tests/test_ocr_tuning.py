@@ -0,0 +1,40 @@
+# coding: utf-8
+import ocr_tuning
+from ocr_tuning import load_profile, profile_path, save_profile, tune
+
+
+def fake_benchmark(latency):
+    def benchmark(ocr_kwargs, images, repeats=3):
+        return {"latency_ms": latency(ocr_kwargs), "load_seconds": 0.0, "warmup_seconds": 0.0, "text": "same"}
+    return benchmark
+
+
+def test_ties_keep_fewer_threads(monkeypatch):
+    # 线程数对耗时没有影响
+    monkeypatch.setattr(ocr_tuning, "benchmark", fake_benchmark(lambda kwargs: 100.0))
+
+    profile = tune([], cpu_threads=8, tier="fast", lang="en")
+
+    assert profile["params"]["cpu_threads"] == 4
+
+
+def test_more_threads_kept_when_clearly_faster(monkeypatch):
+    monkeypatch.setattr(ocr_tuning, "benchmark", fake_benchmark(lambda kwargs: 800.0 / kwargs["cpu_threads"]))
+
+    profile = tune([], cpu_threads=8, tier="accurate", lang="en")
+
+    assert profile["params"]["cpu_threads"] == 8
+
+
+def test_profile_applies_only_to_the_tuned_tier(monkeypatch, tmp_path):
+    monkeypatch.setattr(ocr_tuning, "benchmark", fake_benchmark(lambda kwargs: 100.0))
+    template = str(tmp_path / "ocr_profile.json")
+    profile = tune([], cpu_threads=4, tier="accurate", lang="en")
+    save_profile(profile, profile_path("accurate", "en", template))
+
+    assert profile["tier"] == "accurate" and profile["lang"] == "en"
+    assert load_profile(profile_path("accurate", "en", template), "accurate", "en") is not None
+    # 快速档、识别模型不同的语言不会用到精确档英文模型的调优结果
+    assert load_profile(profile_path("accurate", "en", template), "fast", "en") is None
+    assert load_profile(profile_path("accurate", "en", template), "accurate", "ch") is None
+    assert load_profile(profile_path("fast", "en", template), "fast", "en") is None
@@ -0,0 +1,77 @@
+# coding: utf-8
+import pytest
+
+from ocr_worker_pool import OCRWorkerPool
+
+
+class BrokenConn:
+    def send(self, job):
+        pass
+
+    def poll(self, timeout=None):
+        return True
+
+    def recv(self):
+        raise EOFError("worker exited")
+
+    def close(self):
+        pass
+
+
+class HungConn(BrokenConn):
+    def poll(self, timeout=None):
+        return False
+
+    def recv(self):
+        raise AssertionError("不应在没有数据时阻塞读取")
+
+
+class DeadProcess:
+    def is_alive(self):
+        return False
+
+    def join(self, timeout=None):
+        pass
+
+
+def broken_pool(restart):
+    pool = OCRWorkerPool(1)
+    worker = pool._workers[0]
+    worker.conn, worker.process = BrokenConn(), DeadProcess()
+    pool._restart = restart
+    pool._idle.put(worker)
+    return pool, worker
+
+
+def test_worker_is_not_requeued_when_restart_fails():
+    def restart(worker):
+        raise RuntimeError("spawn failed")
+
+    pool, worker = broken_pool(restart)
+
+    with pytest.raises(RuntimeError, match="异常"):
+        pool.predict([])
+    assert worker.failed and pool._idle.empty()
+    # 没有可用的进程时立即报错，而不是一直等待
+    with pytest.raises(RuntimeError, match="所有OCR工作进程都已失败"):
+        pool.predict([])
+    assert pool.stats()["failed"] == 1
+
+
+def test_worker_is_requeued_after_successful_restart():
+    pool, worker = broken_pool(lambda worker: None)
+
+    with pytest.raises(RuntimeError):
+        pool.predict([])
+    assert not worker.failed and pool._idle.get_nowait() is worker
+
+
+def test_hung_worker_is_restarted_after_call_timeout():
+    restarted = []
+    pool, worker = broken_pool(restarted.append)
+    worker.conn = HungConn()
+    pool.call_timeout = 0.01
+
+    with pytest.raises(RuntimeError, match="没有返回"):
+        pool.predict([])
+    assert restarted == [worker] and pool._idle.get_nowait() is worker
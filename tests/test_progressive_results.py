@@ -0,0 +1,19 @@
+# coding: utf-8
+import threading
+
+from ocr_tiers import ProgressiveResults
+
+
+def test_cancelled_refinements_are_counted():
+    refinements = ProgressiveResults(max_workers=1)
+    release = threading.Event()
+    running = refinements.submit(lambda: release.wait(5) and {"rec_texts": []})
+    queued = refinements.submit(lambda: {"rec_texts": ["never"]})
+
+    assert refinements.future(queued).cancel()
+    release.set()
+    assert refinements.get(running, wait=5)["state"] == "done"
+
+    assert refinements.get(queued)["state"] == "cancelled"
+    stats = refinements.stats()
+    assert stats["cancelled"] == 1 and stats["completed"] == 1 and stats["failed"] == 0
@@ -0,0 +1,33 @@
+# coding: utf-8
+import threading
+import time
+
+import pytest
+
+from service_status import FAILED, ServiceRegistry, ServiceUnavailable
+
+
+def test_require_wakes_up_when_loading_fails():
+    services = ServiceRegistry()
+    release = threading.Event()
+
+    def loader(status):
+        release.wait(5)
+        raise RuntimeError("model missing")
+
+    services.start("ocr", loader)
+    threading.Timer(0.1, release.set).start()
+
+    start = time.perf_counter()
+    with pytest.raises(ServiceUnavailable) as error:
+        services.require("ocr", timeout=5)
+
+    assert time.perf_counter() - start < 2
+    assert error.value.state == FAILED and "model missing" in str(error.value)
+
+
+def test_require_returns_once_ready():
+    services = ServiceRegistry()
+    services.start("dictionary", lambda status: time.sleep(0.1))
+
+    services.require("dictionary", timeout=5)
@@ -0,0 +1,54 @@
+# coding: utf-8
+from translation_memory import TranslationMemory, substitute, tokenize
+
+SCOPE = ("en", "zh", "test")
+
+
+def rewrite(stored: str, query: str, translation: str):
+    return substitute(tokenize(stored), tokenize(query), translation)
+
+
+def test_opposite_words_fall_back_to_the_model():
+    assert rewrite("Click here to enable automatic updates for this application.",
+                   "Click here to disable automatic updates for this application.",
+                   "点击此处为此应用程序启用自动更新。") is None
+    assert rewrite("Click the button below to show hidden files in this folder.",
+                   "Click the button below to hide hidden files in this folder.",
+                   "点击下方按钮显示此文件夹中的隐藏文件。") is None
+
+
+def test_opposite_words_are_not_served_from_memory():
+    memory = TranslationMemory()
+    memory.add("Click here to enable automatic updates for this application.", "点击此处为此应用程序启用自动更新。", SCOPE)
+    memory.add("Click the button below to show hidden files in this folder.", "点击下方按钮显示此文件夹中的隐藏文件。", SCOPE)
+
+    assert memory.lookup("Click here to disable automatic updates for this application.", SCOPE) is None
+    assert memory.lookup("Click the button below to hide hidden files in this folder.", SCOPE) is None
+
+
+def test_numbers_are_substituted():
+    assert rewrite("You have 3 unread messages in your inbox.",
+                   "You have 12 unread messages in your inbox.",
+                   "你的收件箱中有 3 条未读消息。") == "你的收件箱中有 12 条未读消息。"
+
+
+def test_ocr_confusions_keep_the_translation():
+    assert rewrite("Click here to enable available updates for this application.",
+                   "Click here to enable avai1able updates for this application.",
+                   "点击此处为此应用程序启用可用的更新。") == "点击此处为此应用程序启用可用的更新。"
+    assert rewrite("Press the key to return to the previous page.",
+                   "Press the key to retum to the previous page.",
+                   "按该键返回上一页。") == "按该键返回上一页。"
+
+
+def test_real_word_pairs_fall_back_to_the_model():
+    for stored, query in (("then", "than"), ("last", "lost"), ("form", "from"), ("automatic", "automatlc")):
+        assert rewrite(f"Open the settings page {stored} save your changes.",
+                       f"Open the settings page {query} save your changes.",
+                       "打开设置页面并保存更改。") is None
+
+
+def test_inserted_words_fall_back_to_the_model():
+    assert rewrite("Do you want to save the changes?",
+                   "Do you want to not save the changes?",
+                   "是否保存更改？") is None